@@ -0,0 +1,207 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from keyword_matcher import is_regex
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+# String dtypes the extracted table can be built with (--string-dtype); without one the
+# columns keep the dtype pandas infers
+STRING_DTYPES = ["object", "string[python]", "string[pyarrow]"]
+
+# Regular expression syntax that RE2, the engine of the Arrow kernels, does not support:
+# lookarounds and backreferences. Such patterns are searched with Python's re.
+RE2_UNSUPPORTED = re.compile(r'\(\?(?:=|!|<=|<!|P=)|\\[1-9]')
+# Classes that match non-ASCII characters with Python's re but only ASCII ones with RE2,
+# e.g. \d and "²"; strings that are not ASCII are searched again with Python's re
+UNICODE_CLASSES = re.compile(r'\\[dDwWsSbB]')
+UNNAMED_GROUP = re.compile(r'\\.|\[(?:\\.|[^\]])*\]|\((?!\?)')
+
+
+def to_string_dtype(df: pd.DataFrame, dtype=None) -> pd.DataFrame:
+    """
+        Converts the string columns of a table to one string dtype.
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The extracted table.
+        dtype : str, optional
+            One of STRING_DTYPES; None leaves the table as it is. Missing values become
+            NaN with "object" and pd.NA with the "string" dtypes; both are written to the
+            .csv file as empty fields.
+        Returns
+        -------
+        df : pd.DataFrame
+            The table; numeric and datetime columns are not changed.
+        """
+    if dtype is None:
+        return df
+    if dtype == "string[pyarrow]" and pa is None:
+        raise ImportError("The string[pyarrow] dtype requires the pyarrow package")
+    for column in df.columns:
+        if df[column].dtype == object or isinstance(df[column].dtype, pd.StringDtype):
+            if dtype == "object":
+                # Columns that are object already hold None
+                df[column] = df[column].astype(object).where(df[column].notna(), np.nan)
+            else:
+                df[column] = df[column].astype(dtype)
+    return df
+
+
+def is_arrow_backed(strings) -> bool:
+    """
+        Tells whether a Series holds its strings in Arrow memory, so that Arrow kernels can
+        run on it without a copy. pandas' default "str" dtype is Arrow-backed when pyarrow
+        is installed.
+        """
+    return (pa is not None and isinstance(strings, pd.Series) and isinstance(strings.dtype, pd.StringDtype)
+            and strings.dtype.storage == "pyarrow")
+
+
+def arrow_array(strings):
+    """
+        Returns the Arrow strings of an Arrow-backed Series.
+        """
+    return pa.array(strings.array)
+
+
+def non_ascii_rows(array) -> np.ndarray:
+    """
+        Positions of the strings with non-ASCII characters, e.g. "µM" or "müll".
+        """
+    return np.flatnonzero(~np.asarray(pc.fill_null(pc.string_is_ascii(array), True)))
+
+
+def search_rows(array, rows, search) -> np.ndarray:
+    """
+        Evaluates a Python search function on some of the strings.
+        """
+    texts = array.take(pa.array(rows, type=pa.int64())).to_pylist()
+    return np.fromiter((text is not None and search(text) is not None for text in texts), dtype=bool,
+                       count=len(texts))
+
+
+def contains(array, pattern: str, regex: bool = False) -> np.ndarray:
+    """
+        Finds the strings that contain a keyword or a match of a regular expression with
+        Arrow kernels, giving the same result as Python's `in` and re.search.
+        Parameters
+        ----------
+        array : pa.Array
+            The strings, see arrow_array; missing strings never match.
+        pattern : str
+            A plain keyword, or a Python regular expression if `regex` is True.
+        regex : bool
+            Search `pattern` as a regular expression.
+        Returns
+        -------
+        mask : np.ndarray of bool
+            True for the strings that match.
+        """
+    if not regex:
+        return np.asarray(pc.fill_null(pc.match_substring(array, pattern), False))
+    search = re.compile(pattern).search
+    if RE2_UNSUPPORTED.search(pattern):
+        return search_rows(array, np.arange(len(array)), search)
+    mask = np.array(pc.fill_null(pc.match_substring_regex(array, pattern), False), dtype=bool)
+    if UNICODE_CLASSES.search(pattern):
+        rows = non_ascii_rows(array)
+        mask[rows] = search_rows(array, rows, search)
+    return mask
+
+
+def str_contains(strings: pd.Series, pattern: str) -> np.ndarray:
+    """
+        Series.str.contains with a regular expression as a boolean array, run by Arrow
+        kernels if the strings are Arrow-backed, see contains.
+        """
+    if is_arrow_backed(strings):
+        return contains(arrow_array(strings), pattern, regex=True)
+    return strings.str.contains(pattern).to_numpy(dtype=bool)
+
+
+def match_vocabulary(strings: pd.Series, groups: list) -> pd.arrays.ArrowStringArray:
+    """
+        Finds the label of one vocabulary in every string with Arrow kernels.
+        Gives the same labels as KeywordMatcher.match_column: the first group with a
+        keyword in the string wins.
+        Parameters
+        ----------
+        strings : pd.Series
+            Arrow-backed strings, typically the "Location" column.
+        groups : list
+            (label, keywords) groups in order of precedence, e.g. a vocabulary of
+            extraction_rules.VOCABULARIES. Keywords with regular expression syntax are
+            searched as regular expressions.
+        Returns
+        -------
+        labels : pd.arrays.ArrowStringArray
+            The winning label of every string, missing where no keyword occurs, with the
+            dtype of `strings`.
+        """
+    array = arrow_array(strings)
+    labels = pa.nulls(len(array), pa.string())
+    # The groups are applied last to first, so that the first matching group is set last
+    for label, keywords in reversed(groups):
+        # One scan per group: RE2 matches an alternation of many keywords in one pass
+        pattern = '|'.join(keyword if is_regex(keyword) else re.escape(keyword) for keyword in keywords)
+        found = contains(array, pattern, regex=True)
+        if found.any():
+            labels = pc.if_else(pa.array(found), label, labels)
+    return pd.array(labels, dtype=strings.dtype)
+
+
+def name_groups(pattern: str) -> str:
+    """
+        Names the capture groups of a regular expression "group0", "group1" ..., since
+        Arrow's extract_regex returns named groups only.
+        """
+    index = -1
+
+    def name(match):
+        nonlocal index
+        if match.group() != "(":
+            return match.group()
+        index += 1
+        return f"(?P<group{index}>"
+
+    return UNNAMED_GROUP.sub(name, pattern)
+
+
+def extract(strings: pd.Series, pattern: re.Pattern) -> pd.DataFrame:
+    """
+        Extracts the capture groups of a regular expression like Series.str.extract.
+        Arrow-backed strings are matched with Arrow's extract_regex kernel; patterns it
+        can not run exactly, and other Series, are extracted by pandas.
+        Parameters
+        ----------
+        strings : pd.Series
+            The strings, e.g. the "Location" column.
+        pattern : re.Pattern
+            A compiled regular expression with unnamed capture groups.
+        Returns
+        -------
+        groups : pd.DataFrame
+            One column per group, numbered from 0, with the index of `strings`; missing
+            where the pattern does not match. Groups extracted by Arrow have the dtype of
+            `strings`.
+        """
+    if (not is_arrow_backed(strings) or pattern.groupindex or pattern.flags & ~re.UNICODE
+            or RE2_UNSUPPORTED.search(pattern.pattern)):
+        return strings.astype(object).str.extract(pattern)
+    array = arrow_array(strings)
+    matches = pc.extract_regex(array, name_groups(pattern.pattern))
+    groups = pd.DataFrame({index: pd.array(pc.struct_field(matches, [index]), dtype=strings.dtype)
+                           for index in range(pattern.groups)}, index=strings.index)
+    if UNICODE_CLASSES.search(pattern.pattern):
+        rows = non_ascii_rows(array)
+        if len(rows):
+            groups.iloc[rows] = strings.iloc[rows].astype(object).str.extract(pattern).to_numpy()
+    return groups
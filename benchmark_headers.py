@@ -0,0 +1,63 @@
+import argparse
+import os
+import tempfile
+import time
+
+from recording_headers import header_report, read_headers
+
+
+def create_synthetic_dat_files(root, number_of_files=200, channels=60, rate=10000, seconds=600):
+    """
+    Creates MC_DataTool-like .dat files: a text header followed by 16-bit samples.
+
+    The sample payload is not written; the files are extended with truncate, so they have
+    the size of real recordings (60 channels at 10 kHz for 10 min = 720 MB) but take no
+    space on file systems with sparse files.
+
+    Returns
+    -------
+    paths : list of str
+        The created files.
+    """
+    streams = ";".join(f"El_{index + 1:02d}" for index in range(channels))
+    header = (f"MC_DataTool binary conversion\r\n"
+              f"Version 2.6.15\r\n"
+              f"MC_REC file = \"C:\\Data\\recording.mcd\"\r\n"
+              f"Date = 12.03.2021\r\n"
+              f"Time = 12:30:00\r\n"
+              f"Sample rate = {rate}\r\n"
+              f"ADC zero = 32768\r\n"
+              f"El = 0.1907µV/AD\r\n"
+              f"Streams = {streams}\r\n"
+              f"EOH\r\n").encode("latin-1")
+    paths = []
+    for index in range(number_of_files):
+        path = os.path.join(root, f"recording_{index}.dat")
+        with open(path, "wb") as file:
+            file.write(header)
+            file.truncate(len(header) + 2 * channels * rate * seconds)
+        paths.append(path)
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks reading .dat headers.")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--channels", type=int, default=60)
+    parser.add_argument("--rate", type=int, default=10000)
+    parser.add_argument("--seconds", type=int, default=600)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        paths = create_synthetic_dat_files(root, args.files, args.channels, args.rate, args.seconds)
+        print(f"Synthetic corpus: {len(paths)} .dat files of {os.path.getsize(paths[0]) / 1024 / 1024:.0f} MB")
+        for workers in args.workers:
+            start = time.perf_counter()
+            headers = read_headers(paths, workers)
+            seconds = time.perf_counter() - start
+            report = header_report(headers)
+            print(f"workers={workers:3d}: {len(paths) / seconds:.0f} files/s, "
+                  f"{report['bytes'] / seconds / 1024 ** 3:.1f} GB/s of recordings, "
+                  f"{report['mean_bytes_read']:.0f} bytes read per file ({report['fraction_read']:.6%}), "
+                  f"{report['errors']} errors")
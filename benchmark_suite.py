@@ -0,0 +1,209 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import main
+from append_functions import append_cleaning_function
+from profiling import Profiler, peak_memory
+from synthetic_corpus import create_tree, generate_paths, parse_scale
+
+# A timing is only flagged if it is slower than its baseline by both margins
+DEFAULT_TOLERANCE = 0.25
+MINIMUM_SECONDS = 0.05
+
+
+def benchmark_paths(number_of_files: int, seed: int = 0, legacy: bool = True) -> dict:
+    """
+        Times the extraction stages on synthetic paths, without touching the disk.
+        Parameters
+        ----------
+        number_of_files : int
+            Number of synthetic paths.
+        seed : int
+            Seed of the corpus.
+        legacy : bool
+            Also time every append_df_with_* stage of the legacy pipeline.
+        Returns
+        -------
+        timings : dict
+            Stage name -> wall seconds: "extract" (single-pass engine), "clean", and
+            every append_df_with_* function.
+        """
+    entries = [main.FileEntry(location, 1024, 0, 0)
+               for location in generate_paths(number_of_files, seed)
+               if location.lower().endswith((".brw", ".dat"))]
+    profiler = Profiler()
+    df = profiler.run("extract", main.extract_entries, entries)
+    profiler.run("clean", append_cleaning_function, df)
+    if legacy:
+        with profiler.stage("extract legacy"):
+            main.extract_entries_legacy(entries, profiler)
+    return {record["name"]: record["wall_seconds"] for record in profiler.stages
+            if record["name"] != "extract legacy"}
+
+
+def benchmark_string_dtype(number_of_files: int, string_dtype: str, seed: int = 0, legacy: bool = True) -> dict:
+    """
+        Times the extraction and cleaning with one string dtype and measures its memory.
+        The peak memory is that of the whole process, so every dtype is benchmarked in a
+        fresh process by benchmark_string_dtypes.
+        Parameters
+        ----------
+        number_of_files : int
+            Number of synthetic paths.
+        string_dtype : str
+            One of arrow_strings.STRING_DTYPES.
+        seed : int
+            Seed of the corpus.
+        legacy : bool
+            Also time the append_df_with_* stages, which run on Arrow kernels with
+            string[pyarrow].
+        Returns
+        -------
+        result : dict
+            "seconds": stage name -> wall seconds ("extract", "clean", "extract legacy");
+            "table_bytes": memory of the extracted table; "peak_memory_bytes": peak
+            resident memory of the process.
+        """
+    entries = [main.FileEntry(location, 1024, 0, 0)
+               for location in generate_paths(number_of_files, seed)
+               if location.lower().endswith((".brw", ".dat"))]
+    profiler = Profiler()
+    df = profiler.run("extract", main.extract_entries, entries, string_dtype=string_dtype)
+    table_bytes = int(df.memory_usage(deep=True).sum())
+    profiler.run("clean", append_cleaning_function, df)
+    del df
+    if legacy:
+        profiler.run("extract legacy", main.extract_entries_legacy, entries, string_dtype=string_dtype)
+    return {"seconds": {record["name"]: record["wall_seconds"] for record in profiler.stages},
+            "table_bytes": table_bytes, "peak_memory_bytes": peak_memory()}
+
+
+def benchmark_string_dtypes(number_of_files: int, string_dtypes: list, seed: int = 0, legacy: bool = True) -> dict:
+    """
+        Runs benchmark_string_dtype for several dtypes, each in a fresh process.
+        Returns
+        -------
+        results : dict
+            String dtype -> result of benchmark_string_dtype.
+        """
+    results = {}
+    for string_dtype in string_dtypes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            results[string_dtype] = executor.submit(benchmark_string_dtype, number_of_files, string_dtype, seed,
+                                                    legacy).result()
+    return results
+
+
+def benchmark_tree(number_of_files: int, seed: int = 0) -> dict:
+    """
+        Times the walk and the end-to-end main.py run on a synthetic directory tree.
+        Returns
+        -------
+        timings : dict
+            "walk" and "main.py" -> wall seconds.
+        """
+    with tempfile.TemporaryDirectory() as root:
+        tree = os.path.join(root, "Data_from_W8")
+        create_tree(tree, number_of_files, seed)
+        start = time.perf_counter()
+        list(main.scan_directory(tree, [".brw", ".dat"]))
+        walk_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py"),
+                        "--path", tree, "--csv-path", os.path.join(root, "list_of_files.csv")],
+                       check=True, stdout=subprocess.DEVNULL)
+        main_seconds = time.perf_counter() - start
+    return {"walk": walk_seconds, "main.py": main_seconds}
+
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """
+        Finds the timings that got slower than their baseline.
+        Parameters
+        ----------
+        results : dict
+            Benchmark name -> seconds of this run.
+        baseline : dict
+            Benchmark name -> seconds of the baseline run.
+        tolerance : float
+            Allowed relative slowdown, 0.25 = 25%.
+        Returns
+        -------
+        regressions : list of tuple
+            (name, baseline seconds, seconds) of every regression.
+        """
+    regressions = []
+    for name, seconds in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if seconds > reference * (1 + tolerance) and seconds - reference > MINIMUM_SECONDS:
+            regressions.append((name, reference, seconds))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks the extraction on synthetic lab paths.")
+    parser.add_argument("--scales", nargs="+", default=["10k", "100k"],
+                        help="Numbers of synthetic paths, e.g. 10k 100k 1M 10M.")
+    parser.add_argument("--tree-files", default="10k",
+                        help="Number of files of the synthetic tree for the walk and main.py (0 skips them).")
+    parser.add_argument("--no-legacy", action="store_true",
+                        help="Do not time the append_df_with_* stages one by one.")
+    parser.add_argument("--string-dtypes", nargs="*", default=[],
+                        help="Also compare time and memory of these string dtypes at every scale, e.g. "
+                             "object string[pyarrow]; each runs in a fresh process.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default="benchmark_baseline.json",
+                        help="JSON file with the baseline timings.")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Store this run as the baseline.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown before a timing is flagged.")
+    args = parser.parse_args()
+
+    results = {}
+    memory = {}
+    for scale in args.scales:
+        for name, seconds in benchmark_paths(parse_scale(scale), args.seed, not args.no_legacy).items():
+            results[f"{scale}/{name}"] = seconds
+        for string_dtype, result in benchmark_string_dtypes(parse_scale(scale), args.string_dtypes, args.seed,
+                                                            not args.no_legacy).items():
+            for name, seconds in result["seconds"].items():
+                results[f"{scale}/{string_dtype}/{name}"] = seconds
+            memory[f"{scale}/{string_dtype}"] = result
+    tree_files = parse_scale(args.tree_files)
+    if tree_files:
+        for name, seconds in benchmark_tree(tree_files, args.seed).items():
+            results[f"tree {args.tree_files}/{name}"] = seconds
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    flagged = {name for name, reference, seconds in regressions}
+
+    for name, seconds in results.items():
+        reference = baseline.get(name)
+        change = f"{seconds / reference - 1:+8.1%}" if reference else " " * 8
+        print(f"{name:<50} {seconds:10.4f} s {change}" + ("  REGRESSION" if name in flagged else ""))
+    for name, result in memory.items():
+        print(f"{name:<50} table {result['table_bytes'] / 1024 / 1024:8.1f} MB, "
+              f"peak memory {result['peak_memory_bytes'] / 1024 / 1024:8.1f} MB")
+
+    if args.update_baseline or not baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, ensure_ascii=False)
+        print(f"Baseline written to {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} regressions against {args.baseline}")
+        sys.exit(1)
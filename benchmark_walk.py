@@ -0,0 +1,139 @@
+import argparse
+import os
+import tempfile
+import time
+
+import main
+
+
+class SlowDirEntry:
+    """
+    Wraps an os.DirEntry and delays every stat call, like a file on a network share.
+    """
+
+    def __init__(self, dir_entry, latency):
+        self.dir_entry = dir_entry
+        self.latency = latency
+        self.name = dir_entry.name
+        self.path = dir_entry.path
+
+    def is_dir(self):
+        return self.dir_entry.is_dir()
+
+    def stat(self):
+        time.sleep(self.latency)
+        return self.dir_entry.stat()
+
+    def inode(self):
+        return self.dir_entry.inode()
+
+
+class SlowScandir:
+    """
+    Replacement for os.scandir that waits `latency` seconds per listing and per stat.
+    """
+
+    def __init__(self, scandir, latency):
+        self.scandir = scandir
+        self.latency = latency
+
+    def __call__(self, path):
+        time.sleep(self.latency)
+        return SlowIterator(self.scandir(path), self.latency)
+
+
+class SlowIterator:
+    """
+    Context manager and iterator over the wrapped entries of one listing.
+    """
+
+    def __init__(self, iterator, latency):
+        self.iterator = iterator
+        self.latency = latency
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.iterator.close()
+
+    def __iter__(self):
+        return (SlowDirEntry(dir_entry, self.latency) for dir_entry in self.iterator)
+
+
+def create_synthetic_tree(root, depth=3, breadth=4, files_per_dir=5):
+    """
+    Creates a directory tree with empty .brw, .dat and .txt files.
+
+    Parameters
+    ----------
+    root : str
+        Directory in which the tree is created.
+    depth : int
+        Number of directory levels below root.
+    breadth : int
+        Number of subdirectories in every directory.
+    files_per_dir : int
+        Number of files in every directory.
+
+    Returns
+    -------
+    number_of_directories : int
+        Number of directories created, including root.
+    """
+    number_of_directories = 1
+    extensions = [".brw", ".dat", ".txt"]
+    for index in range(files_per_dir):
+        file_name = f"Messung0{index % 9 + 1}.03.2021_12-00-0{index % 10}{extensions[index % 3]}"
+        open(os.path.join(root, file_name), "wb").close()
+    if depth > 0:
+        for index in range(breadth):
+            subdirectory = os.path.join(root, f"{index} DIV Bicuculline")
+            os.mkdir(subdirectory)
+            number_of_directories += create_synthetic_tree(subdirectory, depth - 1, breadth, files_per_dir)
+    return number_of_directories
+
+
+def benchmark_walk(root, latency, walk_workers_list):
+    """
+    Times scan_directory over `root` for every worker count with injected latency.
+
+    Returns
+    -------
+    results : list of tuple
+        (walk_workers, seconds, number_of_files) for every entry of walk_workers_list.
+    """
+    original_scandir = os.scandir
+    os.scandir = SlowScandir(original_scandir, latency)
+    try:
+        results = []
+        reference = None
+        for walk_workers in walk_workers_list:
+            start = time.perf_counter()
+            paths = [entry.path for entry in main.scan_directory(root, [".brw", ".dat"], walk_workers)]
+            seconds = time.perf_counter() - start
+            if reference is None:
+                reference = paths
+            elif paths != reference:
+                raise AssertionError(f"walk with {walk_workers} workers differs from the first walk")
+            results.append((walk_workers, seconds, len(paths)))
+    finally:
+        os.scandir = original_scandir
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks the serial and concurrent directory walk.")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--breadth", type=int, default=4)
+    parser.add_argument("--files-per-dir", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.002,
+                        help="Seconds added to every directory listing and every stat.")
+    parser.add_argument("--walk-workers", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        directories = create_synthetic_tree(root, args.depth, args.breadth, args.files_per_dir)
+        print(f"Synthetic tree: {directories} directories, latency {args.latency * 1000:.1f} ms per call")
+        for walk_workers, seconds, files in benchmark_walk(root, args.latency, args.walk_workers):
+            print(f"walk_workers={walk_workers:3d}: {files} files in {seconds:.3f} s")
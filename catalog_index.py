@@ -0,0 +1,270 @@
+import argparse
+import os
+import pickle
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from typed_catalog import (CATEGORY_COLUMNS, NUMERIC_COLUMNS, QUANTITY_COLUMNS, QUANTITY_PATTERN, to_typed_catalog,
+                           unit_column)
+
+# Changes whenever the pickled layout changes, so that old index files are rebuilt
+INDEX_VERSION = 1
+
+CONDITION_PATTERN = re.compile(r'^(?P<column>.+?)\s*(?P<operator>>=|<=|=)\s*(?P<value>.*)$')
+
+
+def mask_to_bitmap(mask: np.ndarray) -> int:
+    """
+        Packs a boolean row mask into a Python int whose bit i is set if row i matches.
+        """
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+
+def bitmap_to_rows(bitmap: int, rows: int) -> np.ndarray:
+    """
+        Unpacks a bitmap into the sorted positions of its set bits.
+        """
+    packed = np.frombuffer(bitmap.to_bytes((rows + 7) // 8, "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(packed, bitorder="little")[:rows])
+
+
+class CatalogIndex:
+    """
+        In-memory index of the catalog for fast attribute queries.
+        Label columns (and the unit columns of quantities) are stored as one bitmap per
+        label, a Python int with bit i set for row i, so that conditions combine with & and
+        |. Numeric columns are stored as their values sorted, together with the rows they
+        belong to, so that a range is two binary searches.
+        Parameters
+        ----------
+        locations : list of str
+            The Location of every row.
+        bitmaps : dict
+            Column -> label -> bitmap.
+        sorted_values : dict
+            Column -> (sorted values, rows of the values); missing values are left out.
+        source : tuple, optional
+            (path, size, mtime_ns) of the table the index was built from.
+        """
+
+    def __init__(self, locations, bitmaps, sorted_values, source=None):
+        self.locations = locations
+        self.bitmaps = bitmaps
+        self.sorted_values = sorted_values
+        self.source = source
+        self.all_rows = (1 << len(locations)) - 1
+
+    @classmethod
+    def from_table(cls, df, source=None):
+        """
+            Builds the index of an extracted table, e.g. read from the .csv catalog.
+            """
+        typed = to_typed_catalog(df)
+        bitmaps = {}
+        label_columns = [column for column in CATEGORY_COLUMNS if column in typed]
+        label_columns += [unit_column(column) for column in QUANTITY_COLUMNS if unit_column(column) in typed]
+        for column in label_columns:
+            # Label and unit columns are categoricals in the typed table
+            codes = typed[column].cat.codes.to_numpy()
+            bitmaps[column] = {label: mask_to_bitmap(codes == code)
+                               for code, label in enumerate(typed[column].cat.categories) if (codes == code).any()}
+
+        sorted_values = {}
+        for column in list(QUANTITY_COLUMNS) + list(NUMERIC_COLUMNS):
+            if column not in typed:
+                continue
+            values = typed[column].astype("Float64").to_numpy(dtype=np.float64, na_value=np.nan)
+            rows = np.flatnonzero(~np.isnan(values))
+            order = np.argsort(values[rows], kind="stable")
+            sorted_values[column] = (values[rows][order], rows[order].astype(np.int32))
+        return cls(typed["Location"].tolist(), bitmaps, sorted_values, source)
+
+    def label(self, column, labels):
+        """
+            Rows whose label column equals one of `labels` (a label or a list of labels).
+            """
+        if isinstance(labels, str):
+            labels = [labels]
+        bitmap = 0
+        for label in labels:
+            bitmap |= self.bitmaps[column].get(label, 0)
+        return bitmap
+
+    def range(self, column, low=None, high=None):
+        """
+            Rows whose numeric column lies within [low, high]; None leaves a side open.
+            """
+        values, rows = self.sorted_values[column]
+        start = 0 if low is None else np.searchsorted(values, low, side="left")
+        end = len(values) if high is None else np.searchsorted(values, high, side="right")
+        mask = np.zeros(len(self.locations), dtype=bool)
+        mask[rows[start:end]] = True
+        return mask_to_bitmap(mask)
+
+    def condition(self, column, value):
+        """
+            Rows matching one condition.
+            Parameters
+            ----------
+            column : str
+                A label column, a unit column, or a numeric or quantity column.
+            value : str, number, list or tuple
+                For label columns a label or a list of labels. For numeric columns a number,
+                or a (low, high) tuple with None for an open side. For quantity columns also
+                "<number> <unit>", e.g. "21 DIV" or "10 µM", which requires both.
+            """
+        if column in self.bitmaps:
+            return self.label(column, value)
+        if column not in self.sorted_values:
+            raise KeyError(f"{column!r} is not indexed")
+        if isinstance(value, tuple):
+            return self.range(column, *value)
+        if isinstance(value, str):
+            match = re.match(QUANTITY_PATTERN, value)
+            if match is None:
+                raise ValueError(f"{value!r} is not a number with an optional unit")
+            number, unit = float(match.group(1).replace(",", ".")), match.group(2)
+            bitmap = self.range(column, number, number)
+            if unit:
+                bitmap &= self.label(unit_column(column), unit)
+            return bitmap
+        return self.range(column, value, value)
+
+    def query(self, conditions):
+        """
+            Intersects conditions, e.g. {"Recording system": "HDMEA", "DIV / DAP": "21 DIV",
+            "Drug dose": "10 µM", "Size, Gb": (1, None)}, or a list of (column, value) pairs,
+            which may hold several conditions on the same column, e.g. [("DIV / DAP", (14,
+            None)), ("DIV / DAP", (None, 20))].
+            Returns
+            -------
+            bitmap : int
+                The matching rows, see rows and select.
+            """
+        bitmap = self.all_rows
+        for column, value in (conditions.items() if isinstance(conditions, dict) else conditions):
+            bitmap &= self.condition(column, value)
+            if not bitmap:
+                break
+        return bitmap
+
+    def rows(self, bitmap):
+        """
+            Positions of the rows of a bitmap, in the order of the table.
+            """
+        return bitmap_to_rows(bitmap, len(self.locations))
+
+    def select(self, conditions):
+        """
+            Locations of the rows matching all conditions, see query.
+            """
+        return [self.locations[row] for row in self.rows(self.query(conditions))]
+
+    def save(self, path):
+        """
+            Pickles the index next to the catalog.
+            """
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as file:
+            pickle.dump((INDEX_VERSION, self.source, self.locations, self.bitmaps, self.sorted_values), file,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+            Loads a saved index; returns None if it is missing or of another version.
+            """
+        try:
+            with open(path, "rb") as file:
+                version, source, locations, bitmaps, sorted_values = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        if version != INDEX_VERSION:
+            return None
+        return cls(locations, bitmaps, sorted_values, source)
+
+
+def source_stamp(csv_path):
+    """
+        Identifies a version of the catalog by path, size and modification time.
+        """
+    stat = os.stat(csv_path)
+    return os.path.abspath(csv_path), stat.st_size, stat.st_mtime_ns
+
+
+def load_or_build_index(csv_path, index_path=None):
+    """
+        Loads the index of a .csv catalog, or builds and saves it if the catalog changed.
+        Parameters
+        ----------
+        csv_path : str
+            The catalog written by main.py.
+        index_path : str, optional
+            The index file; defaults to <catalog>.index next to the catalog.
+        Returns
+        -------
+        index : CatalogIndex
+            The index.
+        built : bool
+            True if the index was (re)built from the catalog.
+        """
+    if index_path is None:
+        index_path = os.path.splitext(csv_path)[0] + ".index"
+    stamp = source_stamp(csv_path)
+    index = CatalogIndex.load(index_path)
+    if index is not None and index.source == stamp:
+        return index, False
+    index = CatalogIndex.from_table(pd.read_csv(csv_path, index_col=0), stamp)
+    index.save(index_path)
+    return index, True
+
+
+def parse_condition(text):
+    """
+        Parses a command line condition into (column, value).
+        "Performer=Margot Mayer|MM" matches either label, "DIV / DAP=21 DIV" a quantity
+        with its unit, "Size, Gb>=1" and "Size, Gb<=2" open ranges, and "Size, Gb=1..2" a
+        closed range.
+        """
+    match = CONDITION_PATTERN.match(text)
+    if match is None:
+        raise ValueError(f"Condition {text!r} is not <column>=<value>, <column>>=<value> or <column><=<value>")
+    column, operator, value = match.group("column"), match.group("operator"), match.group("value").strip()
+    if operator == ">=":
+        return column, (float(value), None)
+    if operator == "<=":
+        return column, (None, float(value))
+    if ".." in value:
+        low, high = value.split("..", 1)
+        return column, (float(low) if low else None, float(high) if high else None)
+    if column in CATEGORY_COLUMNS or column.endswith(" unit"):
+        return column, value.split("|")
+    return column, value
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Queries the catalog through its attribute index.")
+    parser.add_argument("--csv-path", required=True, help="The .csv catalog written by main.py.")
+    parser.add_argument("--index-path", default=None, help="The index file (default: <catalog>.index).")
+    parser.add_argument("--limit", type=int, default=20, help="Number of matching locations to print.")
+    parser.add_argument("conditions", nargs="*",
+                        help='Conditions like "Performer=Margot Mayer", "DIV / DAP=21 DIV", "Drug dose=10 µM", '
+                             '"Size, Gb>=1" or "Size, Gb=0.5..2".')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index, built = load_or_build_index(args.csv_path, args.index_path)
+    print(f"Index of {len(index.locations)} rows {'built' if built else 'loaded'} in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms")
+    # A list, since several conditions may restrict the same column, e.g. ">=14" and "<=20"
+    conditions = [parse_condition(condition) for condition in args.conditions]
+    start = time.perf_counter()
+    bitmap = index.query(conditions)
+    seconds = time.perf_counter() - start
+    print(f"{bitmap.bit_count()} matching rows, queried in {seconds * 1000:.3f} ms")
+    for location in index.select(conditions)[:args.limit]:
+        print(location)
@@ -0,0 +1,574 @@
+import os
+import re
+import time
+from array import array
+
+import extraction_rules as rules
+import keyword_matcher
+from keyword_matcher import KeywordMatcher
+from rule_cache import load_or_build
+
+# The extraction works on plain lists of paths and does not import pandas; only
+# to_dataframe / extract_dataframe build a table.
+
+VOCABULARY_MATCHER, MATCHER_STARTUP = load_or_build(
+    "vocabulary_matcher", lambda: KeywordMatcher(rules.VOCABULARIES), keyword_matcher, rules)
+# Drug dose keywords are matched case-insensitively and only if no dose number was found
+DRUG_DOSE_MATCHERS = [(re.compile('|'.join(group), re.IGNORECASE).search, group[0]) for group in rules.DRUG_DOSE]
+LAB_PERFORMER_NAMES = frozenset(rules.LAB_PERFORMER_NAMES)
+# Size sent to worker processes for files that could not be stat'ed
+UNKNOWN_SIZE = -1
+# "Date" and "Time" as found in "Messung05.02.2016_17-40-49" paths and written by the header readers
+DATE_FORMAT = "%d.%m.%Y"
+TIME_FORMAT = "%H-%M-%S"
+# "Recorded at" in .csv files; fixed, since pandas drops the time of day if it is midnight in every row
+CSV_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+# dtype of "Recorded at"; fixed, so that every chunk of a table gets the same one
+RECORDED_AT_DTYPE = "datetime64[s]"
+
+
+def requires(pattern, required):
+    """
+    Builds a fast test for text that every match of a quantity pattern contains.
+
+    Most paths contain none of the units, and the quantity patterns backtrack over every
+    digit of a path before failing; the test rejects those paths with one fast scan.
+
+    Parameters
+    ----------
+    pattern : re.Pattern
+        The quantity pattern.
+    required : str
+        Text every match of `pattern` contains. If the pattern ignores case, it is a
+        regular expression compiled with the same flags; otherwise a plain substring.
+
+    Returns
+    -------
+    test : callable
+        Function returning False for paths `pattern` cannot match.
+    """
+    if pattern.flags & re.IGNORECASE:
+        return re.compile(required, pattern.flags).search
+    return lambda location: required in location
+
+
+PITCH_REQUIRED = requires(rules.PITCH_PATTERN, "um")
+SAMPLING_RATE_REQUIRED = [requires(pattern, required) for (pattern, unit), required
+                          in zip(rules.SAMPLING_RATE_PATTERNS, ["kH", "Hz", "MHz"])]
+ELECTRODE_REQUIRED = requires(rules.ELECTRODE_PATTERN, "lectrode")
+DIV_REQUIRED = requires(rules.DIV_PATTERN, "div")
+DAP_REQUIRED = requires(rules.DAP_PATTERN, "dap")
+DRUG_DOSE_UM_REQUIRED = requires(rules.DRUG_DOSE_UM_PATTERN, "µM|microM|muM")
+DRUG_DOSE_UL_REQUIRED = requires(rules.DRUG_DOSE_UL_PATTERN, "µL|microL|muL")
+RADIATION_DOSE_REQUIRED = requires(rules.RADIATION_DOSE_PATTERN, "Gy")
+BR_TIME_REQUIRED = [requires(pattern, required) for (pattern, unit), required
+                    in zip(rules.BR_TIME_PATTERNS, ["h bR|h b.R.|h vor Bestrahlung", "d bR|d b.R.|d vor Bestrahlung",
+                                                    "m bR|m b.R.|m vor Bestrahlung"])]
+AR_TIME_REQUIRED = [requires(pattern, required) for (pattern, unit), required
+                    in zip(rules.AR_TIME_PATTERNS, ["h aR|h a.R.|h nach Bestrahlung", "d aR|d a.R.|d nach Bestrahlung",
+                                                    "m aR|m a.R.|m nach Bestrahlung"])]
+AR_TIME_TARGET_REQUIRED = requires(rules.AR_TIME_TARGET_PATTERN, "d aR|d a.R.|d nach Bestrahlung")
+
+
+def match_vocabulary(location, matchers):
+    """
+    Returns the label of the first keyword group found in a path, or None.
+    """
+    for search, label in matchers:
+        if search(location):
+            return label
+    return None
+
+
+def closest_number(match):
+    """
+    Picks the number in front of the unit, or the one behind it if that one is closer.
+    """
+    num1 = match.group(1)
+    num2 = match.group(2)
+    if num2 and abs(match.start(2) - match.start(1)) < abs(match.start(1) - match.end(1)):
+        return num2
+    return num1
+
+
+def bytes_to_gb(size):
+    """
+    Converts a file size in bytes into Gb.
+    """
+    return size*(1/1024)*(1/1024)*(1/1024)
+
+
+def extract_recording_sys(location):
+    extension = os.path.splitext(location)[1].lower()
+    if extension == ".brw":
+        return "HDMEA"
+    elif extension == ".dat":
+        return "MEA"
+    return None
+
+
+def extract_date_and_time(location):
+    match = rules.DATE_AND_TIME_PATTERN.search(location)
+    if match:
+        return match.group(1), match.group(2)
+    return None, None
+
+
+def extract_pitch(location):
+    if not PITCH_REQUIRED(location):
+        return None
+    match = rules.PITCH_PATTERN.search(location)
+    if match:
+        return float(match.group(1))
+    return None
+
+
+def extract_sampling_rate(location):
+    for (pattern, unit), required in zip(rules.SAMPLING_RATE_PATTERNS, SAMPLING_RATE_REQUIRED):
+        if not required(location):
+            continue
+        match = pattern.search(location)
+        if match:
+            return f"{closest_number(match)} {unit}"
+    return None
+
+
+def extract_electrode(location):
+    if not ELECTRODE_REQUIRED(location):
+        return None
+    closest_num = None
+    match = rules.ELECTRODE_PATTERN.search(location)
+    if match:
+        groups = match.groups()
+        num1 = next((group for group in groups if group is not None), None)
+        num2 = next((group for group in groups[1:] if group is not None), None)
+        if num1 and num2:
+            num1_index = groups.index(num1)
+            num2_index = groups.index(num2)
+            closest_num = num2 if abs(match.start(num2_index) - match.start(num1_index)) < abs(
+                match.start(0) - match.end(0)) else num1
+        elif num1:
+            closest_num = num1
+    return int(closest_num) if closest_num is not None else None
+
+
+def closest_div_dap_number(location, pattern, required):
+    """
+    Finds the number of days in vitro / after plating next to a DIV or DAP keyword.
+    """
+    closest_num = None
+    if not required(location):
+        return closest_num
+    last_position = -1  # Position of the last found pattern
+    for num1, num2 in pattern.findall(location):
+        num1_position = location.find(num1)
+        num2_position = location.find(num2) if num2 else -1
+
+        # Check if the number is greater than zero, does not have leading zeros, and is less than or equal to 60
+        if num1[0] != '0' and int(num1) > 0 and int(num1) < 60:
+            num1_dist = abs(num1_position - last_position)
+            num2_dist = abs(num2_position - last_position) if num2_position >= 0 else num1_dist + 1
+
+            # Prioritize the left number
+            if num2_dist <= num1_dist:
+                if int(num2) > 0 and int(num2) < 60:  # Check if num2 is valid
+                    closest_num = num2
+                    last_position = num2_position
+            elif int(num1) < 60:
+                closest_num = num1
+                last_position = num1_position
+    return closest_num
+
+
+def extract_div_dap(location):
+    closest_num_div = closest_div_dap_number(location, rules.DIV_PATTERN, DIV_REQUIRED)
+    if closest_num_div:
+        return f"{closest_num_div} DIV"
+    closest_num_dap = closest_div_dap_number(location, rules.DAP_PATTERN, DAP_REQUIRED)
+    if closest_num_dap:
+        return f"{closest_num_dap} DAP"
+    return None
+
+
+def performer_and_lab(performer, lab):
+    if lab is None and performer in LAB_PERFORMER_NAMES:
+        lab = "BioMEMS Lab"
+    return performer, lab
+
+
+def extract_drug_dose(location):
+    closest_num1 = None
+    closest_num2 = None
+    um_present = DRUG_DOSE_UM_REQUIRED(location)
+    match1 = um_present and rules.DRUG_DOSE_UM_PATTERN.search(location)
+    if match1:
+        closest_num1 = f"{float(match1.group(1).replace(',', '.')):.1f} µM"
+    match2 = DRUG_DOSE_UL_REQUIRED(location) and rules.DRUG_DOSE_UL_PATTERN.search(location)
+    if match2:
+        closest_num2 = f"{float(match2.group(1).replace(',', '.')):.1f} µL"
+
+    # Handle cases where "01" should be treated as "0.1"
+    if not closest_num1 and closest_num2:
+        closest_num1 = closest_num2.replace("01", "0.1")
+
+    if closest_num1:
+        return closest_num1
+    if not um_present:
+        # Every keyword of rules.DRUG_DOSE contains one of the µM spellings
+        return None
+    return match_vocabulary(location, DRUG_DOSE_MATCHERS)
+
+
+def extract_rad_dose(location):
+    if not RADIATION_DOSE_REQUIRED(location):
+        return None
+    match = rules.RADIATION_DOSE_PATTERN.search(location)
+    if match:
+        return f"{float(match.group(1))} Gy"
+    return None
+
+
+def extract_radiation_time(location, patterns, required_tests):
+    for (pattern, unit), required in zip(patterns, required_tests):
+        if not required(location):
+            continue
+        match = pattern.search(location)
+        if match:
+            return f"{closest_number(match)} {unit}"
+    return None
+
+
+def extract_br_time(location):
+    return extract_radiation_time(location, rules.BR_TIME_PATTERNS, BR_TIME_REQUIRED)
+
+
+def extract_ar_time(location):
+    if AR_TIME_TARGET_REQUIRED(location):
+        match_target = rules.AR_TIME_TARGET_PATTERN.findall(location)
+        if match_target:
+            return match_target[-1]  # Take the last match
+    return extract_radiation_time(location, rules.AR_TIME_PATTERNS, AR_TIME_REQUIRED)
+
+
+def extract_timeframe(location):
+    match = rules.TIMEFRAME_PATTERN.search(location)
+    if match:
+        return int(match.group(1))
+    return None
+
+
+def vocabulary_extractor(column):
+    index = VOCABULARY_MATCHER.columns.index(column)
+    return lambda location, labels: labels[index]
+
+
+def path_extractor(extractor):
+    return lambda location, labels: extractor(location)
+
+
+PERFORMER_INDEX = VOCABULARY_MATCHER.columns.index("Performer")
+LABORATORY_INDEX = VOCABULARY_MATCHER.columns.index("Laboratory")
+
+# Extractors in column order. Every extractor takes a path and the labels found in it by
+# VOCABULARY_MATCHER, and returns the value of its column, or a tuple of values if it fills
+# several columns.
+EXTRACTORS = [
+    (("Date", "Time"), path_extractor(extract_date_and_time)),
+    (("Recording system",), path_extractor(extract_recording_sys)),
+    (("Pitch, µm",), path_extractor(extract_pitch)),
+    (("Sampling rate",), path_extractor(extract_sampling_rate)),
+    (("Electrode",), path_extractor(extract_electrode)),
+    (("Culture type",), vocabulary_extractor("Culture type")),
+    (("Cell's kind",), vocabulary_extractor("Cell's kind")),
+    (("DIV / DAP",), path_extractor(extract_div_dap)),
+    (("Performer", "Laboratory"),
+     lambda location, labels: performer_and_lab(labels[PERFORMER_INDEX], labels[LABORATORY_INDEX])),
+    (("Drug application",), vocabulary_extractor("Drug application")),
+    (("Drug dose",), path_extractor(extract_drug_dose)),
+    (("Radiation",), vocabulary_extractor("Radiation")),
+    (("Radiation dose",), path_extractor(extract_rad_dose)),
+    (("Time before radiation",), path_extractor(extract_br_time)),
+    (("Time after radiation",), path_extractor(extract_ar_time)),
+    (("Nanoparticles",), vocabulary_extractor("Nanoparticles")),
+    (("Laser",), vocabulary_extractor("Laser")),
+    (("Timeframe, s",), path_extractor(extract_timeframe)),
+    (("Stimulation",), vocabulary_extractor("Stimulation")),
+    (("Control",), vocabulary_extractor("Control")),
+]
+
+COLUMNS = ["Location", "Format", "Size, Gb"] + [name for names, extractor in EXTRACTORS for name in names]
+
+
+def extract_columns(locations, sizes=None, extractors=None):
+    """
+    Runs every extractor on each path once and collects the values column by column.
+
+    The keyword vocabularies of all columns are matched in one scan per path.
+
+    Parameters
+    ----------
+    locations : sequence of str
+        File paths.
+    sizes : sequence of int, optional
+        File sizes in bytes, in the order of `locations`. Without them "Size, Gb" is None.
+    extractors : list of (names, extractor), optional
+        Replacement for EXTRACTORS with the same columns, e.g. instrumented ones.
+
+    Returns
+    -------
+    columns : dict
+        Column name -> list of values, in the column order of the table.
+    """
+    extractors = [(extractor, len(names) > 1) for names, extractor in (extractors or EXTRACTORS)]
+    if sizes is None:
+        sizes = [None] * len(locations)
+    rows = []
+    match = VOCABULARY_MATCHER.match
+    for location, size in zip(locations, sizes):
+        labels = match(location)
+        row = [location, os.path.splitext(location)[1], None if size is None else bytes_to_gb(size)]
+        for extractor, several_columns in extractors:
+            if several_columns:
+                row.extend(extractor(location, labels))
+            else:
+                row.append(extractor(location, labels))
+        rows.append(row)
+
+    if not rows:
+        return {name: [] for name in COLUMNS}
+    return {name: list(values) for name, values in zip(COLUMNS, zip(*rows))}
+
+
+def extract_partition(partition):
+    """
+    Extracts one partition in a worker process.
+
+    Parameters
+    ----------
+    partition : tuple
+        The paths joined by NUL characters, which paths can not contain, and the sizes
+        as an array of 64-bit integers (or None), UNKNOWN_SIZE for files that could not
+        be stat'ed; both pickle as one compact block.
+
+    Returns
+    -------
+    columns : list of list
+        The values of every column of COLUMNS but "Location", which the caller has.
+    """
+    joined_locations, sizes = partition
+    locations = joined_locations.split("\0") if joined_locations else []
+    if sizes is not None:
+        sizes = [None if size == UNKNOWN_SIZE else size for size in sizes]
+    columns = extract_columns(locations, sizes)
+    return [columns[name] for name in COLUMNS[1:]]
+
+
+def extract_columns_parallel(locations, sizes=None, workers=2, partitions_per_worker=4):
+    """
+    Runs extract_columns on contiguous partitions of the paths in a process pool.
+
+    Partitions are contiguous, so that the paths of a directory stay together and the
+    directory cache of every worker stays effective. The columns of the partitions are
+    concatenated in the original order, so the result equals extract_columns.
+
+    Parameters
+    ----------
+    locations : sequence of str
+        File paths.
+    sizes : sequence of int, optional
+        File sizes in bytes, in the order of `locations`.
+    workers : int
+        Number of worker processes.
+    partitions_per_worker : int
+        Partitions per worker, so that a slow partition does not hold up the others.
+
+    Returns
+    -------
+    columns : dict
+        Column name -> list of values, in the column order of the table.
+    """
+    # Imported here, like pandas, to keep importing the core cheap for worker processes
+    from concurrent.futures import ProcessPoolExecutor
+
+    if not locations:
+        return extract_columns([], sizes)
+    number_of_partitions = min(len(locations), workers * partitions_per_worker)
+    bounds = [len(locations) * index // number_of_partitions for index in range(number_of_partitions + 1)]
+    if sizes is not None:
+        sizes = array("q", [UNKNOWN_SIZE if size is None else size for size in sizes])
+    partitions = [("\0".join(locations[start:end]), None if sizes is None else sizes[start:end])
+                  for start, end in zip(bounds, bounds[1:])]
+    columns = {name: [] for name in COLUMNS}
+    columns["Location"] = list(locations)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for partition_columns in executor.map(extract_partition, partitions):
+            for name, values in zip(COLUMNS[1:], partition_columns):
+                columns[name].extend(values)
+    return columns
+
+
+def parse_unique(values, format):
+    """
+    Parses date or time strings into datetime64 values, each distinct string once.
+
+    A catalog has at most a few thousand recording days and 86400 times of day, so
+    parsing only the distinct strings is much faster than parsing every row.
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), format=format, errors="coerce").to_numpy()
+    # Missing values have code -1, which takes the NaT appended at the end
+    return np.append(parsed, np.datetime64("NaT"))[codes]
+
+
+def local_datetimes(mtimes):
+    """
+    Converts modification times into local datetime64 values, truncated to seconds.
+
+    The offset of local time from UTC is looked up at the start and end of every day
+    that occurs; only the rows of days on which it changes, e.g. for daylight saving
+    time, are looked up one by one.
+
+    Parameters
+    ----------
+    mtimes : sequence of float
+        Seconds since the epoch; None or NaN for unknown times.
+
+    Returns
+    -------
+    local : np.ndarray of RECORDED_AT_DTYPE
+        The local times; NaT where the time is unknown.
+    """
+    import numpy as np
+
+    seconds = np.trunc(np.asarray(mtimes, dtype=np.float64))
+    known = ~np.isnan(seconds)
+    seconds = np.where(known, seconds, 0).astype(np.int64)
+    days, inverse = np.unique(seconds // 86400, return_inverse=True)
+    starts = np.array([time.localtime(day * 86400).tm_gmtoff for day in days.tolist()], dtype=np.int64)
+    ends = np.array([time.localtime(day * 86400 + 86399).tm_gmtoff for day in days.tolist()], dtype=np.int64)
+    offsets = starts[inverse]
+    changing = (starts != ends)[inverse]
+    offsets[changing] = [time.localtime(second).tm_gmtoff for second in seconds[changing].tolist()]
+    local = (seconds + offsets).astype(RECORDED_AT_DTYPE)
+    local[~known] = np.datetime64("NaT")
+    return local
+
+
+def recorded_at(dates, times, mtimes=None):
+    """
+    Combines the Date and Time strings into datetime64 values, all at once.
+
+    Parameters
+    ----------
+    dates, times : sequence of str
+        The "Date" and "Time" columns; missing values are None or NaN.
+    mtimes : sequence of float, optional
+        Modification times of the files as seconds since the epoch, e.g. from the walk.
+        Rows without a valid date and time get the modification time in local time,
+        truncated to seconds like the times in the paths.
+
+    Returns
+    -------
+    recorded_at : pd.Series
+        The recording times as RECORDED_AT_DTYPE, whichever rows have a date; NaT where
+        neither is known.
+    """
+    import numpy as np
+    import pandas as pd
+
+    index = dates.index if isinstance(dates, pd.Series) else None
+    time_of_day = parse_unique(times, TIME_FORMAT) - np.datetime64("1900-01-01")
+    recorded = (parse_unique(dates, DATE_FORMAT) + time_of_day).astype(RECORDED_AT_DTYPE)
+    if mtimes is not None:
+        missing = np.isnat(recorded)
+        if missing.any():
+            recorded[missing] = local_datetimes(np.asarray(mtimes, dtype=np.float64)[missing])
+    return pd.Series(recorded, index=index)
+
+
+def set_label_dtypes(df):
+    """
+    Gives the keyword label columns the dtypes the append_df_with_* stages give them.
+
+    The stages match Arrow-backed locations with Arrow kernels, whose labels keep the
+    dtype of "Location" even if no keyword was found, and build "Laboratory" as object,
+    so that "BioMEMS Lab" can be filled in.
+    """
+    from arrow_strings import is_arrow_backed
+
+    if len(df) and is_arrow_backed(df["Location"]):
+        for name in VOCABULARY_MATCHER.columns:
+            df[name] = df[name].astype(df["Location"].dtype)
+    df["Laboratory"] = df["Laboratory"].astype(object)
+    return df
+
+
+def to_dataframe(columns, mtimes=None):
+    """
+    Builds a pandas DataFrame from the columns of extract_columns.
+
+    "Recorded at" is added after "Time", see recorded_at. pandas is only imported here,
+    so that the extraction itself runs without it.
+    """
+    import pandas as pd
+
+    # Without rows every column would be float, which the string cleaning rules reject
+    df = set_label_dtypes(pd.DataFrame(columns, dtype=None if columns["Location"] else object))
+    df.insert(df.columns.get_loc("Time") + 1, "Recorded at", recorded_at(df["Date"], df["Time"], mtimes))
+    return df
+
+
+def rows_to_dataframe(columns, rows):
+    """
+    Builds the extracted table from rows stored with manifest.dataframe_rows.
+
+    Parameters
+    ----------
+    columns : list of str
+        The column names, in the order of the values of every row.
+    rows : sequence of tuple
+        The rows in the order of the table.
+
+    Returns
+    -------
+    df : pd.DataFrame
+        The table extract_dataframe gives for the same files, before cleaning.
+    """
+    import pandas as pd
+
+    return set_label_dtypes(pd.DataFrame({name: [row[index] for row in rows] for index, name in enumerate(columns)}))
+
+
+def extract_dataframe(locations, sizes=None, extractors=None, workers=1, mtimes=None):
+    """
+    Builds the table of a list of files in a single pass over the paths.
+
+    The result equals running create_pandas_df, append_df_with_size and every
+    append_df_with_* stage one after the other.
+
+    Parameters
+    ----------
+    locations : sequence of str
+        File paths.
+    sizes : sequence of int, optional
+        File sizes in bytes, in the order of `locations`.
+    extractors : list of (names, extractor), optional
+        Replacement for EXTRACTORS with the same columns, e.g. instrumented ones. They
+        run in this process only.
+    workers : int
+        Number of processes extracting partitions of the paths (see
+        extract_columns_parallel); the table is the same as with one.
+    mtimes : sequence of float, optional
+        Modification times of the files, the fallback of "Recorded at".
+
+    Returns
+    -------
+    df : pd.DataFrame
+        One row per file with all extracted columns, before cleaning.
+    """
+    if workers > 1 and extractors is None and len(locations) > 1:
+        return to_dataframe(extract_columns_parallel(locations, sizes, workers), mtimes)
+    return to_dataframe(extract_columns(locations, sizes, extractors), mtimes)
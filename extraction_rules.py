@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import re
+import time
+
+# The rules are defined in rules.json; the EXTRACTION_RULES environment variable points to
+# another rule file, also for worker processes.
+RULES_PATH = os.environ.get("EXTRACTION_RULES",
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json"))
+
+
+def load_rule_file(path):
+    """
+    Reads a rule file.
+
+    Returns
+    -------
+    rules : dict
+        The parsed rules.
+    digest : str
+        SHA-256 hex digest of the file content, which identifies the rule set.
+    """
+    with open(path, "rb") as file:
+        content = file.read()
+    return json.loads(content.decode("utf-8")), hashlib.sha256(content).hexdigest()
+
+
+def compile_pattern(spec):
+    """
+    Compiles a pattern of the rule file, {"pattern": ..., "flags": ["IGNORECASE", ...]}.
+    """
+    flags = 0
+    for name in spec.get("flags", []):
+        flags |= getattr(re, name)
+    return re.compile(spec["pattern"], flags)
+
+
+def vocabulary_groups(groups):
+    """
+    Converts the groups of a vocabulary into (label, keywords) pairs.
+
+    A group is either a list of keywords whose first keyword is the label, or a
+    {"label": ..., "keywords": [...]} object whose label is not a keyword.
+    """
+    return [(group["label"], group["keywords"]) if isinstance(group, dict) else (group[0], group)
+            for group in groups]
+
+
+def describe_rules(rules):
+    """
+    Renders the description of the extracted columns, the content of the Output file.
+    """
+    vocabularies = {column: vocabulary_groups(groups) for column, groups in rules["vocabularies"].items()}
+    lines = ["Parameter's info, extracted into the table", ""]
+    for column, description in rules["output_description"]:
+        if description is None:
+            description = "; ".join(label for label, keywords in vocabularies[column])
+        lines.append(f'"{column}": {description}')
+    return "\n".join(lines) + "\n"
+
+
+load_start, load_cpu_start = time.perf_counter(), time.process_time()
+RULES, RULES_DIGEST = load_rule_file(RULES_PATH)
+
+# Keyword vocabularies. Every column is a list of groups; the first keyword of a group is the
+# label written into the table, and the first group that matches a path wins.
+VOCABULARIES = {column: vocabulary_groups(groups) for column, groups in RULES["vocabularies"].items()}
+CULTURE_TYPE = RULES["vocabularies"]["Culture type"]
+CELLS_KIND = RULES["vocabularies"]["Cell's kind"]
+DRUG_APPLICATION = RULES["vocabularies"]["Drug application"]
+# "a.R." is a regular expression, the dots match any character
+RADIATION = RULES["vocabularies"]["Radiation"]
+LABORATORY = RULES["vocabularies"]["Laboratory"]
+PERFORMER = RULES["vocabularies"]["Performer"]
+NANOPARTICLES = RULES["vocabularies"]["Nanoparticles"]
+CONTROL = RULES["vocabularies"]["Control"]
+# Single-label columns: label and keywords
+STIMULATION = VOCABULARIES["Stimulation"][0]
+LASER = VOCABULARIES["Laser"][0]
+
+# Matched case-insensitively, only if the dose was not found by DRUG_DOSE_UM_PATTERN / DRUG_DOSE_UL_PATTERN
+DRUG_DOSE = RULES["drug_dose"]
+
+# Performers working at the BioMEMS Lab; their recordings get "BioMEMS Lab" if no laboratory was found
+LAB_PERFORMER_NAMES = RULES["lab_performer_names"]
+
+# Paths containing one of these keywords are removed by append_cleaning_function
+TRASH = RULES["trash"]
+
+# Quantity patterns
+PATTERNS = {name: compile_pattern(spec) for name, spec in RULES["patterns"].items()}
+DATE_AND_TIME_PATTERN = PATTERNS["date_and_time"]
+PITCH_PATTERN = PATTERNS["pitch"]
+ELECTRODE_PATTERN = PATTERNS["electrode"]
+DIV_PATTERN = PATTERNS["div"]
+DAP_PATTERN = PATTERNS["dap"]
+DRUG_DOSE_UM_PATTERN = PATTERNS["drug_dose_um"]
+DRUG_DOSE_UL_PATTERN = PATTERNS["drug_dose_ul"]
+RADIATION_DOSE_PATTERN = PATTERNS["radiation_dose"]
+AR_TIME_TARGET_PATTERN = PATTERNS["ar_time_target"]
+TIMEFRAME_PATTERN = PATTERNS["timeframe"]
+
+# (pattern, unit) lists of one quantity in different units, in order of precedence
+UNIT_PATTERNS = {name: [(compile_pattern(spec), spec["unit"]) for spec in specs]
+                 for name, specs in RULES["unit_patterns"].items()}
+SAMPLING_RATE_PATTERNS = UNIT_PATTERNS["sampling_rate"]
+BR_TIME_PATTERNS = UNIT_PATTERNS["br_time"]
+AR_TIME_PATTERNS = UNIT_PATTERNS["ar_time"]
+
+LOAD_SECONDS = time.perf_counter() - load_start
+LOAD_CPU_SECONDS = time.process_time() - load_cpu_start
+
+
+if __name__ == '__main__':
+    # Regenerates the Output file: python extraction_rules.py > Output
+    print(describe_rules(RULES), end="")
@@ -0,0 +1,129 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import pandas as pd
+
+# Status of a file whose stat succeeded
+STAT_OK = "ok"
+
+
+def stat_path(path: str) -> tuple:
+    """
+        Stats one file without raising.
+        Parameters
+        ----------
+        path : str
+            The file.
+        Returns
+        -------
+        stat : tuple
+            (size, mtime, inode, status); size, mtime and inode are None and status is
+            "<error type>: <message>" if the file vanished or can not be stat'ed.
+        """
+    try:
+        stat = os.stat(path)
+    except OSError as error:
+        return None, None, None, f"{type(error).__name__}: {error.strerror or error}"
+    return stat.st_size, stat.st_mtime, stat.st_ino, STAT_OK
+
+
+def stat_paths(paths, workers: int = 16, batch_size: int = 4096):
+    """
+        Stats files concurrently in a bounded thread pool.
+        The paths are consumed in batches of `batch_size`, so that at most one batch of
+        stats is in flight and a generator of paths is not read ahead; every stat is a
+        round-trip on a network share, and the threads overlap them.
+        Parameters
+        ----------
+        paths : iterable of str
+            The files, e.g. the paths main.scan_directory(..., stat_workers=N) lists before
+            it stats them here.
+        workers : int
+            Number of threads issuing stats (1 = serial).
+        batch_size : int
+            Number of paths stat'ed at a time.
+        Yields
+        -------
+        path, stat : str, tuple
+            Every path with its result of stat_path, in the order of `paths`.
+        """
+    iterator = iter(paths)
+    if workers <= 1:
+        for path in iterator:
+            yield path, stat_path(path)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            yield from zip(batch, executor.map(stat_path, batch))
+
+
+class StatCounter:
+    """
+    Counts the stats of a walk and their errors, to report stats per second.
+
+    Only the time spent in the walk is counted, so the rate is the same whether the
+    entries are collected first or consumed chunk by chunk.
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.errors = {}
+        self.seconds = 0.0
+
+    def count(self, entries):
+        """
+        Passes entries through, counting them and the statuses that are not "ok".
+
+        Parameters:
+        ----------
+        entries : iterable
+            Entries with a "status" attribute, e.g. main.FileEntry.
+        """
+        iterator = iter(entries)
+        while True:
+            start = time.perf_counter()
+            entry = next(iterator, None)
+            self.seconds += time.perf_counter() - start
+            if entry is None:
+                return
+            self.files += 1
+            if entry.status != STAT_OK:
+                kind = entry.status.split(":", 1)[0]
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+            yield entry
+
+    def report(self) -> dict:
+        """
+        Returns the number of "files", the "errors" per error type, the "seconds" spent
+        walking and stat'ing, and the "stats_per_second".
+        """
+        return {
+            "files": self.files,
+            "errors": dict(self.errors),
+            "seconds": self.seconds,
+            "stats_per_second": self.files / self.seconds if self.seconds else 0.0,
+        }
+
+
+def append_df_with_status(df: pd.DataFrame, entries: list) -> pd.DataFrame:
+    """
+        Appends a column called "Status" with the stat status of every file.
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The table of `entries`, one row per entry in the same order.
+        entries : list of FileEntry
+            The walked files.
+        Returns
+        -------
+        df : pd.DataFrame
+            The table with "Status": "ok", or the error of a file that vanished or could
+            not be stat'ed, whose size is empty.
+        """
+    df["Status"] = [entry.status for entry in entries]
+    return df
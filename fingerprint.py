@@ -0,0 +1,124 @@
+import hashlib
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import pandas as pd
+
+# Sampled blocks: head, tail, and one block at each of these fractions of the file size
+BLOCK_SIZE = 256 * 1024
+OFFSET_FRACTIONS = (0.25, 0.5, 0.75)
+
+
+def block_offsets(size: int) -> list:
+    """
+        Returns the sorted start offsets of the sampled blocks of a file of `size` bytes.
+        Small files are read completely.
+        """
+    if size <= BLOCK_SIZE * (len(OFFSET_FRACTIONS) + 2):
+        return list(range(0, size, BLOCK_SIZE))
+    offsets = {0, size - BLOCK_SIZE}
+    offsets.update(int(size * fraction) // BLOCK_SIZE * BLOCK_SIZE for fraction in OFFSET_FRACTIONS)
+    return sorted(offsets)
+
+
+def fingerprint_file(path: str) -> tuple:
+    """
+        Computes the partial-content fingerprint of a file.
+        The fingerprint hashes the file size and the head, tail and a few blocks at fixed
+        fractions of the file with BLAKE2b; the blocks are read through mmap, so at most
+        (len(OFFSET_FRACTIONS) + 2) * BLOCK_SIZE bytes are touched.
+        Parameters
+        ----------
+        path : str
+            The file.
+        Returns
+        -------
+        fingerprint : str or None
+            "<size in hex>-<digest>", None if the file can not be read.
+        bytes_read : int
+            Number of bytes hashed.
+        """
+    try:
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+            bytes_read = 0
+            if size:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    for offset in block_offsets(size):
+                        block = mapped[offset:offset + BLOCK_SIZE]
+                        digest.update(block)
+                        bytes_read += len(block)
+    except (OSError, ValueError):
+        return None, 0
+    return f"{size:x}-{digest.hexdigest()}", bytes_read
+
+
+def fingerprint_files(paths: list, workers: int = 8) -> list:
+    """
+        Fingerprints many files on a thread pool; hashing and page faults release the GIL.
+        Returns
+        -------
+        results : list of tuple
+            (fingerprint, bytes_read) of every path, in the order of `paths`.
+        """
+    if workers <= 1:
+        return [fingerprint_file(path) for path in paths]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fingerprint_file, paths))
+
+
+def append_df_with_fingerprint(df: pd.DataFrame, workers: int = 8, groups: Optional[dict] = None):
+    """
+        Adds the "Fingerprint" and "Duplicate group" columns.
+        Rows with the same fingerprint, i.e. copies of the same recording, get the same
+        duplicate group; groups are numbered in the order of their first row.
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The table with a "Location" column.
+        workers : int
+            Number of threads reading files.
+        groups : dict, optional
+            Fingerprint -> group of earlier chunks; it is updated in place, so that copies in
+            different chunks get the same group.
+        Returns
+        -------
+        df : pd.DataFrame
+            The table with the two columns; unreadable files have neither.
+        bytes_read : list of int
+            Bytes hashed per file.
+        """
+    if groups is None:
+        groups = {}
+    results = fingerprint_files(df["Location"].tolist(), workers)
+    fingerprints = [fingerprint for fingerprint, bytes_read in results]
+    duplicate_groups = []
+    for fingerprint in fingerprints:
+        if fingerprint is None:
+            duplicate_groups.append(None)
+        else:
+            duplicate_groups.append(groups.setdefault(fingerprint, len(groups)))
+    df["Fingerprint"] = fingerprints
+    df["Duplicate group"] = pd.array(duplicate_groups, dtype="Int64")
+    return df, [bytes_read for fingerprint, bytes_read in results]
+
+
+def duplicate_report(df: pd.DataFrame) -> dict:
+    """
+        Summarizes the duplicates of a fingerprinted table.
+        Returns
+        -------
+        report : dict
+            Number of "groups" with more than one file, "files" in such groups, and the
+            "redundant_gb" held by all copies but one of every group.
+        """
+    sizes = df.groupby("Duplicate group")["Size, Gb"].agg(["count", "first"])
+    duplicated = sizes[sizes["count"] > 1]
+    return {
+        "groups": len(duplicated),
+        "files": int(duplicated["count"].sum()),
+        "redundant_gb": float(((duplicated["count"] - 1) * duplicated["first"]).sum()),
+    }
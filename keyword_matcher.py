@@ -0,0 +1,305 @@
+import re
+import sys
+from collections import OrderedDict
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+REGEX_CHARACTERS = frozenset(".^$*+?{}[]\\|()")
+# Separators of Windows and POSIX paths; find_hits splits paths at the last one
+PATH_SEPARATORS = ("/", "\\")
+
+
+def is_regex(keyword):
+    """
+    Returns True if a keyword contains regular expression syntax, e.g. "a.R.".
+    """
+    return any(character in REGEX_CHARACTERS for character in keyword)
+
+
+def label_groups(groups):
+    """
+    Converts keyword groups whose first keyword is the label into (label, keywords) pairs.
+    """
+    return [(group[0], group) for group in groups]
+
+
+class LRUCache:
+    """
+    Dictionary with a bounded number of entries that evicts the least recently used one.
+
+    Counts hits and misses and keeps an estimate of the memory held by keys and values.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of entries. 0 disables the cache.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        if key in self.entries:
+            self.nbytes -= sys.getsizeof(key) + sys.getsizeof(self.entries[key])
+            self.entries.move_to_end(key)
+        self.entries[key] = value
+        self.nbytes += sys.getsizeof(key) + sys.getsizeof(value)
+        while len(self.entries) > self.maxsize:
+            old_key, old_value = self.entries.popitem(last=False)
+            self.nbytes -= sys.getsizeof(old_key) + sys.getsizeof(old_value)
+            self.evictions += 1
+
+    def info(self):
+        """
+        Returns the hit counts, hit rate, size and estimated memory of the cache as a dict.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+            "maxsize": self.maxsize,
+            "evictions": self.evictions,
+            "memory_bytes": self.nbytes,
+        }
+
+
+class KeywordMatcher:
+    """
+    Finds the labels of several keyword vocabularies in one scan of a text.
+
+    All plain keywords of all vocabularies are compiled into one Aho-Corasick automaton,
+    which reports every occurrence of every keyword, overlapping ones included, in a
+    single pass over the text. Keywords with regular expression syntax are searched
+    separately. For every vocabulary, the first group with a keyword in the text wins,
+    like the chained str.contains / combine_first of the append_df_with_* functions.
+
+    Uses the pyahocorasick package if it is installed, and a pure Python automaton
+    otherwise.
+
+    Thousands of files share the same directories. Since no plain keyword contains a
+    path separator, the keywords of a path are those of its parent directory plus those
+    of its file name; the keywords of every directory are kept in an LRU cache, so each
+    distinct directory is scanned once.
+
+    Parameters
+    ----------
+    vocabularies : dict
+        Column name -> list of (label, keywords) groups in order of precedence.
+        Keywords are case-sensitive.
+    directory_cache_size : int
+        Maximum number of directories kept in the cache. 0 scans every path completely.
+    """
+
+    def __init__(self, vocabularies, directory_cache_size=65536):
+        self.columns = list(vocabularies)
+        self.labels = []
+        hits_by_keyword = {}
+        regex_keywords = {}
+        for column_index, column in enumerate(self.columns):
+            column_labels = []
+            for group_index, (label, keywords) in enumerate(vocabularies[column]):
+                column_labels.append(label)
+                hit = (column_index, group_index)
+                for keyword in keywords:
+                    if is_regex(keyword):
+                        regex_keywords.setdefault(hit, []).append(keyword)
+                    else:
+                        hits_by_keyword.setdefault(keyword, []).append(hit)
+            self.labels.append(column_labels)
+
+        self.keywords = list(hits_by_keyword)
+        self.keyword_hits = [tuple(hits_by_keyword[keyword]) for keyword in self.keywords]
+        self.regex_hits = [(re.compile('|'.join(keywords)).search, hit) for hit, keywords in regex_keywords.items()]
+        # Splitting paths is only exact if no keyword spans a separator
+        if any(separator in keyword for keyword in self.keywords for separator in PATH_SEPARATORS):
+            directory_cache_size = 0
+        self.directory_cache = LRUCache(directory_cache_size)
+
+        if ahocorasick is not None:
+            self.automaton = ahocorasick.Automaton()
+            for keyword_index, keyword in enumerate(self.keywords):
+                self.automaton.add_word(keyword, keyword_index)
+            self.automaton.make_automaton()
+            self.find_keywords = self.find_keywords_ahocorasick
+        else:
+            self.transitions, self.outputs = build_automaton(self.keywords)
+            self.find_keywords = self.find_keywords_python
+
+    def find_keywords_python(self, text):
+        """
+        Returns the indices (into self.keywords) of all keywords occurring in a text.
+        """
+        transitions = self.transitions
+        outputs = self.outputs
+        found = set()
+        state = 0
+        for character in text:
+            state = transitions[state].get(character, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+    def find_keywords_ahocorasick(self, text):
+        """
+        Returns the indices (into self.keywords) of all keywords occurring in a text.
+        """
+        return {keyword_index for end, keyword_index in self.automaton.iter(text)}
+
+    def find_keyword_hits(self, text):
+        """
+        Returns the (column index, group index) pairs of the plain keywords in a text.
+        """
+        hits = set()
+        keyword_hits = self.keyword_hits
+        for keyword_index in self.find_keywords(text):
+            hits.update(keyword_hits[keyword_index])
+        return hits
+
+    def find_directory_hits(self, directory):
+        """
+        Returns the plain keyword hits of a directory path, using and filling the cache.
+        """
+        hits = self.directory_cache.get(directory)
+        if hits is None:
+            split = max(directory.rfind("/"), directory.rfind("\\"))
+            if split < 0:
+                hits = frozenset(self.find_keyword_hits(directory))
+            else:
+                hits = self.find_directory_hits(directory[:split]) | self.find_keyword_hits(directory[split + 1:])
+            self.directory_cache.put(directory, hits)
+        return hits
+
+    def find_hits(self, text):
+        """
+        Returns the (column index, group index) pairs of all groups with a keyword in a text.
+        """
+        split = max(text.rfind("/"), text.rfind("\\"))
+        if split >= 0 and self.directory_cache.maxsize > 0:
+            hits = self.find_keyword_hits(text[split + 1:])
+            hits.update(self.find_directory_hits(text[:split]))
+        else:
+            hits = self.find_keyword_hits(text)
+        for search, hit in self.regex_hits:
+            if hit not in hits and search(text):
+                hits.add(hit)
+        return hits
+
+    def resolve(self, hits):
+        """
+        Applies the first-group-wins rule to a set of hits.
+
+        Returns
+        -------
+        labels : list
+            The winning label of every column, None where no group was found.
+        """
+        best = [None] * len(self.columns)
+        for column_index, group_index in hits:
+            if best[column_index] is None or group_index < best[column_index]:
+                best[column_index] = group_index
+        return [None if group_index is None else column_labels[group_index]
+                for group_index, column_labels in zip(best, self.labels)]
+
+    def match(self, text):
+        """
+        Finds the label of every vocabulary in a text.
+
+        Parameters
+        ----------
+        text : str
+            Typically a file path.
+
+        Returns
+        -------
+        labels : list
+            The winning label of every column in the order of self.columns, None where
+            no keyword of the column occurs.
+        """
+        return self.resolve(self.find_hits(text))
+
+    def match_column(self, texts, column):
+        """
+        Finds the label of one vocabulary in every text.
+
+        Parameters
+        ----------
+        texts : iterable of str
+            Typically the "Location" column.
+        column : str
+            Name of the vocabulary.
+
+        Returns
+        -------
+        labels : list
+            The winning label, or None, for every text.
+        """
+        column_index = self.columns.index(column)
+        return [self.match(text)[column_index] for text in texts]
+
+
+def build_automaton(keywords):
+    """
+    Builds the Aho-Corasick automaton of a list of keywords as a deterministic state machine.
+
+    Parameters
+    ----------
+    keywords : list of str
+        The keywords; their indices are reported as outputs.
+
+    Returns
+    -------
+    transitions : list of dict
+        For every state, character -> next state. Characters missing from the dict lead
+        back to the root state 0.
+    outputs : list of tuple
+        For every state, the indices of the keywords ending there, including the ones
+        reached through failure links.
+    """
+    goto = [{}]
+    outputs = [[]]
+    for keyword_index, keyword in enumerate(keywords):
+        state = 0
+        for character in keyword:
+            if character not in goto[state]:
+                goto.append({})
+                outputs.append([])
+                goto[state][character] = len(goto) - 1
+            state = goto[state][character]
+        outputs[state].append(keyword_index)
+
+    # Breadth-first: the failure state of a state is always computed before the state itself
+    transitions = [None] * len(goto)
+    transitions[0] = dict(goto[0])
+    queue = []
+    failure = [0] * len(goto)
+    for state in goto[0].values():
+        queue.append(state)
+    for state in queue:
+        transitions[state] = dict(transitions[failure[state]])
+        transitions[state].update(goto[state])
+        outputs[state] = outputs[state] + outputs[failure[state]]
+        for character, next_state in goto[state].items():
+            failure[next_state] = transitions[failure[state]].get(character, 0)
+            queue.append(next_state)
+    return transitions, [tuple(output) for output in outputs]
@@ -1,49 +1,553 @@
 import pandas as pd
+import argparse
 import os
 import time
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+
+from append_functions import (append_cleaning_function, append_df_with_ar_time, append_df_with_br_time,
+                              append_df_with_cells_kind, append_df_with_control, append_df_with_culture_type,
+                              append_df_with_date_and_time, append_df_with_div_dap, append_df_with_drug_application,
+                              append_df_with_drug_dose, append_df_with_electrode, append_df_with_lab,
+                              append_df_with_laser, append_df_with_nano, append_df_with_performer,
+                              append_df_with_pitch, append_df_with_rad_dose, append_df_with_radiation,
+                              append_df_with_recording_sys, append_df_with_sampling_rate, append_df_with_size,
+                              append_df_with_stimulation, append_df_with_timeframe)
+import extraction_rules as rules
+from arrow_strings import STRING_DTYPES, to_string_dtype
+from extraction_core import (CSV_DATE_FORMAT, EXTRACTORS, MATCHER_STARTUP, VOCABULARY_MATCHER, extract_dataframe,
+                             rows_to_dataframe)
+from file_stats import STAT_OK, StatCounter, append_df_with_status, stat_path, stat_paths
+from manifest import INTEGER_COLUMNS, extract_entries_incremental, load_manifest, save_manifest
+from fingerprint import append_df_with_fingerprint, duplicate_report
+from profiling import CAPTURE_MODES, Profiler
+from recording_headers import append_df_with_headers, header_report
+from rule_statistics import RuleStatistics, statistics_report
+from sqlite_catalog import write_sqlite
+from typed_catalog import to_typed_catalog, write_catalog
 
 st = time.time()
 
 
-def get_list_of_files(path, file_type):
+# status is "ok", or the error of a file that vanished or can not be stat'ed; its size, mtime
+# and inode are None
+FileEntry = namedtuple("FileEntry", ["path", "size", "mtime", "inode", "status"], defaults=[STAT_OK])
+
+# Order of the extraction stages after "Size, Gb"; it defines the column order of the table
+APPEND_STAGES = [
+    append_df_with_date_and_time,
+    append_df_with_recording_sys,
+    append_df_with_pitch,
+    append_df_with_sampling_rate,
+    append_df_with_electrode,
+    append_df_with_culture_type,
+    append_df_with_cells_kind,
+    append_df_with_div_dap,
+    append_df_with_performer,
+    append_df_with_lab,
+    append_df_with_drug_application,
+    append_df_with_drug_dose,
+    append_df_with_radiation,
+    append_df_with_rad_dose,
+    append_df_with_br_time,
+    append_df_with_ar_time,
+    append_df_with_nano,
+    append_df_with_laser,
+    append_df_with_timeframe,
+    append_df_with_stimulation,
+    append_df_with_control,
+]
+
+
+def normalize_extensions(file_type):
     """
-    Generates a list with all file paths from a given path.
+    Builds a lookup set of lower-cased extensions.
+
+    Parameters:
+    ----------
+    file_type : str, list of str or None
+        The extension(s) to match. None matches every file.
+
+    Returns:
+    -------
+    extensions : set of str or None
+        The lower-cased extensions, or None if every extension is accepted.
+    """
+    if file_type is None:
+        return None
+    if isinstance(file_type, str):
+        file_type = [file_type]
+    return {extension.lower() for extension in file_type}
+
+
+def entry_from_dir_entry(dir_entry):
+    """
+    Converts an os.DirEntry into a FileEntry using its cached stat data.
+
+    Parameters:
+    ----------
+    dir_entry : os.DirEntry
+        The entry returned by os.scandir.
+
+    Returns:
+    -------
+    entry : FileEntry
+        The path together with size in bytes, modification time and inode. A file that
+        vanished since it was listed, or can not be stat'ed, gets the error as status
+        instead of aborting the walk.
+    """
+    try:
+        stat = dir_entry.stat()
+    except OSError as error:
+        return FileEntry(dir_entry.path, None, None, None, f"{type(error).__name__}: {error.strerror or error}")
+    return FileEntry(dir_entry.path, stat.st_size, stat.st_mtime, dir_entry.inode())
+
+
+def entry_from_path(path):
+    """
+    Stats a path into a FileEntry, with the error as status if the stat fails.
+    """
+    return FileEntry(path, *stat_path(path))
+
+
+def scan_directory(path, file_type=None, walk_workers=1, stat_workers=0):
+    """
+    Walks a directory tree iteratively with os.scandir and yields the matching files.
+
+    Directory entries are visited in name order, depth first, so the output is
+    deterministic. Every file is stat'ed at most once and the result travels with
+    the path, so later stages do not have to query the file system again.
 
     Parameters:
     ----------
     path : str
         Either a path to a single file or a directory path.
-    file_type : str or list of str
-        The extension(s) of the file(s) to retrieve. Can be a single extension or a list of extensions.
+    file_type : str, list of str or None
+        The extension(s) of the files to retrieve, matched exactly and case-insensitively.
+        None retrieves every file.
+    walk_workers : int
+        Number of threads listing directories. With more than one, subdirectories are
+        listed concurrently (see scan_directory_concurrent); the output is the same.
+    stat_workers : int
+        If not 0, the directories are only listed and the files are stat'ed afterwards
+        in batches by this many threads (see file_stats.stat_paths); the output is the
+        same. Otherwise every file is stat'ed as it is listed.
+
+    Yields:
+    -------
+    entry : FileEntry
+        The path, size in bytes, modification time and inode of each matching file.
+    """
+    extensions = normalize_extensions(file_type)
+
+    if not os.path.isdir(path):
+        yield entry_from_path(path)
+        return
+
+    if stat_workers:
+        # List only; DirEntry.is_dir() uses the file type of the listing and does not stat
+        if walk_workers > 1:
+            paths = scan_directory_concurrent(path, extensions, walk_workers, make_entry=get_dir_entry_path)
+        else:
+            paths = list_directory_tree(path, extensions, get_dir_entry_path)
+        for file_path, stat in stat_paths(paths, stat_workers):
+            yield FileEntry(file_path, *stat)
+        return
+
+    if walk_workers > 1:
+        yield from scan_directory_concurrent(path, extensions, walk_workers)
+        return
+
+    yield from list_directory_tree(path, extensions, entry_from_dir_entry)
+
+
+def walk_order_key(path):
+    """
+    Sort key that orders paths like scan_directory yields them.
+
+    The walk visits the entries of every directory in name order, depth first, which
+    is the order of the tuples of path components.
+
+    Parameters:
+    ----------
+    path : str
+        A file path below the walked root.
 
     Returns:
     -------
-    list_of_files : list of str
-        A list of file paths in the chosen directory and its subdirectories.
+    key : tuple of str
+        The components of the normalized path.
+    """
+    return tuple(os.path.normpath(path).split(os.sep))
+
+
+def get_dir_entry_path(dir_entry):
+    """
+    Returns the path of an os.DirEntry, for walks that stat the files later.
+    """
+    return dir_entry.path
+
+
+def list_directory_tree(path, extensions, make_entry):
+    """
+    Walks a directory tree serially in depth-first name order, see scan_directory.
+
+    Parameters:
+    ----------
+    path : str
+        The root directory.
+    extensions : set of str or None
+        Lower-cased extensions as returned by normalize_extensions.
+    make_entry : callable
+        Converts the os.DirEntry of a matching file into the yielded item.
+
+    Yields:
+    -------
+    item : object
+        make_entry of each matching file.
     """
-    all_files = []
 
-    if os.path.isdir(path):
-        extension_list = []
-        if isinstance(file_type, str):
-            extension_list.append(file_type)
-        elif isinstance(file_type, list):
-            extension_list = file_type
+    stack = [path]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            with os.scandir(item) as iterator:
+                children = sorted(iterator, key=lambda dir_entry: dir_entry.name)
+            # Reversed, so that the first child is popped first
+            stack.extend(reversed(children))
+        elif item.is_dir():
+            stack.append(item.path)
+        elif extensions is None or os.path.splitext(item.name)[1].lower() in extensions:
+            yield make_entry(item)
+
+
+def scan_directory_concurrent(path, extensions, walk_workers, make_entry=entry_from_dir_entry):
+    """
+    Walks a directory tree listing the subdirectories concurrently in a bounded thread pool.
 
-        list_of_files = os.listdir(path)
+    Each listing task lists one directory, stats its matching files and submits a task
+    for every subdirectory it finds. The consumer expands the finished listings in the
+    same depth-first name order as scan_directory, so the result is identical to the
+    serial walk while the round-trips to a network share overlap.
 
-        for entry in list_of_files:
-            full_path = os.path.join(path, entry)
-            if os.path.isdir(full_path):
-                all_files.extend(get_list_of_files(full_path, extension_list))
+    Parameters:
+    ----------
+    path : str
+        The root directory.
+    extensions : set of str or None
+        Lower-cased extensions as returned by normalize_extensions.
+    walk_workers : int
+        Maximum number of directories listed at the same time.
+    make_entry : callable
+        Converts the os.DirEntry of a matching file into the yielded item.
+
+    Yields:
+    -------
+    entry : FileEntry
+        The path, size in bytes, modification time and inode of each matching file.
+    """
+    with ThreadPoolExecutor(max_workers=walk_workers) as executor:
+
+        def list_directory(directory):
+            with os.scandir(directory) as iterator:
+                children = sorted(iterator, key=lambda dir_entry: dir_entry.name)
+            items = []
+            for child in children:
+                if child.is_dir():
+                    items.append(executor.submit(list_directory, child.path))
+                elif extensions is None or os.path.splitext(child.name)[1].lower() in extensions:
+                    items.append(make_entry(child))
+            return items
+
+        stack = [executor.submit(list_directory, path)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, Future):
+                stack.extend(reversed(item.result()))
             else:
-                name, extension = os.path.splitext(full_path)
-                if extension_list is None or any(extension in s for s in extension_list):
-                    all_files.append(full_path)
+                yield item
+
+
+def scan_directory_incremental(path, file_type, manifest):
+    """
+    Walks a directory tree like scan_directory, reusing the listings stored in a manifest.
+
+    A directory is only listed again if its modification time differs from the one
+    recorded in the manifest. Files are still stat'ed, since modifying a file does not
+    change the modification time of its directory. The manifest's directory listings
+    are replaced by the ones of this walk, so deleted directories are dropped.
+
+    Parameters:
+    ----------
+    path : str
+        Either a path to a single file or a directory path.
+    file_type : str, list of str or None
+        The extension(s) of the files to retrieve, matched exactly and case-insensitively.
+    manifest : manifest.Manifest
+        The manifest of the previous run.
+
+    Yields:
+    -------
+    entry : FileEntry
+        The path, size in bytes, modification time and inode of each matching file.
+    """
+    extensions = normalize_extensions(file_type)
+
+    if not os.path.isdir(path):
+        yield entry_from_path(path)
+        return
+
+    directories = {}
+    manifest.listed = 0
+    stack = [path]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            mtime_ns = os.stat(item).st_mtime_ns
+            cached = manifest.directories.get(item)
+            if cached is not None and cached[0] == mtime_ns:
+                children = cached[1]
+            else:
+                with os.scandir(item) as iterator:
+                    children = sorted((dir_entry.name, dir_entry.is_dir()) for dir_entry in iterator)
+                manifest.listed += 1
+            directories[item] = (mtime_ns, children)
+            stack.extend((os.path.join(item, name), is_dir) for name, is_dir in reversed(children))
+        else:
+            child_path, is_dir = item
+            if is_dir:
+                stack.append(child_path)
+            elif extensions is None or os.path.splitext(child_path)[1].lower() in extensions:
+                yield entry_from_path(child_path)
+    manifest.directories = directories
+
+
+def extract_entries(entries, extractors=None, workers=1, string_dtype=None):
+    """
+    Builds the table of a list of walked files with the single-pass extraction engine.
+
+    Parameters:
+    ----------
+    entries : list of FileEntry
+        The files as yielded by scan_directory.
+    extractors : list of (names, extractor), optional
+        Replacement for extraction_core.EXTRACTORS, e.g. instrumented ones.
+    workers : int
+        Number of processes extracting partitions of the files; the table is the same.
+    string_dtype : str, optional
+        Dtype of the string columns, one of arrow_strings.STRING_DTYPES; by default the
+        one pandas infers.
+
+    Returns:
+    -------
+    df : pandas DataFrame
+        One row per file with all extracted columns, before cleaning.
+    """
+    df = extract_dataframe([entry.path for entry in entries], [entry.size for entry in entries], extractors, workers,
+                           [entry.mtime for entry in entries])
+    return to_string_dtype(df, string_dtype)
+
+
+def extract_entries_legacy(entries, profiler=None, string_dtype=None):
+    """
+    Builds the table of a list of walked files by running every append_df_with_* stage.
+
+    Gives the same table as extract_entries, one column at a time.
+
+    Parameters:
+    ----------
+    entries : list of FileEntry
+        The files as yielded by scan_directory.
+    profiler : Profiler, optional
+        Records every stage under the name of its function.
+    string_dtype : str, optional
+        Dtype of the string columns, see extract_entries. With Arrow-backed strings the
+        keyword and regular expression stages run on Arrow kernels.
+
+    Returns:
+    -------
+    df : pandas DataFrame
+        One row per file with all extracted columns, before cleaning.
+    """
+    csv_data_frame = to_string_dtype(create_pandas_df([entry.path for entry in entries]), string_dtype)
+    sizes = [entry.size for entry in entries]
+    # Data from the walk that single stages take
+    stage_arguments = {append_df_with_date_and_time: {"mtimes": [entry.mtime for entry in entries]}}
+    if profiler is None:
+        csv_data_frame = append_df_with_size(csv_data_frame, sizes=sizes)
+        for append_function in APPEND_STAGES:
+            csv_data_frame = append_function(csv_data_frame, **stage_arguments.get(append_function, {}))
+        return to_string_dtype(csv_data_frame, string_dtype)
+    csv_data_frame = profiler.run(append_df_with_size.__name__, append_df_with_size, csv_data_frame, sizes=sizes)
+    for append_function in APPEND_STAGES:
+        csv_data_frame = profiler.run(append_function.__name__, append_function, csv_data_frame,
+                                      **stage_arguments.get(append_function, {}))
+    return to_string_dtype(csv_data_frame, string_dtype)
+
+
+def iterate_chunks(iterable, chunk_size):
+    """
+    Splits an iterable into lists of at most chunk_size items without consuming it ahead.
+
+    Parameters:
+    ----------
+    iterable : iterable
+        E.g. the generator of scan_directory.
+    chunk_size : int
+        Maximum number of items per chunk.
+
+    Yields:
+    -------
+    chunk : list
+        The next items.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def stream_catalog(entries, csv_path, chunk_size, extract_function=extract_entries, read_headers=False,
+                   header_workers=4, sqlite_path=None, fingerprint_workers=0, status=False, rule_statistics=None):
+    """
+    Extracts, cleans and writes the table chunk by chunk.
+
+    Only one chunk of files is held in memory at a time; every cleaned chunk is
+    appended to the .csv file right away, so an interrupted run keeps the rows written
+    so far. The file equals the one of a run over all files at once: the header is
+    written once, the row index continues from chunk to chunk, and whole-number columns
+    are written as floats in every chunk, as they are in a full run as soon as one value
+    is missing.
+
+    Parameters:
+    ----------
+    entries : iterable of FileEntry
+        The files, typically the generator of scan_directory.
+    csv_path : str
+        Output .csv file; it is overwritten.
+    chunk_size : int
+        Number of files extracted at a time.
+    extract_function : callable
+        Builds the table of a list of entries, e.g. extract_entries.
+    read_headers : bool
+        Fill sampling rate, electrodes and timeframe from the file headers.
+    header_workers : int
+        Number of threads reading file headers.
+    sqlite_path : str, optional
+        SQLite catalog into which every chunk is upserted. Rows of files that are gone
+        are not deleted in this mode.
+    fingerprint_workers : int
+        If not 0, add the fingerprint and duplicate group of every file, read with this
+        many threads; duplicate groups span chunks.
+    status : bool
+        Add the "Status" column with the stat status of every file.
+    rule_statistics : rule_statistics.RuleStatistics, optional
+        Counts the rule and keyword hits of every chunk.
+
+    Returns:
+    -------
+    counts : dict
+        Number of "files", "chunks" and written "rows", and the removed rows per
+        cleaning rule under "removed".
+    """
+    counts = {"files": 0, "chunks": 0, "rows": 0, "removed": {}}
+    duplicate_groups = {}
+    for chunk in iterate_chunks(entries, chunk_size):
+        if rule_statistics is not None:
+            rule_statistics.add(entry.path for entry in chunk)
+        csv_data_frame = extract_function(chunk)
+        if status:
+            csv_data_frame = append_df_with_status(csv_data_frame, chunk)
+        csv_data_frame, removed_counts = append_cleaning_function(csv_data_frame, return_counts=True)
+        if read_headers:
+            csv_data_frame, headers = append_df_with_headers(csv_data_frame, workers=header_workers)
+        if fingerprint_workers:
+            csv_data_frame, bytes_read = append_df_with_fingerprint(csv_data_frame, fingerprint_workers,
+                                                                    duplicate_groups)
+        for column in INTEGER_COLUMNS:
+            csv_data_frame[column] = csv_data_frame[column].astype("float64")
+        csv_data_frame.index = range(counts["rows"], counts["rows"] + len(csv_data_frame))
+        first_chunk = counts["chunks"] == 0
+        csv_data_frame.to_csv(csv_path, mode="w" if first_chunk else "a", header=first_chunk,
+                              date_format=CSV_DATE_FORMAT)
+        if sqlite_path:
+            write_sqlite(csv_data_frame, sqlite_path)
+
+        counts["files"] += len(chunk)
+        counts["chunks"] += 1
+        counts["rows"] += len(csv_data_frame)
+        for rule, count in removed_counts.items():
+            counts["removed"][rule] = counts["removed"].get(rule, 0) + count
+    if counts["chunks"] == 0:
+        csv_data_frame = extract_function([])
+        if status:
+            csv_data_frame = append_df_with_status(csv_data_frame, [])
+        append_cleaning_function(csv_data_frame).to_csv(csv_path, date_format=CSV_DATE_FORMAT)
+    return counts
+
+
+def catalog_from_rows(rows, columns, return_counts=False):
+    """
+    Builds the cleaned table from extracted rows, e.g. the ones of a live or partial catalog.
+
+    The rows are stored before cleaning, since cleaning drops rows by rules that look at
+    the whole table; sorted in the order of the walk and cleaned together, they give the
+    table of a full run over the same files.
+
+    Parameters:
+    ----------
+    rows : dict
+        File path -> row as stored by manifest.dataframe_rows.
+    columns : list of str
+        The column names of the rows.
+    return_counts : bool
+        Also return the removed rows per cleaning rule, see append_cleaning_function.
+
+    Returns:
+    -------
+    df : pandas DataFrame
+        The cleaned table, and the removed rows per cleaning rule if return_counts is True.
+    """
+    if rows:
+        paths = sorted(rows, key=walk_order_key)
+        df = rows_to_dataframe(columns, [rows[path] for path in paths])
     else:
-        all_files.append(path)
+        df = extract_entries([])
+        if "Status" in columns:
+            df = append_df_with_status(df, [])
+    return append_cleaning_function(df, return_counts=return_counts)
 
-    return all_files
+
+def write_csv_atomically(df, csv_path):
+    """
+    Writes the table to a temporary file and renames it over `csv_path`, so that readers
+    never see a half-written catalog.
+    """
+    temporary_path = f"{csv_path}.{os.getpid()}.tmp"
+    df.to_csv(temporary_path, date_format=CSV_DATE_FORMAT)
+    os.replace(temporary_path, csv_path)
+
+
+def get_list_of_files(path, file_type):
+    """
+    Generates a list with all file paths from a given path.
+
+    Parameters:
+    ----------
+    path : str
+        Either a path to a single file or a directory path.
+    file_type : str or list of str
+        The extension(s) of the file(s) to retrieve. Can be a single extension or a list of extensions.
+
+    Returns:
+    -------
+    list_of_files : list of str
+        A list of file paths in the chosen directory and its subdirectories.
+    """
+    return [entry.path for entry in scan_directory(path, file_type)]
 
 
 def create_pandas_df(list_of_files):
@@ -105,96 +609,244 @@ def get_all_extensions_in_directory(list_of_files):
     return list(extensions)
 
 
-if __name__ == '__main__':
-
-    path = "C:/Users\Diana\Desktop\Studium\Master_project\Data_from_W8"
-
-    norm_path = os.path.normpath(path)
-    list_of_files = get_list_of_files(norm_path, None)
-    #print(list_of_files)
-    #print(f"Total Number of files {len(list_of_files)}:")
-    #all_extensions = get_all_extensions_in_directory(list_of_files)
-    #print(f"All extensions in Working Directory: {all_extensions}")
-    list_of_files = get_list_of_files(norm_path, [".brw", ".dat"])
-    print(f"Number of object .brw and .dat: {len(list_of_files)}")
-
-
-    # Write into .csv
-    csv_data_frame = create_pandas_df(list_of_files)
-    csv_path = "C:/Users/Diana/Info_extraction/list_of_files.csv"
-
-
-    from append_functions import append_df_with_size
-    csv_data_frame = append_df_with_size(csv_data_frame)
-
-    from append_functions import append_df_with_date_and_time
-    csv_data_frame = append_df_with_date_and_time(csv_data_frame)
-
-    from append_functions import append_df_with_recording_sys
-    csv_data_frame = append_df_with_recording_sys(csv_data_frame)
-
-    from append_functions import append_df_with_pitch
-    csv_data_frame = append_df_with_pitch(csv_data_frame)
-
-    from append_functions import append_df_with_sampling_rate
-    csv_data_frame = append_df_with_sampling_rate(csv_data_frame)
-
-    from append_functions import append_df_with_electrode
-    csv_data_frame = append_df_with_electrode(csv_data_frame)
-
-    from append_functions import append_df_with_culture_type
-    csv_data_frame = append_df_with_culture_type(csv_data_frame)
-
-    from append_functions import append_df_with_cells_kind
-    csv_data_frame = append_df_with_cells_kind(csv_data_frame)
-
-    from append_functions import append_df_with_div_dap
-    csv_data_frame = append_df_with_div_dap(csv_data_frame)
-
-    from append_functions import append_df_with_performer
-    csv_data_frame = append_df_with_performer(csv_data_frame)
-
-    from append_functions import append_df_with_lab
-    csv_data_frame = append_df_with_lab(csv_data_frame)
-
-    from append_functions import append_df_with_drug_application
-    csv_data_frame = append_df_with_drug_application(csv_data_frame)
-
-    from append_functions import append_df_with_drug_dose
-    csv_data_frame = append_df_with_drug_dose(csv_data_frame)
-
-    from append_functions import append_df_with_radiation
-    csv_data_frame = append_df_with_radiation(csv_data_frame)
-
-    from append_functions import append_df_with_rad_dose
-    csv_data_frame = append_df_with_rad_dose(csv_data_frame)
-
-    from append_functions import append_df_with_br_time
-    csv_data_frame = append_df_with_br_time(csv_data_frame)
+def print_stat_report(report):
+    """
+    Prints the stat throughput of a walk and its errors by type.
 
-    from append_functions import append_df_with_ar_time
-    csv_data_frame = append_df_with_ar_time(csv_data_frame)
+    Parameters:
+    ----------
+    report : dict
+        As returned by file_stats.StatCounter.report.
+    """
+    errors = ", ".join(f"{kind}: {count}" for kind, count in report["errors"].items()) or "none"
+    print(f"Stat'ed {report['files']} files in {report['seconds']:.2f} s "
+          f"({report['stats_per_second']:.0f} stats/s), errors: {errors}")
 
-    from append_functions import append_df_with_nano
-    csv_data_frame = append_df_with_nano(csv_data_frame)
 
-    from append_functions import append_df_with_laser
-    csv_data_frame = append_df_with_laser(csv_data_frame)
+def parse_arguments(argv=None):
+    """
+    Parses the command line options of the extraction run.
 
-    from append_functions import append_df_with_timeframe
-    csv_data_frame = append_df_with_timeframe(csv_data_frame)
+    Parameters:
+    ----------
+    argv : list of str, optional
+        The arguments to parse. Defaults to sys.argv[1:].
 
-    from append_functions import append_df_with_stimulation
-    csv_data_frame = append_df_with_stimulation(csv_data_frame)
+    Returns:
+    -------
+    args : argparse.Namespace
+        The parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Extracts recording metadata from file paths into a table.")
+    parser.add_argument("--path", default="C:/Users\Diana\Desktop\Studium\Master_project\Data_from_W8",
+                        help="Root directory of the recordings.")
+    parser.add_argument("--csv-path", default="C:/Users/Diana/Info_extraction/list_of_files.csv",
+                        help="Output file: .csv, or with --typed also .parquet or .pkl.")
+    parser.add_argument("--walk-workers", type=int, default=1,
+                        help="Number of threads listing directories concurrently (1 = serial walk).")
+    parser.add_argument("--stat-workers", type=int, default=0,
+                        help="Number of threads stat'ing the listed files in batches (0 = stat every file "
+                             "while listing its directory).")
+    parser.add_argument("--status", action="store_true",
+                        help="Add a Status column: ok, or the error of a file that vanished or could not be "
+                             "stat'ed (such files are kept, without size, instead of aborting the scan).")
+    parser.add_argument("--directory-cache-size", type=int, default=65536,
+                        help="Number of directories whose keyword matches are cached (0 disables the cache).")
+    parser.add_argument("--manifest", default=None,
+                        help="Manifest file of the previous run. Only changed directories are listed "
+                             "and only new or modified files are extracted again.")
+    parser.add_argument("--read-headers", action="store_true",
+                        help="Read date, time, sampling rate, electrode count and timeframe from the .dat "
+                             "and .brw file headers (.brw requires h5py); header values replace the ones "
+                             "guessed from the path.")
+    parser.add_argument("--header-workers", type=int, default=4,
+                        help="Number of threads reading file headers.")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="Add a fingerprint of size and sampled blocks of every file and a duplicate group, "
+                             "so that copies of a recording can be found.")
+    parser.add_argument("--fingerprint-workers", type=int, default=8,
+                        help="Number of threads reading the sampled blocks.")
+    parser.add_argument("--sqlite", default=None,
+                        help="SQLite catalog to update in place (upserts by Location, rows of files that "
+                             "are gone are deleted), in addition to the output file.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of processes extracting partitions of the paths (1 = this process only). "
+                             "Ignored with --legacy and --profile, whose stages run in this process.")
+    parser.add_argument("--chunk-size", type=int, default=0,
+                        help="Extract, clean and append the files to the .csv file in chunks of this many files, "
+                             "so that memory does not grow with the archive (0 = whole table at once).")
+    parser.add_argument("--rule-stats", default=None,
+                        help="Write how often every rule and keyword matched, won its priority tie-break and "
+                             "how long it took to this .csv file (every keyword is tested separately, which is slow).")
+    parser.add_argument("--string-dtype", choices=STRING_DTYPES, default=None,
+                        help="Dtype of the string columns (default: the one pandas infers). With string[pyarrow] "
+                             "the strings are held in Arrow memory and the --legacy keyword, date and cleaning "
+                             "stages run on Arrow compute kernels; requires pyarrow.")
+    parser.add_argument("--legacy", action="store_true",
+                        help="Run the append_df_with_* stages one after the other instead of the single-pass engine.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write wall time, CPU time, rows and growth of the memory high-water mark of every "
+                             "stage (and of every extractor or append_df_with_* stage) to <output>.profile.json.")
+    parser.add_argument("--profile-stage", default=None,
+                        help="Name of one stage to capture with --profile-mode, e.g. extract, clean or "
+                             "append_df_with_pitch with --legacy.")
+    parser.add_argument("--profile-mode", choices=CAPTURE_MODES, default="cprofile",
+                        help="Capture of --profile-stage: cprofile (time per function) or tracemalloc "
+                             "(memory per source line).")
+    parser.add_argument("--typed", action="store_true",
+                        help="Write categorical label columns and numeric quantity columns with separate "
+                             "unit columns instead of plain strings.")
+    args = parser.parse_args(argv)
+    if args.chunk_size and (args.manifest or args.typed):
+        parser.error("--chunk-size writes a .csv file chunk by chunk and can not be combined with --manifest or --typed")
+    return args
 
-    from append_functions import append_df_with_control
-    csv_data_frame = append_df_with_control(csv_data_frame)
 
-    from append_functions import append_cleaning_function
+if __name__ == '__main__':
 
-    csv_data_frame = append_cleaning_function(csv_data_frame)
+    args = parse_arguments()
 
-    csv_data_frame.to_csv(csv_path)
+    norm_path = os.path.normpath(args.path)
+    #all_extensions = get_all_extensions_in_directory(get_list_of_files(norm_path, None))
+    #print(f"All extensions in Working Directory: {all_extensions}")
+    profiler = Profiler(args.profile_stage, args.profile_mode)
+    print(f"Rules {rules.RULES_PATH} ({rules.RULES_DIGEST[:12]}): loaded in {rules.LOAD_SECONDS * 1000:.1f} ms, "
+          f"vocabulary matcher {'loaded from cache' if MATCHER_STARTUP['source'] == 'cache' else 'compiled'} "
+          f"in {MATCHER_STARTUP['seconds'] * 1000:.1f} ms")
+    for name, seconds, cpu_seconds in [("startup: rules", rules.LOAD_SECONDS, rules.LOAD_CPU_SECONDS),
+                                       ("startup: vocabulary matcher", MATCHER_STARTUP["seconds"],
+                                        MATCHER_STARTUP["cpu_seconds"])]:
+        profiler.add({"name": name, "parent": None, "rows_in": None, "rows_out": None, "wall_seconds": seconds,
+                      "cpu_seconds": cpu_seconds, "high_water_mark_growth_bytes": None})
+    if args.chunk_size:
+        VOCABULARY_MATCHER.directory_cache.maxsize = args.directory_cache_size
+        if args.legacy:
+            extract_function = lambda chunk: extract_entries_legacy(chunk, string_dtype=args.string_dtype)
+        else:
+            extract_function = lambda chunk: extract_entries(chunk, workers=args.workers,
+                                                             string_dtype=args.string_dtype)
+        stat_counter = StatCounter()
+        rule_statistics = RuleStatistics() if args.rule_stats else None
+        with profiler.stage("stream") as record:
+            entries = stat_counter.count(scan_directory(norm_path, [".brw", ".dat"], walk_workers=args.walk_workers,
+                                                        stat_workers=args.stat_workers))
+            counts = stream_catalog(entries, args.csv_path, args.chunk_size, extract_function, args.read_headers,
+                                    args.header_workers, args.sqlite,
+                                    args.fingerprint_workers if args.fingerprint else 0, args.status,
+                                    rule_statistics)
+            record["rows_in"] = counts["files"]
+            record["rows_out"] = counts["rows"]
+        print(f"Number of object .brw and .dat: {counts['files']}")
+        print_stat_report(stat_counter.report())
+        print("Removed rows: " + ", ".join(f"{rule}: {count}" for rule, count in counts["removed"].items()))
+        print(f"Wrote {counts['rows']} rows in {counts['chunks']} chunks of up to {args.chunk_size} files")
+    else:
+        manifest = load_manifest(args.manifest) if args.manifest else None
+        stat_counter = StatCounter()
+        with profiler.stage("walk") as record:
+            if manifest is not None:
+                entries = scan_directory_incremental(norm_path, [".brw", ".dat"], manifest)
+            else:
+                entries = scan_directory(norm_path, [".brw", ".dat"], walk_workers=args.walk_workers,
+                                         stat_workers=args.stat_workers)
+            entries = list(stat_counter.count(entries))
+            record["rows_out"] = len(entries)
+        print(f"Number of object .brw and .dat: {len(entries)}")
+        print_stat_report(stat_counter.report())
+        if args.rule_stats:
+            with profiler.stage("rule statistics", rows_in=len(entries)) as record:
+                rule_statistics = RuleStatistics()
+                rule_statistics.add(entry.path for entry in entries)
+                record["rows_out"] = len(entries)
+
+
+        # Write into .csv
+        csv_path = args.csv_path
+        VOCABULARY_MATCHER.directory_cache.maxsize = args.directory_cache_size
+
+        if args.legacy:
+            extract_function = lambda stale_entries: extract_entries_legacy(stale_entries,
+                                                                            profiler if args.profile else None,
+                                                                            args.string_dtype)
+            finish_extractors = None
+        elif args.profile:
+            timed_extractors, finish_extractors = profiler.timed_extractors(EXTRACTORS)
+            extract_function = lambda stale_entries: extract_entries(stale_entries, timed_extractors,
+                                                                     string_dtype=args.string_dtype)
+        else:
+            extract_function = lambda stale_entries: extract_entries(stale_entries, workers=args.workers,
+                                                                     string_dtype=args.string_dtype)
+            finish_extractors = None
+        with profiler.stage("extract", rows_in=len(entries)) as extract_record:
+            if manifest is not None:
+                # Rows kept from the manifest are plain values again
+                csv_data_frame = to_string_dtype(extract_entries_incremental(entries, manifest, extract_function),
+                                                 args.string_dtype)
+                save_manifest(manifest, args.manifest)
+            else:
+                csv_data_frame = extract_function(entries)
+            extract_record["rows_out"] = len(csv_data_frame)
+        if finish_extractors is not None:
+            finish_extractors(extract_record)
+        if args.status:
+            csv_data_frame = append_df_with_status(csv_data_frame, entries)
+        if manifest is not None:
+            print(f"Re-extracted {manifest.extracted} new or modified files, listed {manifest.listed} directories")
+        cache_info = VOCABULARY_MATCHER.directory_cache.info()
+        print(f"Directory cache: hit rate {cache_info['hit_rate']:.1%}, {cache_info['entries']} directories, "
+              f"{cache_info['memory_bytes'] / 1024 / 1024:.1f} MB")
+
+        with profiler.stage("clean", rows_in=len(csv_data_frame)) as record:
+            csv_data_frame, removed_counts = append_cleaning_function(csv_data_frame, return_counts=True)
+            record["rows_out"] = len(csv_data_frame)
+        print("Removed rows: " + ", ".join(f"{rule}: {count}" for rule, count in removed_counts.items()))
+
+        if args.read_headers:
+            with profiler.stage("read headers", rows_in=len(csv_data_frame)) as record:
+                csv_data_frame, headers = append_df_with_headers(csv_data_frame, workers=args.header_workers)
+                record["rows_out"] = len(csv_data_frame)
+            report = header_report(headers)
+            print(f"Read {report['files']} headers ({report['errors']} errors): "
+                  f"{report['bytes_read'] / 1024:.1f} KB of {report['bytes'] / 1024 / 1024:.1f} MB "
+                  f"({report['fraction_read']:.4%}), {report['mean_bytes_read'] / 1024:.1f} KB and "
+                  f"{report['mean_seconds'] * 1000:.2f} ms per file (max {report['max_bytes_read'] / 1024:.1f} KB, "
+                  f"{report['max_seconds'] * 1000:.2f} ms)")
+
+        if args.fingerprint:
+            with profiler.stage("fingerprint", rows_in=len(csv_data_frame)) as record:
+                csv_data_frame, bytes_read = append_df_with_fingerprint(csv_data_frame, args.fingerprint_workers)
+                record["rows_out"] = len(csv_data_frame)
+            duplicates = duplicate_report(csv_data_frame)
+            print(f"Fingerprinted {len(bytes_read)} files, {sum(bytes_read) / max(len(bytes_read), 1) / 1024:.0f} KB "
+                  f"read per file: {duplicates['groups']} duplicate groups with {duplicates['files']} files, "
+                  f"{duplicates['redundant_gb']:.2f} Gb in redundant copies")
+
+        if args.typed:
+            memory_before = csv_data_frame.memory_usage(deep=True).sum()
+            csv_data_frame = profiler.run("typed", to_typed_catalog, csv_data_frame)
+            memory_after = csv_data_frame.memory_usage(deep=True).sum()
+            print(f"Typed catalog: {memory_before / 1024 / 1024:.1f} MB -> {memory_after / 1024 / 1024:.1f} MB in memory")
+        with profiler.stage("write", rows_in=len(csv_data_frame)) as record:
+            if args.typed:
+                write_catalog(csv_data_frame, csv_path)
+            else:
+                write_csv_atomically(csv_data_frame, csv_path)
+            record["rows_out"] = len(csv_data_frame)
+        if args.sqlite:
+            with profiler.stage("sqlite", rows_in=len(csv_data_frame)) as record:
+                sqlite_counts = write_sqlite(csv_data_frame, args.sqlite, prune=True)
+                record["rows_out"] = sqlite_counts["upserted"]
+            print(f"SQLite catalog: upserted {sqlite_counts['upserted']} rows, deleted {sqlite_counts['deleted']} rows")
+    if args.rule_stats:
+        statistics_table = rule_statistics.table()
+        statistics_table.to_csv(args.rule_stats, index=False)
+        print(statistics_report(statistics_table))
+        print(f"Rule statistics written to {args.rule_stats}")
+    if args.profile:
+        profile_path = os.path.splitext(args.csv_path)[0] + ".profile.json"
+        profiler.write_report(profile_path)
+        print(profiler.summary())
+        print(f"Profile written to {profile_path}")
     et = time.time()
     time = et - st
     final_time = time / 60
@@ -0,0 +1,167 @@
+import glob
+import hashlib
+import math
+import os
+import pickle
+
+import pandas as pd
+
+import extraction_rules as rules
+from extraction_core import rows_to_dataframe
+
+# Columns holding whole numbers. A row extracted together with empty rows is stored from a
+# float column (64.0); it is turned back into an int so that it renders like in a full run.
+INTEGER_COLUMNS = ("Electrode", "Timeframe, s")
+
+
+class Manifest:
+    """
+    State of the previous run: directory listings and the extracted row of every file.
+
+    Attributes
+    ----------
+    version : str
+        Hash of the extraction code the rows were produced with.
+    directories : dict
+        Directory path -> (mtime in ns, sorted list of (name, is_dir) children).
+    files : dict
+        File path -> (size, mtime, inode, row), row being a tuple in the order of `columns`.
+    columns : list of str
+        Column names of the stored rows.
+    listed : int
+        Number of directories listed during the last walk.
+    extracted : int
+        Number of files extracted during the last run.
+    """
+
+    def __init__(self):
+        self.version = extractor_version()
+        self.directories = {}
+        self.files = {}
+        self.columns = []
+        self.listed = 0
+        self.extracted = 0
+
+
+def extractor_version() -> str:
+    """
+        Hashes the Python sources next to this module and the rule file, so that stored
+        rows are not reused after the extraction code or the rules changed.
+        Returns
+        -------
+        version : str
+            Hex digest over all .py files of the project and the rules.
+        """
+    digest = hashlib.sha1()
+    digest.update(rules.RULES_DIGEST.encode())
+    for source in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+        with open(source, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def load_manifest(path: str) -> Manifest:
+    """
+        Loads the manifest of the previous run.
+        Parameters
+        ----------
+        path : str
+            Path of the manifest file. A missing file gives an empty manifest.
+        Returns
+        -------
+        manifest : Manifest
+            The stored manifest. If the extraction code changed since it was written,
+            only the directory listings are kept and every file is extracted again.
+        """
+    if not os.path.exists(path):
+        return Manifest()
+    with open(path, "rb") as file:
+        manifest = pickle.load(file)
+    if manifest.version != extractor_version():
+        directories = manifest.directories
+        manifest = Manifest()
+        manifest.directories = directories
+    return manifest
+
+
+def save_manifest(manifest: Manifest, path: str) -> None:
+    """
+        Writes the manifest atomically, so that an interrupted run keeps the previous one.
+        Parameters
+        ----------
+        manifest : Manifest
+            The manifest to store.
+        path : str
+            Path of the manifest file.
+        """
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        pickle.dump(manifest, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, path)
+
+
+def dataframe_rows(df: pd.DataFrame) -> list:
+    """
+        Converts a DataFrame into row tuples of plain Python values.
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The extracted table.
+        Returns
+        -------
+        rows : list of tuple
+            One tuple per row; missing values are None.
+        """
+    columns = []
+    for name in df.columns:
+        values = df[name].tolist()
+        values = [None if value is pd.NA or isinstance(value, float) and math.isnan(value) else value
+                  for value in values]
+        if name in INTEGER_COLUMNS:
+            values = [int(value) if isinstance(value, float) else value for value in values]
+        columns.append(values)
+    return list(zip(*columns))
+
+
+def extract_entries_incremental(entries: list, manifest: Manifest, extract_function) -> pd.DataFrame:
+    """
+        Builds the table of the walked files, extracting only new or modified files.
+        Parameters
+        ----------
+        entries : list of FileEntry
+            The files of the current walk.
+        manifest : Manifest
+            The manifest of the previous run. It is updated in place: files that are no
+            longer walked are dropped and the new rows are stored.
+        extract_function : callable
+            Builds the table of a list of entries, e.g. main.extract_entries.
+        Returns
+        -------
+        df : pd.DataFrame
+            The same table a full extraction of `entries` gives, before cleaning.
+        """
+    stale = []
+    for entry in entries:
+        cached = manifest.files.get(entry.path)
+        if cached is None or cached[:3] != (entry.size, entry.mtime, entry.inode):
+            stale.append(entry)
+
+    new_rows = {}
+    if stale:
+        df = extract_function(stale)
+        manifest.columns = list(df.columns)
+        new_rows = dict(zip(df["Location"], dataframe_rows(df)))
+
+    files = {}
+    rows = []
+    for entry in entries:
+        row = new_rows[entry.path] if entry.path in new_rows else manifest.files[entry.path][3]
+        files[entry.path] = (entry.size, entry.mtime, entry.inode, row)
+        rows.append(row)
+
+    manifest.files = files
+    manifest.extracted = len(stale)
+
+    if not manifest.columns:
+        return extract_function([])
+    return rows_to_dataframe(manifest.columns, rows)
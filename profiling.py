@@ -0,0 +1,233 @@
+import cProfile
+import io
+import json
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+CAPTURE_MODES = ("cprofile", "tracemalloc")
+# Number of functions / source lines listed in a capture
+CAPTURE_TOP = 25
+
+
+def peak_memory() -> int:
+    """
+        Returns the peak resident memory of the process so far in bytes, 0 if unknown.
+        Uses resource on Unix and psutil (peak working set) on Windows.
+        """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Bytes on macOS, kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+    if psutil is not None:
+        memory = psutil.Process().memory_info()
+        return getattr(memory, "peak_wset", memory.rss)
+    return 0
+
+
+class Profiler:
+    """
+    Records wall time, CPU time, rows and memory growth of the stages of a run.
+
+    The memory of a stage is the growth of the process high-water mark (see
+    peak_memory) while it ran, not its own peak: a stage that stays below the peak of an
+    earlier stage reports 0, even if it allocated a lot.
+
+    Parameters
+    ----------
+    capture_stage : str, optional
+        Name of one stage that is additionally run under cProfile or tracemalloc.
+    capture_mode : str
+        "cprofile" (functions by cumulative time) or "tracemalloc" (source lines by
+        allocated memory).
+
+    Attributes
+    ----------
+    stages : list of dict
+        One record per finished stage, in the order they finished. Stages run inside
+        another stage name it as their "parent".
+    """
+
+    def __init__(self, capture_stage=None, capture_mode="cprofile"):
+        if capture_mode not in CAPTURE_MODES:
+            raise ValueError(f"capture_mode must be one of {CAPTURE_MODES}, not {capture_mode!r}")
+        self.capture_stage = capture_stage
+        self.capture_mode = capture_mode
+        self.stages = []
+        self.active = []
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        Measures the code in a with block as one stage.
+
+        The block gets the record of the stage and sets record["rows_out"].
+
+        Example
+        -------
+        with profiler.stage("clean", rows_in=len(df)) as record:
+            df = append_cleaning_function(df)
+            record["rows_out"] = len(df)
+        """
+        record = {"name": name, "parent": self.active[-1] if self.active else None,
+                  "rows_in": rows_in, "rows_out": None}
+        self.active.append(name)
+        capture = self.start_capture() if name == self.capture_stage else None
+        peak_before = peak_memory()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            self.active.pop()
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            record["wall_seconds"] = wall
+            record["cpu_seconds"] = cpu
+            record["high_water_mark_growth_bytes"] = peak_memory() - peak_before
+            if capture is not None:
+                record["capture"] = self.stop_capture(capture)
+            self.add(record)
+
+    def add(self, record):
+        """
+        Stores a stage record and fills in its rows per second.
+        """
+        rows = record["rows_in"] if record.get("rows_in") is not None else record.get("rows_out")
+        wall = record.get("wall_seconds") or 0.0
+        record["rows_per_second"] = rows / wall if rows is not None and wall > 0 else None
+        self.stages.append(record)
+
+    def run(self, name, function, df, *args, **kwargs):
+        """
+        Runs a DataFrame stage such as append_df_with_pitch(df) as one stage.
+        """
+        with self.stage(name, rows_in=len(df)) as record:
+            df = function(df, *args, **kwargs)
+            record["rows_out"] = len(df)
+        return df
+
+    def start_capture(self):
+        if self.capture_mode == "cprofile":
+            profile = cProfile.Profile()
+            profile.enable()
+            return profile
+        tracemalloc.start()
+        return tracemalloc.take_snapshot()
+
+    def stop_capture(self, capture):
+        """
+        Stops the capture of the stage and returns its report as text.
+        """
+        if self.capture_mode == "cprofile":
+            capture.disable()
+            output = io.StringIO()
+            pstats.Stats(capture, stream=output).sort_stats("cumulative").print_stats(CAPTURE_TOP)
+            return output.getvalue()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        statistics = snapshot.compare_to(capture, "lineno")[:CAPTURE_TOP]
+        return "\n".join(str(statistic) for statistic in statistics)
+
+    def timed_extractors(self, extractors):
+        """
+        Wraps the extractors of the single-pass engine so that every column gets a record.
+
+        Parameters
+        ----------
+        extractors : list of (names, extractor)
+            Typically extraction_core.EXTRACTORS.
+
+        Returns
+        -------
+        timed_extractors : list of (names, extractor)
+            The wrapped extractors, to be passed to extract_dataframe.
+        finish : callable
+            Call it with the record of the enclosing extraction stage once that stage is
+            done. It stores one record per extractor, named "extract: <column names>",
+            and one for the rest of the stage (vocabulary matching, building the table).
+        """
+        timings = []
+        timed = []
+        for names, extractor in extractors:
+            timing = [0.0, 0.0, 0]
+            timings.append((names, timing))
+            timed.append((names, timed_extractor(extractor, timing)))
+
+        def finish(stage_record):
+            total_wall = 0.0
+            total_cpu = 0.0
+            for names, (wall, cpu, calls) in timings:
+                self.add({"name": "extract: " + ", ".join(names), "parent": stage_record["name"],
+                          "rows_in": calls, "rows_out": calls,
+                          "wall_seconds": wall, "cpu_seconds": cpu, "high_water_mark_growth_bytes": None})
+                total_wall += wall
+                total_cpu += cpu
+            self.add({"name": "extract: vocabulary matching and table", "parent": stage_record["name"],
+                      "rows_in": stage_record["rows_in"],
+                      "rows_out": stage_record["rows_out"],
+                      "wall_seconds": stage_record["wall_seconds"] - total_wall,
+                      "cpu_seconds": stage_record["cpu_seconds"] - total_cpu, "high_water_mark_growth_bytes": None})
+
+        return timed, finish
+
+    def report(self):
+        """
+        Returns the records of all stages and the total wall and CPU time as a dict.
+        """
+        top_level = [record for record in self.stages if record["parent"] is None]
+        return {
+            "stages": self.stages,
+            "total_wall_seconds": sum(record["wall_seconds"] for record in top_level),
+            "total_cpu_seconds": sum(record["cpu_seconds"] for record in top_level),
+        }
+
+    def write_report(self, path):
+        """
+        Writes the report as JSON.
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.report(), file, indent=2, ensure_ascii=False)
+
+    def summary(self):
+        """
+        Returns one line per stage with its wall time, CPU time and rows per second.
+        """
+        lines = []
+        for record in self.stages:
+            rate = record["rows_per_second"]
+            name = record["name"] if record["parent"] is None else "  " + record["name"]
+            lines.append(f"{name:<40} {record['wall_seconds']:9.3f} s wall {record['cpu_seconds']:9.3f} s cpu"
+                         + (f" {rate:12.0f} rows/s" if rate is not None else ""))
+        return "\n".join(lines)
+
+
+def timed_extractor(extractor, timing):
+    """
+    Wraps an extractor so that its wall time, CPU time and calls add up in `timing`.
+    """
+    perf_counter = time.perf_counter
+    process_time = time.process_time
+
+    def timed(location, labels):
+        wall_start = perf_counter()
+        cpu_start = process_time()
+        value = extractor(location, labels)
+        timing[0] += perf_counter() - wall_start
+        timing[1] += process_time() - cpu_start
+        timing[2] += 1
+        return value
+
+    return timed
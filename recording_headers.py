@@ -0,0 +1,337 @@
+import os
+import re
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from extraction_core import recorded_at
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+# Columns a header can fill; header values replace the ones guessed from the path
+HEADER_COLUMNS = ["Date", "Time", "Sampling rate", "Electrode", "Timeframe, s"]
+
+# MC_DataTool .dat headers are a few hundred bytes. They are read in chunks until the "EOH"
+# line; nothing past DAT_HEADER_PREFIX_BYTES is read.
+DAT_HEADER_CHUNK_BYTES = 4096
+DAT_HEADER_PREFIX_BYTES = 64 * 1024
+DAT_END_OF_HEADER = re.compile(rb'^EOH\r?\n', re.MULTILINE)
+DAT_BYTES_PER_SAMPLE = 2
+DAT_DATE_FORMATS = ["%d.%m.%Y", "%Y-%m-%d", "%m/%d/%Y"]
+DAT_TIME_FORMATS = ["%H:%M:%S", "%H-%M-%S"]
+
+
+class CountingFile:
+    """
+    Read-only file object that counts the bytes read through it.
+
+    h5py reads through it with the "fileobj" driver, so the count covers every byte of
+    the file HDF5 touches: superblock, object headers, attributes and small datasets.
+
+    Parameters
+    ----------
+    file : file object
+        The file opened in binary mode.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def readinto(self, buffer):
+        count = self.file.readinto(buffer)
+        self.bytes_read += count or 0
+        return count
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self.file.seek(offset, whence)
+
+    def tell(self):
+        return self.file.tell()
+
+
+def format_sampling_rate(rate: float) -> str:
+    """
+        Formats a sampling rate in Hz like the path extraction does, e.g. "17.8555 kHz".
+        """
+    return f"{rate / 1000:g} kHz"
+
+
+def read_brw_v3(file) -> tuple:
+    """
+        Reads sampling rate, channel count and frame count of a BrainWave 3 .brw file.
+        """
+    rec_vars = file["3BRecInfo/3BRecVars"]
+    rate = float(rec_vars["SamplingRate"][0])
+    frames = int(rec_vars["NRecFrames"][0])
+    channels = file["3BRecInfo/3BMeaStreams/Raw/Chs"].shape[0]
+    return rate, channels, frames
+
+
+def read_brw_v4(file) -> tuple:
+    """
+        Reads sampling rate, channel count and frame count of a BrainWave 4 .brw file.
+        The channels are those stored in all wells; the frame count comes from the table
+        of contents, or from the shape of the raw dataset if the file has none.
+        """
+    rate = float(file.attrs["SamplingRate"])
+    wells = [file[name] for name in file if name.startswith("Well_")]
+    channels = sum(well["StoredChIdxs"].shape[0] for well in wells)
+    frames = None
+    if "TOC" in file:
+        frames = int(file["TOC"][-1, 1])
+    elif wells and "Raw" in wells[0] and wells[0]["StoredChIdxs"].shape[0]:
+        frames = wells[0]["Raw"].shape[0] // wells[0]["StoredChIdxs"].shape[0]
+    return rate, channels, frames
+
+
+def read_brw_header(path: str) -> dict:
+    """
+        Reads the recording parameters of a .brw file from its HDF5 metadata.
+        Only attributes, dataset shapes and a few scalar datasets are read, never the
+        samples themselves.
+        Parameters
+        ----------
+        path : str
+            The .brw file (BrainWave 3 or 4 layout).
+        Returns
+        -------
+        header : dict
+            "Sampling rate", "Electrode" and "Timeframe, s" (None where the file does not
+            tell), "bytes_read", "size" (0 if the file can not be stat'ed), "seconds", and
+            "error" (None, or the message of the exception that stopped the reading, e.g.
+            an OSError of a missing or unreadable file).
+        """
+    if h5py is None:
+        raise ImportError("Reading .brw headers requires the h5py package")
+    header = dict.fromkeys(HEADER_COLUMNS)
+    header["error"] = None
+    header["bytes_read"] = 0
+    header["size"] = 0
+    start = time.perf_counter()
+    counting_file = None
+    try:
+        # A missing or unreadable file, e.g. a dangling link, is an error of this file only
+        header["size"] = os.path.getsize(path)
+        with open(path, "rb") as raw_file:
+            counting_file = CountingFile(raw_file)
+            with h5py.File(counting_file, "r") as file:
+                if "3BRecInfo" in file:
+                    rate, channels, frames = read_brw_v3(file)
+                else:
+                    rate, channels, frames = read_brw_v4(file)
+        header["Sampling rate"] = format_sampling_rate(rate)
+        header["Electrode"] = channels or None
+        if frames is not None and rate > 0:
+            header["Timeframe, s"] = round(frames / rate)
+    except Exception as error:
+        header["error"] = f"{type(error).__name__}: {error}"
+    if counting_file is not None:
+        header["bytes_read"] = counting_file.bytes_read
+    header["seconds"] = time.perf_counter() - start
+    return header
+
+
+def parse_dat_header(prefix: bytes) -> tuple:
+    """
+        Parses the "key = value" lines of an MC_DataTool .dat header.
+        Parameters
+        ----------
+        prefix : bytes
+            The first bytes of the file.
+        Returns
+        -------
+        fields : dict
+            Key -> value as stripped strings, up to the "EOH" line.
+        header_length : int
+            Number of bytes up to and including the line break after "EOH".
+        """
+    match = DAT_END_OF_HEADER.search(prefix)
+    if match is None:
+        raise ValueError(f"no EOH line in the first {len(prefix)} bytes")
+    header_length = match.end()
+    fields = {}
+    for line in prefix[:match.start()].decode("latin-1").splitlines():
+        key, separator, value = line.partition("=")
+        if separator:
+            fields[key.strip()] = value.strip()
+    return fields, header_length
+
+
+def parse_datetime(value: str, formats: list):
+    """
+        Parses a date or time with the first matching format, None if none matches.
+        """
+    for date_format in formats:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            pass
+    return None
+
+
+def read_dat_header(path: str) -> dict:
+    """
+        Reads the recording parameters of a .dat file from its text header.
+        The file is read in chunks of DAT_HEADER_CHUNK_BYTES until the end of the header,
+        at most DAT_HEADER_PREFIX_BYTES. The number of frames follows from the file size,
+        since the samples after the header are 16-bit values of every channel.
+        Parameters
+        ----------
+        path : str
+            The .dat file exported by MC_DataTool.
+        Returns
+        -------
+        header : dict
+            Same keys as read_brw_header. "Date" and "Time" are formatted like the ones
+            taken from the path, e.g. "12.03.2021" and "12-30-00". A file that can not be
+            read gets its OSError as "error".
+        """
+    header = dict.fromkeys(HEADER_COLUMNS)
+    header["error"] = None
+    header["bytes_read"] = 0
+    header["size"] = 0
+    start = time.perf_counter()
+    prefix = b""
+    try:
+        # A missing or unreadable file, e.g. a dangling link, is an error of this file only
+        header["size"] = os.path.getsize(path)
+        with open(path, "rb", buffering=0) as file:
+            while len(prefix) < DAT_HEADER_PREFIX_BYTES:
+                chunk = file.read(DAT_HEADER_CHUNK_BYTES)
+                prefix += chunk
+                header["bytes_read"] = len(prefix)
+                if not chunk or DAT_END_OF_HEADER.search(prefix, max(0, len(prefix) - len(chunk) - 5)):
+                    break
+        fields, header_length = parse_dat_header(prefix)
+        rate = float(fields["Sample rate"]) if "Sample rate" in fields else None
+        channels = len([stream for stream in fields.get("Streams", "").split(";") if stream.strip()])
+        if rate:
+            header["Sampling rate"] = format_sampling_rate(rate)
+        header["Electrode"] = channels or None
+        if rate and channels:
+            frames = (header["size"] - header_length) // (DAT_BYTES_PER_SAMPLE * channels)
+            header["Timeframe, s"] = round(frames / rate)
+        date = parse_datetime(fields.get("Date", ""), DAT_DATE_FORMATS)
+        if date is not None:
+            header["Date"] = date.strftime("%d.%m.%Y")
+        time_of_day = parse_datetime(fields.get("Time", ""), DAT_TIME_FORMATS)
+        if time_of_day is not None:
+            header["Time"] = time_of_day.strftime("%H-%M-%S")
+    except (OSError, ValueError) as error:
+        header["error"] = f"{type(error).__name__}: {error}"
+    header["seconds"] = time.perf_counter() - start
+    return header
+
+
+# Header reader of every supported format, by lower-cased extension. .brw files need h5py.
+HEADER_READERS = {".dat": read_dat_header}
+if h5py is not None:
+    HEADER_READERS[".brw"] = read_brw_header
+
+
+def read_header(path: str) -> dict:
+    """
+        Reads the header of a recording with the reader of its extension.
+        """
+    return HEADER_READERS[os.path.splitext(path)[1].lower()](path)
+
+
+def read_headers(paths: list, workers: int = 4) -> list:
+    """
+        Reads the headers of many recordings on a bounded pool of threads.
+        A header is a few KB, so reading it is waiting for the file system, during which
+        os.read and h5py release the GIL; threads overlap these waits, e.g. on a network
+        share, without the start-up and pickling costs of processes, which made a pool of
+        4 processes about 20 times slower than one thread. Processes would only pay off if
+        parsing dominated, e.g. for many .brw files on a fast local disk, since h5py runs
+        one HDF5 call at a time across threads.
+        Parameters
+        ----------
+        paths : list of str
+            Recordings with an extension in HEADER_READERS.
+        workers : int
+            Maximum number of threads; 1 reads in the calling thread.
+        Returns
+        -------
+        headers : list of dict
+            The header of every path, in the order of `paths`.
+        """
+    if workers <= 1 or len(paths) <= 1:
+        return [read_header(path) for path in paths]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(read_header, paths))
+
+
+def append_df_with_headers(df: pd.DataFrame, extensions=None, workers: int = 4):
+    """
+        Fills date, time, sampling rate, electrode count and timeframe from the file headers.
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The extracted table with a "Location" column.
+        extensions : iterable of str, optional
+            Lower-cased extensions whose headers are read; each needs a reader in
+            HEADER_READERS. Defaults to all extensions in HEADER_READERS.
+        workers : int
+            Maximum number of threads reading headers.
+        Returns
+        -------
+        df : pd.DataFrame
+            The table; a value found in a header replaces the one guessed from the path.
+        headers : list of dict
+            The headers that were read, for reporting.
+        """
+    extensions = tuple(HEADER_READERS if extensions is None else extensions)
+    locations = [location for location in df["Location"] if location.lower().endswith(extensions)]
+    headers = read_headers(locations, workers)
+    by_location = dict(zip(locations, headers))
+    for column in HEADER_COLUMNS:
+        values = df[column].astype(object).tolist()
+        for index, location in enumerate(df["Location"]):
+            header = by_location.get(location)
+            if header is not None and header[column] is not None:
+                values[index] = header[column]
+        df[column] = values
+    if "Recorded at" in df:
+        # Rows whose date and time were not found keep their previous value, e.g. the mtime
+        df["Recorded at"] = recorded_at(df["Date"], df["Time"]).fillna(df["Recorded at"])
+    return df, headers
+
+
+def header_report(headers: list) -> dict:
+    """
+        Summarizes how much of the files the header reading touched.
+        Returns
+        -------
+        report : dict
+            Number of "files" and "errors", total "bytes_read" and file "bytes", the
+            "fraction_read", and the mean and maximum bytes read and seconds per file.
+        """
+    if not headers:
+        return {"files": 0, "errors": 0, "bytes_read": 0, "bytes": 0, "fraction_read": 0.0,
+                "mean_bytes_read": 0, "max_bytes_read": 0, "mean_seconds": 0.0, "max_seconds": 0.0}
+    bytes_read = [header["bytes_read"] for header in headers]
+    seconds = [header["seconds"] for header in headers]
+    total_size = sum(header["size"] for header in headers)
+    return {
+        "files": len(headers),
+        "errors": sum(header["error"] is not None for header in headers),
+        "bytes_read": sum(bytes_read),
+        "bytes": total_size,
+        "fraction_read": sum(bytes_read) / total_size if total_size else 0.0,
+        "mean_bytes_read": sum(bytes_read) / len(headers),
+        "max_bytes_read": max(bytes_read),
+        "mean_seconds": sum(seconds) / len(seconds),
+        "max_seconds": max(seconds),
+    }
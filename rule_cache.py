@@ -0,0 +1,81 @@
+import hashlib
+import os
+import pickle
+import sys
+import time
+
+import extraction_rules as rules
+
+# Compiled rule sets are stored next to the rule file, unless EXTRACTION_RULE_CACHE names
+# another directory
+CACHE_DIRECTORY = os.environ.get("EXTRACTION_RULE_CACHE",
+                                 os.path.join(os.path.dirname(os.path.abspath(rules.RULES_PATH)), ".rule_cache"))
+
+
+def cache_key(name: str, *modules) -> str:
+    """
+        Builds the key of a compiled object.
+        Parameters
+        ----------
+        name : str
+            Name of the object, e.g. "vocabulary_matcher".
+        *modules : module
+            Modules whose code defines the compiled object; a change of their source
+            invalidates the cached object.
+        Returns
+        -------
+        key : str
+            Hex digest over the name, the rule file content, the module sources and the
+            Python version.
+        """
+    digest = hashlib.sha256()
+    digest.update(name.encode())
+    digest.update(rules.RULES_DIGEST.encode())
+    digest.update(sys.version.encode())
+    for module in modules:
+        with open(module.__file__, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def load_or_build(name: str, build, *modules):
+    """
+        Loads a compiled object from the cache, or builds and caches it.
+        Parameters
+        ----------
+        name : str
+            Name of the object.
+        build : callable
+            Builds the object from the rules; it must be picklable.
+        *modules : module
+            Modules whose source is part of the key, see cache_key.
+        Returns
+        -------
+        compiled : object
+            The object.
+        startup : dict
+            "source" ("cache" or "built"), and the wall "seconds" and "cpu_seconds" it
+            took to get the object.
+        """
+    start, cpu_start = time.perf_counter(), time.process_time()
+    path = os.path.join(CACHE_DIRECTORY, f"{name}-{cache_key(name, *modules)}.pickle")
+    try:
+        with open(path, "rb") as file:
+            compiled = pickle.load(file)
+        return compiled, {"source": "cache", "seconds": time.perf_counter() - start,
+                          "cpu_seconds": time.process_time() - cpu_start}
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        pass
+
+    compiled = build()
+    try:
+        os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as file:
+            pickle.dump(compiled, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+    except OSError:
+        # A read-only checkout still works, it just compiles on every start
+        pass
+    return compiled, {"source": "built", "seconds": time.perf_counter() - start,
+                      "cpu_seconds": time.process_time() - cpu_start}
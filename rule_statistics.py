@@ -0,0 +1,151 @@
+import argparse
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+import extraction_rules as rules
+from keyword_matcher import is_regex
+
+STATISTICS_COLUMNS = ["Kind", "Rule set", "Group", "Label", "Keyword", "Regex", "Paths", "Matched", "Match rate",
+                      "Won", "Tie-breaks won", "Shadowed", "Seconds", "ns per path"]
+
+
+def keyword_test(keyword, flags=0, regex=None):
+    """
+    Returns a function that tells whether a path contains a keyword.
+
+    Plain keywords are substring tests, like in the KeywordMatcher automaton; keywords
+    with regular expression syntax, and all keywords when `regex` is True, are searched.
+    """
+    if regex or (regex is None and is_regex(keyword)) or flags:
+        search = re.compile(keyword, flags).search
+        return lambda path: search(path) is not None
+    return lambda path: keyword in path
+
+
+def rule_sets():
+    """
+    Lists every rule of the rule file as ordered groups of keywords.
+
+    Within a rule set the first group with a matching keyword wins, like a vocabulary
+    column; rule sets with one group per keyword (trash, patterns) just count matches.
+
+    Returns
+    -------
+    rule_sets : list of tuple
+        (kind, name, groups) with groups as lists of (label, [(keyword, regex, test)]).
+    """
+    sets = []
+    for column, groups in rules.VOCABULARIES.items():
+        sets.append(("vocabulary", column, [(label, [(keyword, is_regex(keyword), keyword_test(keyword))
+                                                     for keyword in keywords]) for label, keywords in groups]))
+    # Joined into one case-insensitive regular expression per group by extraction_core
+    sets.append(("drug dose keyword", "Drug dose", [(group[0], [(keyword, True, keyword_test(keyword, re.IGNORECASE))
+                                                                for keyword in group]) for group in rules.DRUG_DOSE]))
+    sets.append(("trash", "Trash", [(keyword, [(keyword, True, keyword_test(keyword, regex=True))])
+                                    for keyword in rules.TRASH]))
+    for name, spec in rules.RULES["patterns"].items():
+        pattern = rules.PATTERNS[name]
+        sets.append(("pattern", name, [(name, [(spec["pattern"], True,
+                                               lambda path, search=pattern.search: search(path) is not None)])]))
+    for name, specs in rules.RULES["unit_patterns"].items():
+        sets.append(("unit pattern", name, [(unit, [(spec["pattern"], True,
+                                                    lambda path, search=pattern.search: search(path) is not None)])
+                                            for (pattern, unit), spec in zip(rules.UNIT_PATTERNS[name], specs)]))
+    return sets
+
+
+class RuleStatistics:
+    """
+    Counts how often every rule and keyword matches and decides, and what it costs.
+
+    Every keyword is evaluated on its own over all paths, as the chained str.contains
+    of the append_df_with_* stages did, so that its cost can be attributed; the
+    KeywordMatcher finds all plain keywords in one pass and is not slowed down by this.
+    The statistics accumulate over several calls of add, e.g. chunk by chunk.
+
+    For every keyword:
+      Matched: paths containing the keyword;
+      Won: paths where it matched and its group won the rule set;
+      Tie-breaks won: of these, paths where a later group of the rule set matched too;
+      Shadowed: paths where it matched but an earlier group won;
+      Seconds / ns per path: time spent testing the keyword.
+    """
+
+    def __init__(self):
+        self.sets = rule_sets()
+        self.paths = 0
+        self.counts = {}
+
+    def add(self, paths):
+        """
+        Evaluates every rule on a list of paths.
+        """
+        paths = list(paths)
+        self.paths += len(paths)
+        for kind, name, groups in self.sets:
+            keyword_matches = []
+            group_matches = np.zeros((len(groups), len(paths)), dtype=bool)
+            for group_index, (label, keywords) in enumerate(groups):
+                for keyword, regex, test in keywords:
+                    start = time.perf_counter()
+                    matches = np.fromiter((test(path) for path in paths), dtype=bool, count=len(paths))
+                    seconds = time.perf_counter() - start
+                    keyword_matches.append((group_index, label, keyword, regex, matches, seconds))
+                    group_matches[group_index] |= matches
+
+            any_group = group_matches.any(axis=0)
+            winner = np.where(any_group, group_matches.argmax(axis=0), -1)
+            contested = group_matches.sum(axis=0) > 1
+            for group_index, label, keyword, regex, matches, seconds in keyword_matches:
+                won = matches & (winner == group_index)
+                key = (kind, name, group_index, label, keyword, regex)
+                counts = self.counts.setdefault(key, [0, 0, 0, 0, 0.0])
+                counts[0] += int(matches.sum())
+                counts[1] += int(won.sum())
+                counts[2] += int((won & contested).sum())
+                counts[3] += int((matches & (winner < group_index) & (winner >= 0)).sum())
+                counts[4] += seconds
+
+    def table(self) -> pd.DataFrame:
+        """
+        Returns one row per rule keyword in the order of the rule file, see the class
+        docstring for the columns.
+        """
+        rows = []
+        for (kind, name, group_index, label, keyword, regex), counts in self.counts.items():
+            matched, won, tie_breaks_won, shadowed, seconds = counts
+            rows.append([kind, name, group_index, label, keyword, regex, self.paths, matched,
+                         matched / self.paths if self.paths else 0.0, won, tie_breaks_won, shadowed, seconds,
+                         seconds / self.paths * 1e9 if self.paths else 0.0])
+        return pd.DataFrame(rows, columns=STATISTICS_COLUMNS)
+
+
+def statistics_report(table: pd.DataFrame, top: int = 5) -> str:
+    """
+    Summarizes a statistics table: rules that never matched and the most expensive ones.
+    """
+    dead = table[table["Matched"] == 0]
+    lines = [f"Rule statistics over {table['Paths'].max() if len(table) else 0} paths: {len(table)} keywords, "
+             f"{len(dead)} never matched, {table['Seconds'].sum():.2f} s in total"]
+    for row in table.sort_values("Seconds", ascending=False).head(top).to_dict("records"):
+        lines.append(f"  {row['Rule set']} / {row['Keyword']!r}: {row['Seconds'] * 1000:.1f} ms, "
+                     f"matched {row['Matched']}, won {row['Won']}")
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Counts rule and keyword hits over a list of paths, e.g. one "
+                                                 "written by synthetic_corpus.py --path-list.")
+    parser.add_argument("path_list", help="Text file with one path per line.")
+    parser.add_argument("--output", default="rule_statistics.csv", help="The statistics table (.csv).")
+    args = parser.parse_args()
+    with open(args.path_list, encoding="utf-8") as file:
+        statistics = RuleStatistics()
+        statistics.add(line.rstrip("\n") for line in file if line.strip())
+    table = statistics.table()
+    table.to_csv(args.output, index=False)
+    print(statistics_report(table))
+    print(f"Statistics written to {args.output}")
@@ -0,0 +1,333 @@
+import argparse
+import os
+import pickle
+import socket
+import subprocess
+import sys
+import time
+import zlib
+from typing import Optional
+
+from file_stats import StatCounter, append_df_with_status
+from main import (catalog_from_rows, entry_from_dir_entry, extract_entries, normalize_extensions, print_stat_report,
+                  scan_directory, write_csv_atomically)
+from manifest import dataframe_rows, extractor_version
+from sqlite_catalog import write_sqlite
+
+EXTENSIONS = [".brw", ".dat"]
+
+# Name of the shard holding the files directly in the root, next to the top-level subtrees
+ROOT_FILES = ""
+
+
+class PartialCatalog:
+    """
+    The extracted rows of one shard of the tree, written by one scan process.
+
+    The merged table is the same as the one of a full run of main.py over the whole
+    tree, see main.catalog_from_rows.
+
+    Attributes
+    ----------
+    version : str
+        Hash of the extraction code and rules, see manifest.extractor_version.
+    root : str
+        The normalized root directory; all partials of a catalog must use the same.
+    shard_index, shard_count : int
+        The shard and the number of shards the top-level subtrees were split into.
+    subtrees : list of str
+        The top-level subtrees this partial covers; ROOT_FILES stands for the files
+        directly in the root.
+    all_subtrees : list of str
+        All top-level subtrees of the root at the time of the scan.
+    columns : list of str
+        Column names of the stored rows.
+    rows : list of tuple
+        One row per file in the order of `columns`.
+    stat_report : dict
+        StatCounter report of the walk.
+    host : str
+        Host name of the scan process.
+    created : float
+        Time the scan finished, seconds since the epoch, by the clock of `host`; orders
+        the partials in merge_partials.
+    """
+
+    def __init__(self, root, shard_index, shard_count, subtrees, all_subtrees):
+        self.version = extractor_version()
+        self.root = root
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.subtrees = subtrees
+        self.all_subtrees = all_subtrees
+        self.columns = []
+        self.rows = []
+        self.stat_report = {}
+        self.host = socket.gethostname()
+        self.created = 0.0
+
+
+def list_subtrees(root: str) -> list:
+    """
+        Lists the shards of a tree: its top-level directories and ROOT_FILES.
+        Parameters
+        ----------
+        root : str
+            Root directory of the recordings.
+        Returns
+        -------
+        subtrees : list of str
+            ROOT_FILES followed by the names of the top-level directories, in name order.
+        """
+    with os.scandir(root) as iterator:
+        return [ROOT_FILES] + sorted(dir_entry.name for dir_entry in iterator if dir_entry.is_dir())
+
+
+def shard_of(subtree: str, shard_count: int) -> int:
+    """
+        Assigns a top-level subtree to a shard by a hash of its name.
+        The assignment depends on the name only, so processes on different hosts agree
+        on it, and a subtree created between their scans is still scanned exactly once.
+        """
+    return zlib.crc32(subtree.encode("utf-8")) % shard_count
+
+
+def list_root_files(root: str, extensions) -> list:
+    """
+        Lists the matching files directly in the root, in name order.
+        """
+    with os.scandir(root) as iterator:
+        children = sorted(iterator, key=lambda dir_entry: dir_entry.name)
+    return [entry_from_dir_entry(child) for child in children
+            if not child.is_dir() and (extensions is None or os.path.splitext(child.name)[1].lower() in extensions)]
+
+
+def subtree_of(root: str, path: str) -> str:
+    """
+        Returns the top-level subtree of a file below the root, ROOT_FILES for the files
+        directly in the root.
+        """
+    parts = os.path.relpath(path, root).split(os.sep)
+    return parts[0] if len(parts) > 1 else ROOT_FILES
+
+
+def scan_shard(root: str, shard_index: int = 0, shard_count: int = 1, subtrees: Optional[list] = None,
+               walk_workers: int = 1, stat_workers: int = 0, workers: int = 1, status: bool = False) -> PartialCatalog:
+    """
+        Walks and extracts one shard of a tree.
+        Parameters
+        ----------
+        root : str
+            Root directory of the recordings.
+        shard_index, shard_count : int
+            The shard to scan: the top-level subtrees with shard_of(name) == shard_index.
+        subtrees : list of str, optional
+            Scan these top-level subtrees instead, e.g. to re-scan one of them.
+        walk_workers, stat_workers, workers : int
+            See main.scan_directory and main.extract_entries.
+        status : bool
+            Add the "Status" column; all partials of a catalog must agree on it.
+        Returns
+        -------
+        partial : PartialCatalog
+            The extracted rows of the shard.
+        """
+    root = os.path.normpath(root)
+    if not os.path.isdir(root):
+        raise ValueError(f"{root} is not a directory")
+    all_subtrees = list_subtrees(root)
+    if subtrees is None:
+        subtrees = [subtree for subtree in all_subtrees if shard_of(subtree, shard_count) == shard_index]
+    partial = PartialCatalog(root, shard_index, shard_count, sorted(subtrees), all_subtrees)
+
+    def walk():
+        for subtree in partial.subtrees:
+            if subtree == ROOT_FILES:
+                yield from list_root_files(root, normalize_extensions(EXTENSIONS))
+            elif os.path.isdir(os.path.join(root, subtree)):
+                yield from scan_directory(os.path.join(root, subtree), EXTENSIONS, walk_workers, stat_workers)
+
+    stat_counter = StatCounter()
+    entries = list(stat_counter.count(walk()))
+    df = extract_entries(entries, workers=workers)
+    if status:
+        df = append_df_with_status(df, entries)
+    partial.columns = list(df.columns)
+    partial.rows = dataframe_rows(df)
+    partial.stat_report = stat_counter.report()
+    partial.created = time.time()
+    return partial
+
+
+def save_partial(partial: PartialCatalog, path: str) -> None:
+    """
+        Writes a partial catalog atomically, so that the merge never reads a half-written one.
+        """
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as file:
+        # The attributes only, so that partials written by the command line (as
+        # __main__.PartialCatalog) load in any module
+        pickle.dump(vars(partial), file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, path)
+
+
+def load_partial(path: str) -> PartialCatalog:
+    """
+        Loads a partial catalog written by save_partial.
+        """
+    partial = PartialCatalog.__new__(PartialCatalog)
+    with open(path, "rb") as file:
+        vars(partial).update(pickle.load(file))
+    return partial
+
+
+def merge_partials(partials: list):
+    """
+        Combines partial catalogs into the cleaned table of the whole tree.
+        The most recent partial covering a subtree is authoritative for it: if a subtree
+        was scanned again, e.g. after files were added or deleted, only the rows of the
+        newest scan are kept and those of older scans are dropped, deleted files
+        included. The rows are sorted in the order of the walk, so that the table equals
+        the one of a full run of main.py.
+        "Most recent" is decided by the `created` time of each partial, i.e. by the wall
+        clock of the host that scanned it. The clocks of the scanning hosts must therefore
+        agree to better than the time between two scans of the same subtree; with clock
+        skew a rescan on a host whose clock lags can lose against the older scan it was
+        meant to replace, and deleted files then reappear in the catalog.
+        Parameters
+        ----------
+        partials : list of PartialCatalog
+            Partial catalogs of the same root, extraction code and columns.
+        Returns
+        -------
+        df : pd.DataFrame
+            The cleaned table.
+        report : dict
+            Number of "partials", extracted "files", "superseded" rows of older scans
+            that were dropped, the removed rows per cleaning rule under "removed", and the
+            top-level subtrees no partial covers under "missing_subtrees".
+        """
+    if not partials:
+        raise ValueError("No partial catalogs to merge")
+    for attribute in ("root", "version", "columns"):
+        values = {repr(getattr(partial, attribute)) for partial in partials}
+        if len(values) > 1:
+            raise ValueError(f"The partial catalogs differ in their {attribute}; they must come from scans of the "
+                             f"same root with the same extraction code and options")
+
+    columns = partials[0].columns
+    location_index = columns.index("Location")
+    partials = sorted(partials, key=lambda partial: partial.created)
+    newest = {}
+    for partial_index, partial in enumerate(partials):
+        for subtree in partial.subtrees:
+            newest[subtree] = partial_index
+    rows = {}
+    superseded = 0
+    for partial_index, partial in enumerate(partials):
+        for row in partial.rows:
+            location = row[location_index]
+            if newest[subtree_of(partial.root, location)] == partial_index:
+                rows[location] = row
+            else:
+                superseded += 1
+    covered = {subtree for partial in partials for subtree in partial.subtrees}
+    expected = {subtree for partial in partials for subtree in partial.all_subtrees}
+
+    df, removed_counts = catalog_from_rows(rows, columns, return_counts=True)
+    report = {"partials": len(partials), "files": len(rows), "superseded": superseded, "removed": removed_counts,
+              "missing_subtrees": sorted(expected - covered)}
+    return df, report
+
+
+def run_shards(root: str, shard_count: int, partial_directory: str, scan_arguments: Optional[list] = None) -> list:
+    """
+        Scans all shards of a tree in parallel local processes, e.g. to try out a sharded
+        scan on one machine.
+        Returns
+        -------
+        partial_paths : list of str
+            The partial catalogs written by the processes.
+        """
+    os.makedirs(partial_directory, exist_ok=True)
+    partial_paths = [os.path.join(partial_directory, f"shard-{index}-of-{shard_count}.pkl")
+                     for index in range(shard_count)]
+    processes = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "scan", "--path", root,
+                                   "--shard-index", str(index), "--shard-count", str(shard_count),
+                                   "--output", partial_path] + list(scan_arguments or []))
+                 for index, partial_path in enumerate(partial_paths)]
+    failed = [index for index, process in enumerate(processes) if process.wait() != 0]
+    if failed:
+        raise RuntimeError(f"Shard processes {failed} failed")
+    return partial_paths
+
+
+def merge_and_write(partial_paths: list, csv_path: str, sqlite_path: Optional[str] = None) -> None:
+    """
+        Merges partial catalog files and writes the catalog, printing a report.
+        """
+    df, report = merge_partials([load_partial(path) for path in partial_paths])
+    write_csv_atomically(df, csv_path)
+    print(f"Merged {report['partials']} partial catalogs: {report['files']} files, "
+          f"{report['superseded']} rows of older scans dropped")
+    print("Removed rows: " + ", ".join(f"{rule}: {count}" for rule, count in report["removed"].items()))
+    if report["missing_subtrees"]:
+        print("Warning: no partial catalog covers the top-level subtrees "
+              + ", ".join(repr(subtree) for subtree in report["missing_subtrees"]))
+    if sqlite_path:
+        sqlite_counts = write_sqlite(df, sqlite_path, prune=True)
+        print(f"SQLite catalog: upserted {sqlite_counts['upserted']} rows, deleted {sqlite_counts['deleted']} rows")
+    print(f"Wrote {len(df)} rows to {csv_path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scans a tree of recordings in shards of top-level subtrees, "
+                                                 "possibly on several hosts, and merges the partial catalogs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan_parser = commands.add_parser("scan", help="Scan and extract one shard into a partial catalog.")
+    scan_parser.add_argument("--path", required=True,
+                             help="Root directory of the recordings, spelled the same by all shards.")
+    scan_parser.add_argument("--shard-index", type=int, default=0, help="The shard to scan, from 0.")
+    scan_parser.add_argument("--shard-count", type=int, default=1, help="Number of shards.")
+    scan_parser.add_argument("--subtrees", nargs="*", default=None,
+                             help='Scan these top-level subtrees instead of a shard ("" = files in the root).')
+    scan_parser.add_argument("--output", required=True, help="The partial catalog file (.pkl).")
+    scan_parser.add_argument("--walk-workers", type=int, default=1, help="See main.py.")
+    scan_parser.add_argument("--stat-workers", type=int, default=0, help="See main.py.")
+    scan_parser.add_argument("--workers", type=int, default=1, help="See main.py.")
+    scan_parser.add_argument("--status", action="store_true", help="See main.py.")
+
+    merge_parser = commands.add_parser("merge", help="Merge partial catalogs into the catalog.")
+    merge_parser.add_argument("partials", nargs="+", help="Partial catalog files.")
+    merge_parser.add_argument("--csv-path", required=True, help="The merged .csv catalog.")
+    merge_parser.add_argument("--sqlite", default=None, help="SQLite catalog to update in place as well.")
+
+    run_parser = commands.add_parser("run", help="Scan all shards in local processes and merge them.")
+    run_parser.add_argument("--path", required=True, help="Root directory of the recordings.")
+    run_parser.add_argument("--shard-count", type=int, default=4, help="Number of shard processes.")
+    run_parser.add_argument("--partial-directory", default=None,
+                            help="Directory of the partial catalogs (default: <catalog>.shards).")
+    run_parser.add_argument("--csv-path", required=True, help="The merged .csv catalog.")
+    run_parser.add_argument("--sqlite", default=None, help="SQLite catalog to update in place as well.")
+    run_parser.add_argument("--status", action="store_true", help="See main.py.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "scan":
+        if not 0 <= args.shard_index < args.shard_count:
+            parser.error("--shard-index must be at least 0 and less than --shard-count")
+        partial = scan_shard(args.path, args.shard_index, args.shard_count, args.subtrees, args.walk_workers,
+                             args.stat_workers, args.workers, args.status)
+        save_partial(partial, args.output)
+        print(f"Shard {args.shard_index} of {args.shard_count}: {len(partial.subtrees)} of "
+              f"{len(partial.all_subtrees)} top-level subtrees, {len(partial.rows)} files -> {args.output}")
+        print_stat_report(partial.stat_report)
+    elif args.command == "merge":
+        merge_and_write(args.partials, args.csv_path, args.sqlite)
+    else:
+        partial_directory = args.partial_directory or os.path.splitext(args.csv_path)[0] + ".shards"
+        partial_paths = run_shards(args.path, args.shard_count, partial_directory,
+                                   ["--status"] if args.status else [])
+        merge_and_write(partial_paths, args.csv_path, args.sqlite)
+    print(f"Execution time: {time.perf_counter() - start:.2f} s")
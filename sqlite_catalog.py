@@ -0,0 +1,139 @@
+import sqlite3
+from typing import Optional
+
+import pandas as pd
+
+from extraction_core import CSV_DATE_FORMAT
+from typed_catalog import NUMERIC_COLUMNS, QUANTITY_COLUMNS
+
+TABLE_NAME = "recordings"
+KEY_COLUMN = "Location"
+INDEXED_COLUMNS = ["Performer", "Drug application", "Date", "Recorded at", "Recording system"]
+
+
+def quote(name: str) -> str:
+    """
+        Quotes a column name for SQL; the names contain spaces, commas and apostrophes.
+        """
+    return '"' + name.replace('"', '""') + '"'
+
+
+# SQLite types of the numeric columns; every other column, the unit columns of the typed
+# catalog included, is TEXT. The types are fixed rather than read from the data, since a
+# column that is missing in the first table written, e.g. "Pitch, µm" of .dat files only,
+# would otherwise be declared TEXT and then compare its numbers as text. The quantity
+# columns hold numbers in a typed catalog (--typed); the "<number> <unit>" strings of an
+# untyped one are kept as text by SQLite.
+SQLITE_TYPES = {"Int64": "INTEGER", "Float64": "REAL"}
+COLUMN_TYPES = {
+    **{name: SQLITE_TYPES[dtype] for name, dtype in {**NUMERIC_COLUMNS, **QUANTITY_COLUMNS}.items()},
+    "Duplicate group": "INTEGER",
+}
+
+
+def column_type(name: str) -> str:
+    """
+        Returns the SQLite type of a column: INTEGER, REAL or TEXT.
+        """
+    return COLUMN_TYPES.get(name, "TEXT")
+
+
+def create_schema(connection: sqlite3.Connection, columns: list) -> None:
+    """
+        Creates the catalog table and its indexes, or adds the columns an existing
+        catalog is missing.
+        Parameters
+        ----------
+        connection : sqlite3.Connection
+            The open catalog.
+        columns : list of str
+            The columns of the extracted table; their order defines the column order of
+            the table.
+        """
+    existing = [row[1] for row in connection.execute(f"PRAGMA table_info({quote(TABLE_NAME)})")]
+    if not existing:
+        definitions = [f"{quote(KEY_COLUMN)} TEXT PRIMARY KEY"]
+        definitions += [f"{quote(name)} {column_type(name)}" for name in columns if name != KEY_COLUMN]
+        connection.execute(f"CREATE TABLE {quote(TABLE_NAME)} ({', '.join(definitions)})")
+    else:
+        for name in columns:
+            if name not in existing:
+                connection.execute(f"ALTER TABLE {quote(TABLE_NAME)} ADD COLUMN {quote(name)} {column_type(name)}")
+    for name in INDEXED_COLUMNS:
+        if name in columns:
+            index_name = "idx_" + "_".join(name.lower().split())
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {quote(index_name)} ON {quote(TABLE_NAME)} ({quote(name)})")
+
+
+def sql_rows(df: pd.DataFrame):
+    """
+        Yields the rows of a table as tuples of values sqlite3 can bind; missing values are None.
+        Datetimes are written as text like in the .csv file, which sorts chronologically.
+        """
+    df = df.copy()
+    for name in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[name]):
+            df[name] = df[name].dt.strftime(CSV_DATE_FORMAT)
+    values = df.astype(object).where(df.notna(), None)
+    return values.itertuples(index=False, name=None)
+
+
+def write_sqlite(df: pd.DataFrame, path: str, batch_size: int = 10000, prune: bool = False,
+                 delete: Optional[list] = None) -> dict:
+    """
+        Updates the SQLite catalog in place with the rows of a table.
+        Rows are upserted by Location in batches, in one transaction: new files are
+        inserted, known files are updated, and the other rows are left untouched.
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The cleaned table.
+        path : str
+            The .sqlite / .db file; it is created if it does not exist.
+        batch_size : int
+            Number of rows per executemany call.
+        prune : bool
+            Also delete the rows whose Location is not in `df`, so that the catalog
+            mirrors a full scan.
+        delete : list of str, optional
+            Locations whose rows are deleted, e.g. of files that were removed since the
+            last update.
+        Returns
+        -------
+        counts : dict
+            Number of rows "upserted" and "deleted".
+        """
+    columns = list(df.columns)
+    updates = ", ".join(f"{quote(name)} = excluded.{quote(name)}" for name in columns if name != KEY_COLUMN)
+    statement = (f"INSERT INTO {quote(TABLE_NAME)} ({', '.join(quote(name) for name in columns)}) "
+                 f"VALUES ({', '.join('?' * len(columns))}) "
+                 f"ON CONFLICT({quote(KEY_COLUMN)}) DO UPDATE SET {updates}")
+
+    connection = sqlite3.connect(path)
+    deleted = 0
+    try:
+        with connection:
+            create_schema(connection, columns)
+            rows = sql_rows(df)
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == batch_size:
+                    connection.executemany(statement, batch)
+                    batch = []
+            if batch:
+                connection.executemany(statement, batch)
+            if prune:
+                connection.execute(f"CREATE TEMP TABLE scanned ({quote(KEY_COLUMN)} TEXT PRIMARY KEY)")
+                connection.executemany("INSERT INTO scanned VALUES (?)", ((location,) for location in df[KEY_COLUMN]))
+                deleted = connection.execute(
+                    f"DELETE FROM {quote(TABLE_NAME)} WHERE {quote(KEY_COLUMN)} NOT IN "
+                    f"(SELECT {quote(KEY_COLUMN)} FROM scanned)").rowcount
+                connection.execute("DROP TABLE scanned")
+            if delete:
+                deleted += connection.executemany(
+                    f"DELETE FROM {quote(TABLE_NAME)} WHERE {quote(KEY_COLUMN)} = ?",
+                    ((location,) for location in delete)).rowcount
+    finally:
+        connection.close()
+    return {"upserted": len(df), "deleted": deleted}
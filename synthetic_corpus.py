@@ -0,0 +1,138 @@
+import argparse
+import os
+import random
+
+import extraction_rules as rules
+
+# Spellings of the lab's directory names, mixing labels, keywords and free text
+PERFORMERS = [group[0] for group in rules.PERFORMER] + ["MM", "Daus", "Nick", "Smolin", "Frieß", "Kraus", "Ciba", "Karin"]
+CULTURES = ["Rat neurons", "Ratneuronen", "NS", "Kardio hiPSC", "Cardio iPSC", "HMZ", "Chicken Hühn", "hESC", "HEK", "iCell"]
+DRUGS = ["Bicuculline", "BIC", "Carba", "carbamazepine", "LSD", "lev", "Cisplatin", "Isoproterenol", "amitriptyline"]
+DOSES = ["10 µM", "5 muM", "0,5 microM", "-05muM", "2 µM", "1 µL", "0,1 muM", "20 µM"]
+RADIATIONS = ["X-Ray", "Xray", "Irradiation", "GSI Ti ", "Strahlung", "TETRA", "GSM Mobile"]
+RADIATION_TIMES = ["3 h a.R.", "24h b.R.", "2d aR", "1 d b.R.", "20 m vor Bestrahlung", "6 h nach Bestrahlung", "12h bR"]
+EXTRAS = ["GNR Laser", "GnP", "nanoparticles", "Stim 10 kHz", "Slice Stim", "64 Electrode 42um", "Control", "Sham",
+          "DMSO", "Japan Tokyo", "France", "BioMEMS", "300s", "1,5 kHz", "electrode 12", "120 s"]
+TRASH_FOLDERS = ["Trash", "Fehler", "error", "müll", "LFP", "DrCell", "software"]
+EXTENSIONS = [".brw", ".brw", ".brw", ".dat", ".dat", ".BRW", ".txt", ".mcd"]
+
+
+def experiment_directory(generator: random.Random) -> list:
+    """
+        Draws the directory names of one experiment below the root.
+        Returns
+        -------
+        names : list of str
+            Performer, year, experiment and sometimes a session or trash folder.
+        """
+    conditions = [generator.choice(CULTURES)]
+    if generator.random() < 0.6:
+        conditions.append(f"{generator.randint(1, 35)} {generator.choice(['DIV', 'DAP', 'div', 'dap'])}")
+    if generator.random() < 0.5:
+        conditions.append(generator.choice(DRUGS))
+        if generator.random() < 0.7:
+            conditions.append(generator.choice(DOSES))
+    if generator.random() < 0.35:
+        conditions.append(generator.choice(RADIATIONS))
+        conditions.append(f"{generator.choice([0.5, 1, 2, 4.5, 10])} Gy")
+        if generator.random() < 0.7:
+            conditions.append(generator.choice(RADIATION_TIMES))
+    if generator.random() < 0.4:
+        conditions.append(generator.choice(EXTRAS))
+    names = [generator.choice(PERFORMERS), str(generator.randint(2012, 2023)), " ".join(conditions)]
+    if generator.random() < 0.3:
+        names.append(f"Session {generator.randint(1, 5)}")
+    if generator.random() < 0.05:
+        names.append(generator.choice(TRASH_FOLDERS))
+    return names
+
+
+def file_name(generator: random.Random, index: int) -> str:
+    """
+        Draws a file name, mostly Messung<dd.mm.yyyy>_<hh-mm-ss> recordings.
+        """
+    extension = generator.choice(EXTENSIONS)
+    if generator.random() < 0.8:
+        return (f"Messung{generator.randint(1, 28):02d}.{generator.randint(1, 12):02d}.{generator.randint(2012, 2023)}_"
+                f"{generator.randint(0, 23):02d}-{generator.randint(0, 59):02d}-{generator.randint(0, 59):02d}{extension}")
+    return f"rec_{index}{extension}"
+
+
+def generate_paths(number_of_files: int, seed: int = 0, root: str = "C:\\Data_from_W8", separator: str = "\\",
+                   files_per_directory: int = 20):
+    """
+        Yields synthetic recording paths, one at a time, so that 10M paths need no memory.
+        Parameters
+        ----------
+        number_of_files : int
+            Number of paths.
+        seed : int
+            Seed of the random generator; the same seed gives the same paths.
+        root : str
+            Root directory of all paths.
+        separator : str
+            Path separator, "\\" like the lab's Windows paths or os.sep for files on disk.
+        files_per_directory : int
+            Mean number of files in an experiment directory.
+        Yields
+        ------
+        path : str
+            A file path; about a quarter of them are not .brw / .dat files.
+        """
+    generator = random.Random(seed)
+    directory = None
+    for index in range(number_of_files):
+        if directory is None or generator.random() < 1 / files_per_directory:
+            directory = separator.join([root] + experiment_directory(generator))
+        yield directory + separator + file_name(generator, index)
+
+
+def write_path_list(path: str, number_of_files: int, seed: int = 0) -> None:
+    """
+        Writes synthetic paths into a text file, one per line.
+        """
+    with open(path, "w", encoding="utf-8") as file:
+        for location in generate_paths(number_of_files, seed):
+            file.write(location + "\n")
+
+
+def create_tree(root: str, number_of_files: int, seed: int = 0, file_size: int = 1024) -> None:
+    """
+        Creates the synthetic paths as files below `root`.
+        About 5% of the files are empty, the others have `file_size` bytes, allocated
+        sparsely.
+        """
+    generator = random.Random(seed)
+    for location in generate_paths(number_of_files, seed, root, os.sep):
+        os.makedirs(os.path.dirname(location), exist_ok=True)
+        with open(location, "wb") as file:
+            if generator.random() >= 0.05:
+                file.truncate(file_size)
+
+
+def parse_scale(scale: str) -> int:
+    """
+        Converts "10k", "1M" or "100000" into a number of files.
+        """
+    multipliers = {"k": 1000, "m": 1000 * 1000}
+    suffix = scale[-1].lower()
+    if suffix in multipliers:
+        return int(float(scale[:-1]) * multipliers[suffix])
+    return int(scale)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generates synthetic lab recording paths or directory trees.")
+    parser.add_argument("scale", help="Number of files, e.g. 10k, 100k, 1M or 10M.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--path-list", default=None, help="Text file to write the paths into.")
+    parser.add_argument("--tree", default=None, help="Directory in which the files are created.")
+    args = parser.parse_args()
+
+    number_of_files = parse_scale(args.scale)
+    if args.path_list:
+        write_path_list(args.path_list, number_of_files, args.seed)
+        print(f"Wrote {number_of_files} paths to {args.path_list}")
+    if args.tree:
+        create_tree(args.tree, number_of_files, args.seed)
+        print(f"Created {number_of_files} files below {args.tree}")
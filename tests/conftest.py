@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_corpus import create_tree  # noqa: E402
+
+EXTENSIONS = [".brw", ".dat"]
+
+
+@pytest.fixture(scope="module")
+def tree(tmp_path_factory):
+    """
+    A synthetic directory tree of recordings, shared by the tests of a module.
+    """
+    root = str(tmp_path_factory.mktemp("tree") / "Data_from_W8")
+    create_tree(root, 400, seed=1)
+    return root
+
+
+def full_run(root, extract_function=None):
+    """
+    The cleaned table of a full run of main.py over a tree.
+    """
+    import main
+    from append_functions import append_cleaning_function
+
+    entries = list(main.scan_directory(root, EXTENSIONS))
+    return append_cleaning_function((extract_function or main.extract_entries)(entries))
@@ -0,0 +1,42 @@
+import pandas as pd
+
+import extraction_rules as rules
+import main
+from append_functions import append_cleaning_function
+
+
+def cleaning_loop(df):
+    """
+    The row-by-row cleaning that append_cleaning_function replaced, counting the removed rows.
+    """
+    counts = {}
+    length = len(df)
+    df = df[~df.Location.str.contains('|'.join(rules.TRASH))]
+    df = df.reset_index(drop=True)
+    counts["trash"] = length - len(df)
+
+    length = len(df)
+    for index, row in df.iterrows():
+        if row["Size, Gb"] == 0:
+            df = df.drop(index=index)
+    df = df.reset_index(drop=True)
+    counts["zero size"] = length - len(df)
+
+    length = len(df)
+    for index, row in df.iterrows():
+        if pd.isna(row["Recording system"]):
+            df = df.drop(index=index)
+    df = df.reset_index(drop=True)
+    counts["no recording system"] = length - len(df)
+    return df, counts
+
+
+def test_cleaning_equals_the_row_loop(tree):
+    # Every extension, so that there are rows without a recording system
+    df = main.extract_entries(list(main.scan_directory(tree)))
+    expected, expected_counts = cleaning_loop(df)
+    cleaned, counts = append_cleaning_function(df, return_counts=True)
+    assert counts == expected_counts
+    assert all(counts.values())
+    pd.testing.assert_frame_equal(cleaned, expected)
+    pd.testing.assert_frame_equal(append_cleaning_function(df), expected)
@@ -0,0 +1,14 @@
+import pandas as pd
+
+from catalog_index import CatalogIndex, parse_condition
+from conftest import full_run
+
+
+def test_several_conditions_on_one_column_are_intersected(tree):
+    df = full_run(tree)
+    index = CatalogIndex.from_table(df)
+    conditions = [parse_condition(condition) for condition in ["DIV / DAP>=14", "DIV / DAP<=20"]]
+    numbers = pd.to_numeric(df["DIV / DAP"].str.split(" ").str[0], errors="coerce")
+    expected = df["Location"][(numbers >= 14) & (numbers <= 20)].tolist()
+    assert expected
+    assert index.select(conditions) == expected
@@ -0,0 +1,37 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import main
+from extraction_core import RECORDED_AT_DTYPE, recorded_at
+
+MTIME = 1700000000.75
+
+
+def test_recorded_at_falls_back_to_the_local_mtime():
+    recorded = recorded_at(["05.02.2016", "31.02.2019", None, None], ["17-40-49", "10-11-12", None, None],
+                           [MTIME, MTIME, MTIME, None])
+    assert recorded.dtype == RECORDED_AT_DTYPE
+    fallback = pd.Timestamp(datetime.fromtimestamp(int(MTIME)))
+    assert recorded.tolist() == [pd.Timestamp("2016-02-05 17:40:49"), fallback, fallback, pd.NaT]
+
+
+def test_recorded_at_dtype_does_not_depend_on_the_rows():
+    with_dates = recorded_at(["05.02.2016"], ["17-40-49"], [MTIME])
+    only_fallback = recorded_at([None], [None], [MTIME])
+    nothing = recorded_at([None], [None])
+    assert with_dates.dtype == only_fallback.dtype == nothing.dtype == RECORDED_AT_DTYPE
+
+
+def test_invalid_date_in_a_path_takes_the_mtime(tmp_path):
+    path = str(tmp_path / "Messung31.02.2019_10-11-12.dat")
+    with open(path, "wb") as file:
+        file.write(b"\0" * 100)
+    os.utime(path, (MTIME, MTIME))
+    for extract_function in (main.extract_entries, main.extract_entries_legacy):
+        df = extract_function([main.entry_from_path(path)])
+        assert df["Date"][0] == "31.02.2019"
+        assert df["Recorded at"].dtype == RECORDED_AT_DTYPE
+        assert df["Recorded at"][0] == np.datetime64(datetime.fromtimestamp(int(MTIME)))
@@ -0,0 +1,77 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import main
+from conftest import EXTENSIONS
+from file_stats import STAT_OK, StatCounter, stat_path, stat_paths
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for index in range(10):
+        path = tmp_path / f"file{index}.brw"
+        path.write_bytes(b"\0" * index)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_stat_paths_keeps_the_order_and_reports_removed_files(files, workers):
+    removed = files[3]
+    os.remove(removed)
+    results = list(stat_paths(files, workers, batch_size=4))
+    assert [path for path, stat in results] == files
+    for path, (size, mtime, inode, status) in results:
+        if path == removed:
+            assert (size, mtime, inode) == (None, None, None)
+            assert status.startswith("FileNotFoundError: ")
+        else:
+            stat = os.stat(path)
+            assert (size, mtime, inode, status) == (stat.st_size, stat.st_mtime, stat.st_ino, STAT_OK)
+
+
+def test_stat_paths_reads_one_batch_at_a_time(files):
+    consumed = []
+
+    def paths():
+        for path in files:
+            consumed.append(path)
+            yield path
+
+    results = stat_paths(paths(), workers=4, batch_size=4)
+    next(results)
+    assert len(consumed) == 4
+    assert len(list(results)) == len(files) - 1
+
+
+def test_stat_counter_counts_errors(files):
+    os.remove(files[0])
+    counter = StatCounter()
+    entries = list(counter.count(main.entry_from_path(path) for path in files + [files[0]]))
+    assert len(entries) == 11
+    report = counter.report()
+    assert (report["files"], report["errors"]) == (11, {"FileNotFoundError": 2})
+    assert stat_path(files[0])[3] == entries[0].status
+
+
+@pytest.mark.parametrize("stat_workers", [0, 3])
+def test_status_column_of_a_removed_file(tmp_path, tree, stat_workers):
+    root = str(tmp_path / "Data_from_W8")
+    shutil.copytree(tree, root)
+    entries = list(main.scan_directory(root, EXTENSIONS, stat_workers=stat_workers))
+    # Removed between the listing and the stat of the file
+    removed = entries[5].path
+    os.remove(removed)
+    entries[5] = main.entry_from_path(removed)
+
+    csv_path = str(tmp_path / "catalog.csv")
+    main.stream_catalog(entries, csv_path, chunk_size=64, status=True)
+    df = pd.read_csv(csv_path, index_col=0)
+    statuses = df.set_index("Location")["Status"]
+    assert statuses[removed].startswith("FileNotFoundError: ")
+    assert pd.isna(df.set_index("Location")["Size, Gb"][removed])
+    assert (statuses.drop(removed) == STAT_OK).all()
@@ -0,0 +1,43 @@
+import os
+
+import pandas as pd
+
+from fingerprint import BLOCK_SIZE, append_df_with_fingerprint, block_offsets, duplicate_report
+
+SIZE = 16 * BLOCK_SIZE
+
+
+def write(path, data):
+    with open(path, "wb") as file:
+        file.write(data)
+    return str(path)
+
+
+def test_copies_share_a_duplicate_group(tmp_path):
+    data = bytes(range(256)) * (SIZE // 256)
+    # Differs from the copies only in the block sampled at the middle of the file
+    middle = block_offsets(SIZE)[2]
+    assert middle not in (0, SIZE - BLOCK_SIZE)
+    changed = bytearray(data)
+    changed[middle + 10] ^= 0xFF
+    paths = [write(tmp_path / "a.brw", data), write(tmp_path / "changed.brw", bytes(changed)),
+             write(tmp_path / "copy of a.brw", data), str(tmp_path / "missing.brw")]
+    df = pd.DataFrame({"Location": paths, "Size, Gb": [SIZE / 1024 ** 3] * 3 + [None]})
+
+    df, bytes_read = append_df_with_fingerprint(df, workers=2)
+    assert df["Duplicate group"].tolist() == [0, 1, 0, pd.NA]
+    assert df["Fingerprint"][0] == df["Fingerprint"][2] != df["Fingerprint"][1]
+    assert pd.isna(df["Fingerprint"][3])
+    assert bytes_read[:3] == [len(block_offsets(SIZE)) * BLOCK_SIZE] * 3
+    assert duplicate_report(df) == {"groups": 1, "files": 2, "redundant_gb": SIZE / 1024 ** 3}
+
+
+def test_duplicate_groups_span_chunks(tmp_path):
+    data = os.urandom(SIZE)
+    first = pd.DataFrame({"Location": [write(tmp_path / "a.dat", data), write(tmp_path / "b.dat", data[::-1])]})
+    second = pd.DataFrame({"Location": [write(tmp_path / "c.dat", data[::-1])]})
+    groups = {}
+    first, _ = append_df_with_fingerprint(first, workers=1, groups=groups)
+    second, _ = append_df_with_fingerprint(second, workers=1, groups=groups)
+    assert first["Duplicate group"].tolist() == [0, 1]
+    assert second["Duplicate group"].tolist() == [1]
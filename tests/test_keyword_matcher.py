@@ -0,0 +1,97 @@
+import sys
+
+import pandas as pd
+import pytest
+
+import keyword_matcher
+from conftest import full_run
+from extraction_rules import VOCABULARIES
+from keyword_matcher import KeywordMatcher, LRUCache
+
+EXTRA_PATHS = [
+    "/data/Xa1R2 Ti 5 DIV/Rat hESC Stim.brw",
+    "C:\\Data\\BioMEMS\\ bicuculline Sham\\laser 12.dat",
+    "/data/Bic/carba/LSD/Nick/a.R.dat",
+    "/data/no keywords at all.brw",
+    "",
+]
+
+
+def chained_contains(locations, groups):
+    """
+    The baseline: one str.contains per group, earlier groups taking precedence.
+    """
+    column = pd.Series(None, index=locations.index, dtype=object)
+    for label, keywords in groups:
+        found = locations.str.contains("|".join(keywords), regex=True)
+        column = column.combine_first(pd.Series(label, index=locations.index).where(found))
+    return column.where(column.notna(), None).tolist()
+
+
+@pytest.mark.parametrize("directory_cache_size", [0, 3, 65536])
+def test_matcher_equals_chained_str_contains(tree, directory_cache_size):
+    locations = pd.Series(list(full_run(tree)["Location"]) + EXTRA_PATHS, dtype=object)
+    matcher = KeywordMatcher(VOCABULARIES, directory_cache_size)
+    for column, groups in VOCABULARIES.items():
+        assert matcher.match_column(locations, column) == chained_contains(locations, groups), column
+
+
+def test_regex_and_overlapping_keywords():
+    vocabularies = {"A": [("dot", ["a.R."]), ("alternation", ["x|yz"]), ("plain", ["aR", "R"])],
+                    "B": [("long", ["DIV"]), ("short", ["IV"]), ("separator", ["s/t"])]}
+    locations = pd.Series(["abRc", "a-R-", "ayz", "xIV", "DIV", "s/t/aR", "s\\t", "none"], dtype=object)
+    matcher = KeywordMatcher(vocabularies)
+    # A keyword containing a separator disables the directory cache
+    assert matcher.directory_cache.maxsize == 0
+    for column, groups in vocabularies.items():
+        assert matcher.match_column(locations, column) == chained_contains(locations, groups)
+    assert matcher.match("a.R.") == ["dot", None]
+    assert matcher.match("yzIV") == ["alternation", "short"]
+
+
+def test_python_automaton_finds_overlapping_keywords():
+    # Also checked if pyahocorasick is installed and used by default
+    transitions, outputs = keyword_matcher.build_automaton(["he", "she", "his", "hers"])
+    matcher = KeywordMatcher({"A": [("he", ["he"]), ("she", ["she"]), ("his", ["his"]), ("hers", ["hers"])]})
+    matcher.transitions, matcher.outputs = transitions, outputs
+    assert sorted(matcher.keywords[index] for index in matcher.find_keywords_python("ushers")) == ["he", "hers", "she"]
+
+
+def test_lru_cache_evicts_the_least_recently_used_entry():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    # Replacing a value makes the entry the most recent one without counting it twice
+    cache.put("a", 4)
+    cache.put("d", 5)
+    assert list(cache.entries) == ["a", "d"]
+    info = cache.info()
+    assert {key: info[key] for key in ("hits", "misses", "entries", "maxsize", "evictions")} == {
+        "hits": 3, "misses": 1, "entries": 2, "maxsize": 2, "evictions": 2}
+    assert info["hit_rate"] == 0.75
+    assert info["memory_bytes"] == sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in cache.entries.items())
+
+
+def test_disabled_lru_cache_stores_nothing():
+    cache = LRUCache(0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    assert cache.info() == {"hits": 0, "misses": 1, "hit_rate": 0.0, "entries": 0, "maxsize": 0, "evictions": 0,
+                            "memory_bytes": 0}
+
+
+def test_directory_cache_scans_every_directory_once():
+    paths = [f"/data/{directory}/Messung{index}.brw" for directory in ("Rat", "Cardio", "Rat") for index in range(3)]
+    expected = [KeywordMatcher(VOCABULARIES, directory_cache_size=0).match(path) for path in paths]
+    matcher = KeywordMatcher(VOCABULARIES, directory_cache_size=8)
+    assert [matcher.match(path) for path in paths] == expected
+    info = matcher.directory_cache.info()
+    # "", "/data", "/data/Rat" and "/data/Cardio" are scanned once each
+    assert (info["misses"], info["hits"], info["entries"], info["evictions"]) == (4, 8, 4, 0)
+    small = KeywordMatcher(VOCABULARIES, directory_cache_size=2)
+    assert [small.match(path) for path in paths] == expected
+    assert small.directory_cache.info()["evictions"] > 0
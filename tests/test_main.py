@@ -0,0 +1,41 @@
+import os
+
+import pandas as pd
+import pytest
+
+import main
+from append_functions import append_cleaning_function
+from conftest import EXTENSIONS, full_run
+from extraction_core import CSV_DATE_FORMAT
+
+
+@pytest.mark.parametrize("string_dtype", [None, "object", "string[python]", "string[pyarrow]"])
+def test_engine_equals_legacy_stages(tree, string_dtype):
+    if string_dtype == "string[pyarrow]":
+        pytest.importorskip("pyarrow")
+    entries = list(main.scan_directory(tree, EXTENSIONS))
+    engine = main.extract_entries(entries, string_dtype=string_dtype)
+    legacy = main.extract_entries_legacy(entries, string_dtype=string_dtype)
+    pd.testing.assert_frame_equal(engine, legacy)
+    pd.testing.assert_frame_equal(append_cleaning_function(engine), append_cleaning_function(legacy))
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, 100000])
+def test_chunked_catalog_equals_full_run(tmp_path, tree, chunk_size):
+    full_path = str(tmp_path / "full.csv")
+    full = full_run(tree)
+    full.to_csv(full_path, date_format=CSV_DATE_FORMAT)
+    chunked_path = str(tmp_path / "chunked.csv")
+    counts = main.stream_catalog(main.scan_directory(tree, EXTENSIONS), chunked_path, chunk_size)
+    assert counts["rows"] == len(full)
+    with open(chunked_path, "rb") as chunked, open(full_path, "rb") as expected:
+        assert chunked.read() == expected.read()
+
+
+def test_worker_processes_equal_one_process(tree):
+    entries = list(main.scan_directory(tree, EXTENSIONS))
+    # A file that vanished after the walk is sent to the workers without a size
+    entries.insert(5, main.entry_from_path(os.path.join(tree, "vanished 21 DIV.brw")))
+    serial = main.extract_entries(entries)
+    pd.testing.assert_frame_equal(main.extract_entries(entries, workers=2), serial)
+    pd.testing.assert_frame_equal(main.extract_entries(entries, workers=3), serial)
@@ -0,0 +1,45 @@
+import os
+import shutil
+
+import pandas as pd
+
+import main
+from append_functions import append_cleaning_function
+from conftest import EXTENSIONS, full_run
+from manifest import extract_entries_incremental, load_manifest, save_manifest
+
+
+def incremental_run(root, manifest_path):
+    manifest = load_manifest(manifest_path)
+    entries = list(main.scan_directory_incremental(root, EXTENSIONS, manifest))
+    df = append_cleaning_function(extract_entries_incremental(entries, manifest, main.extract_entries))
+    save_manifest(manifest, manifest_path)
+    return df, manifest
+
+
+def test_incremental_run_equals_full_run(tmp_path, tree):
+    root = str(tmp_path / "Data_from_W8")
+    shutil.copytree(tree, root)
+    manifest_path = str(tmp_path / "manifest.pkl")
+    df, manifest = incremental_run(root, manifest_path)
+    pd.testing.assert_frame_equal(df, full_run(root))
+    assert manifest.extracted == len(manifest.files)
+
+    locations = sorted(full_run(root)["Location"])
+    os.remove(locations[0])
+    with open(locations[1], "ab") as file:
+        file.write(b"\0" * 100)
+    directory = os.path.dirname(locations[2])
+    with open(os.path.join(directory, "Messung01.02.2021_10-11-12 21DIV.brw"), "wb") as file:
+        file.write(b"\0" * 100)
+    os.makedirs(os.path.join(directory, "new 14 DIV"))
+    with open(os.path.join(directory, "new 14 DIV", "rec 5 Gy.dat"), "wb") as file:
+        file.write(b"\0" * 100)
+
+    df, manifest = incremental_run(root, manifest_path)
+    pd.testing.assert_frame_equal(df, full_run(root))
+    assert manifest.extracted == 3
+
+    df, manifest = incremental_run(root, manifest_path)
+    pd.testing.assert_frame_equal(df, full_run(root))
+    assert (manifest.extracted, manifest.listed) == (0, 0)
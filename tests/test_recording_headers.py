@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+import pytest
+
+from benchmark_headers import create_synthetic_dat_files
+from recording_headers import h5py, read_headers
+
+
+def write_brw_v4(path, rate=20000.0, channels=64, frames=40000):
+    with h5py.File(path, "w") as file:
+        file.attrs["SamplingRate"] = rate
+        well = file.create_group("Well_A1")
+        well.create_dataset("StoredChIdxs", data=np.arange(channels))
+        file.create_dataset("TOC", data=np.array([[0, frames]]))
+
+
+@pytest.mark.skipif(h5py is None, reason="requires h5py")
+def test_unreadable_brw_is_an_error_of_its_own_row(tmp_path):
+    valid = str(tmp_path / "valid.brw")
+    write_brw_v4(valid)
+    dangling = str(tmp_path / "dangling.brw")
+    os.symlink(str(tmp_path / "gone.brw"), dangling)
+    missing = str(tmp_path / "missing.brw")
+
+    headers = read_headers([valid, dangling, missing], workers=2)
+    assert headers[0]["error"] is None
+    assert headers[0]["Sampling rate"] == "20 kHz"
+    assert headers[0]["Electrode"] == 64
+    assert headers[0]["Timeframe, s"] == 2
+    for header in headers[1:]:
+        assert header["error"].startswith("FileNotFoundError")
+        assert header["size"] == 0 and header["bytes_read"] == 0
+
+
+def test_unreadable_dat_is_an_error_of_its_own_row(tmp_path):
+    valid, = create_synthetic_dat_files(str(tmp_path), number_of_files=1, channels=4, rate=1000, seconds=3)
+    dangling = str(tmp_path / "dangling.dat")
+    os.symlink(str(tmp_path / "gone.dat"), dangling)
+    missing = str(tmp_path / "missing.dat")
+
+    headers = read_headers([dangling, valid, missing], workers=2)
+    assert headers[1]["error"] is None
+    assert (headers[1]["Date"], headers[1]["Time"]) == ("12.03.2021", "12-30-00")
+    assert headers[1]["Sampling rate"] == "1 kHz"
+    assert headers[1]["Electrode"] == 4
+    assert headers[1]["Timeframe, s"] == 3
+    for header in (headers[0], headers[2]):
+        assert header["error"].startswith("FileNotFoundError")
+        assert header["size"] == 0 and header["bytes_read"] == 0
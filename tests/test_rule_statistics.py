@@ -0,0 +1,35 @@
+from rule_statistics import STATISTICS_COLUMNS, RuleStatistics
+
+PATHS = ["/data/Control Sham/a.brw", "/data/DMSO/b.brw", "/data/sham/c.brw", "/data/none/d.brw",
+         "/data/Slice Stimulation/e.brw", "/data/xaXRx/f.brw"]
+
+
+def counts(table, rule_set, keyword):
+    row = table[(table["Rule set"] == rule_set) & (table["Keyword"] == keyword)]
+    assert len(row) == 1
+    return row[["Group", "Label", "Matched", "Won", "Tie-breaks won", "Shadowed"]].iloc[0].tolist()
+
+
+def test_winner_tie_break_and_shadowed_counts():
+    statistics = RuleStatistics()
+    # Counts accumulate over chunks
+    statistics.add(PATHS[:3])
+    statistics.add(PATHS[3:])
+    table = statistics.table()
+    assert list(table.columns) == STATISTICS_COLUMNS
+    assert (table["Paths"] == len(PATHS)).all()
+
+    # Control and Sham both match the first path; the earlier group wins the tie
+    assert counts(table, "Control", "Control") == [0, "Control", 1, 1, 1, 0]
+    assert counts(table, "Control", "DMSO") == [0, "Control", 1, 1, 0, 0]
+    assert counts(table, "Control", "Kontrol") == [0, "Control", 0, 0, 0, 0]
+    assert counts(table, "Control", "Sham") == [1, "Sham", 1, 0, 0, 1]
+    assert counts(table, "Control", "sham") == [1, "Sham", 1, 1, 0, 0]
+    # Keywords of the same group do not compete
+    assert counts(table, "Stimulation", "Stimulation") == [0, "Slice stimulation", 1, 1, 0, 0]
+    assert counts(table, "Stimulation", "Stim") == [0, "Slice stimulation", 1, 1, 0, 0]
+    # "a.R." is a regular expression, "aR" a substring
+    assert counts(table, "Radiation", "a.R.")[2:4] == [1, 1]
+    assert counts(table, "Radiation", "aR")[2] == 0
+    assert table.loc[table["Keyword"] == "a.R.", "Regex"].all()
+    assert table.loc[(table["Rule set"] == "Control") & (table["Keyword"] == "Control"), "Match rate"].iloc[0] == 1 / 6
@@ -0,0 +1,50 @@
+import os
+import shutil
+
+import pandas as pd
+
+import shards
+from conftest import full_run
+from extraction_core import CSV_DATE_FORMAT
+
+
+def test_merged_catalog_equals_full_run(tree):
+    partials = [shards.scan_shard(tree, index, 3) for index in range(3)]
+    df, report = shards.merge_partials(partials)
+    pd.testing.assert_frame_equal(df, full_run(tree))
+    assert report["superseded"] == 0
+    assert report["missing_subtrees"] == []
+
+
+def test_rescan_after_delete_drops_the_deleted_file(tmp_path, tree):
+    root = str(tmp_path / "Data_from_W8")
+    shutil.copytree(tree, root)
+    partials = [shards.scan_shard(root, index, 2) for index in range(2)]
+    subtree = shards.list_subtrees(root)[1]
+    locations = full_run(root)["Location"]
+    deleted = locations[locations.str.startswith(os.path.join(root, subtree, ""))].iloc[0]
+    os.remove(deleted)
+
+    partials.append(shards.scan_shard(root, subtrees=[subtree]))
+    df, report = shards.merge_partials(partials)
+    assert deleted not in set(df["Location"])
+    assert report["superseded"] > 0
+    pd.testing.assert_frame_equal(df, full_run(root))
+
+
+def test_partial_catalog_round_trip(tmp_path, tree):
+    partial = shards.scan_shard(tree, 0, 2)
+    shards.save_partial(partial, str(tmp_path / "shard.pkl"))
+    loaded = shards.load_partial(str(tmp_path / "shard.pkl"))
+    assert vars(loaded) == vars(partial)
+
+
+def test_run_shards_and_merge_and_write_equal_full_run(tmp_path, tree):
+    partial_paths = shards.run_shards(tree, 3, str(tmp_path / "partials"))
+    assert len(partial_paths) == 3
+    csv_path = str(tmp_path / "merged.csv")
+    shards.merge_and_write(partial_paths, csv_path)
+    expected_path = str(tmp_path / "full.csv")
+    full_run(tree).to_csv(expected_path, date_format=CSV_DATE_FORMAT)
+    with open(csv_path, "rb") as merged, open(expected_path, "rb") as expected:
+        assert merged.read() == expected.read()
@@ -0,0 +1,53 @@
+import sqlite3
+
+from conftest import full_run
+from sqlite_catalog import TABLE_NAME, write_sqlite
+from typed_catalog import to_typed_catalog
+
+
+def test_numeric_columns_stay_numeric_after_a_chunk_without_values(tree, tmp_path):
+    df = full_run(tree)
+    half = len(df) // 2
+    first, second = df.iloc[:half].copy(), df.iloc[half:].copy()
+    # The first chunk has no pitch at all, the second one has the numbers
+    first["Pitch, µm"] = None
+    second["Pitch, µm"] = [42.0, 1750.0] * (len(second) // 2) + [42.0] * (len(second) % 2)
+    path = str(tmp_path / "catalog.sqlite")
+    write_sqlite(first, path)
+    write_sqlite(second, path)
+
+    connection = sqlite3.connect(path)
+    try:
+        types = {row[1]: row[2] for row in connection.execute(f'PRAGMA table_info("{TABLE_NAME}")')}
+        above = connection.execute(f'SELECT COUNT(*) FROM "{TABLE_NAME}" WHERE "Pitch, µm" > 1000').fetchone()[0]
+        below = connection.execute(f'SELECT COUNT(*) FROM "{TABLE_NAME}" WHERE "Pitch, µm" <= 1000').fetchone()[0]
+    finally:
+        connection.close()
+    assert types["Pitch, µm"] == "REAL"
+    assert types["Size, Gb"] == "REAL"
+    assert types["Electrode"] == "INTEGER"
+    assert types["Timeframe, s"] == "INTEGER"
+    assert types["Performer"] == "TEXT"
+    assert above == (second["Pitch, µm"] > 1000).sum()
+    assert below == (second["Pitch, µm"] <= 1000).sum()
+
+
+def test_range_query_on_a_typed_catalog(tree, tmp_path):
+    df = to_typed_catalog(full_run(tree))
+    path = str(tmp_path / "catalog.sqlite")
+    write_sqlite(df, path)
+
+    connection = sqlite3.connect(path)
+    try:
+        count = connection.execute(
+            f'SELECT COUNT(*) FROM "{TABLE_NAME}" WHERE "DIV / DAP" BETWEEN 7 AND 21 AND "DIV / DAP unit" = ?',
+            ("DIV",)).fetchone()[0]
+        doses = [row[0] for row in connection.execute(
+            f'SELECT "Radiation dose" FROM "{TABLE_NAME}" WHERE "Radiation dose" >= 2 ORDER BY "Radiation dose"')]
+        types = {row[0] for row in connection.execute(f'SELECT DISTINCT typeof("Drug dose") FROM "{TABLE_NAME}"')}
+    finally:
+        connection.close()
+    expected = df["DIV / DAP"].between(7, 21) & (df["DIV / DAP unit"] == "DIV")
+    assert 0 < count == expected.sum()
+    assert doses and doses == sorted(df["Radiation dose"].dropna()[df["Radiation dose"].dropna() >= 2])
+    assert types <= {"real", "null"}
@@ -0,0 +1,33 @@
+import pandas as pd
+
+from conftest import full_run
+from typed_catalog import (CATEGORY_COLUMNS, NUMERIC_COLUMNS, QUANTITY_COLUMNS, STRING_COLUMNS, to_typed_catalog,
+                           unit_column)
+
+
+def test_typed_catalog_dtypes_and_values(tree):
+    df = full_run(tree)
+    typed = to_typed_catalog(df)
+    assert typed.index.equals(df.index)
+
+    for column in CATEGORY_COLUMNS:
+        assert isinstance(typed[column].dtype, pd.CategoricalDtype)
+        assert typed[column].astype(object).where(typed[column].notna()).equals(
+            df[column].astype(object).where(df[column].notna()))
+    for column in STRING_COLUMNS:
+        assert isinstance(typed[column].dtype, pd.StringDtype)
+        assert typed[column].fillna("").tolist() == df[column].fillna("").tolist()
+    for column, dtype in NUMERIC_COLUMNS.items():
+        assert typed[column].dtype == dtype
+        pd.testing.assert_series_equal(typed[column].astype("float64"), df[column].astype("float64"))
+    assert typed["Electrode"].dtype == typed["Timeframe, s"].dtype == "Int64"
+
+    for column, dtype in QUANTITY_COLUMNS.items():
+        assert typed[column].dtype == dtype
+        assert isinstance(typed[unit_column(column)].dtype, pd.CategoricalDtype)
+        present = df[column].notna()
+        assert present.any()
+        parts = df[column][present].str.split(" ", n=1, expand=True)
+        assert typed[column][present].astype("float64").tolist() == pd.to_numeric(parts[0]).tolist()
+        assert typed[unit_column(column)][present].astype(object).tolist() == parts[1].tolist()
+        assert typed[column][~present].isna().all()
@@ -0,0 +1,87 @@
+import os
+import random
+import time
+
+import pytest
+
+import main
+from conftest import EXTENSIONS
+from file_stats import STAT_OK
+
+
+@pytest.fixture
+def walk_tree(tmp_path):
+    """
+    A small tree with mixed-case extensions, near-miss extensions and symlinks.
+    """
+    root = tmp_path / "root"
+    for relative, size in [("a.brw", 10), ("b.BRW", 20), ("c.Dat", 30), ("d.br", 1), ("e.brw.bak", 1),
+                           ("sub/f.brw", 40), ("sub/deeper/g.dat", 50), ("other/h.txt", 1)]:
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"\0" * size)
+    os.symlink(root / "sub", root / "linked_dir")
+    os.symlink(root / "a.brw", root / "linked.brw")
+    os.symlink(root / "missing.brw", root / "broken.brw")
+    return str(root)
+
+
+def relative_paths(root, entries):
+    return [os.path.relpath(entry.path, root) for entry in entries]
+
+
+def test_extensions_match_exactly_and_case_insensitively(walk_tree):
+    entries = list(main.scan_directory(walk_tree, [".brw", ".dat"]))
+    assert relative_paths(walk_tree, entries) == [
+        "a.brw", "b.BRW", "broken.brw", "c.Dat", "linked.brw", os.path.join("linked_dir", "deeper", "g.dat"),
+        os.path.join("linked_dir", "f.brw"), os.path.join("sub", "deeper", "g.dat"), os.path.join("sub", "f.brw")]
+    assert relative_paths(walk_tree, main.scan_directory(walk_tree, ".DAT")) == [
+        "c.Dat", os.path.join("linked_dir", "deeper", "g.dat"), os.path.join("sub", "deeper", "g.dat")]
+    assert len(list(main.scan_directory(walk_tree))) == 12
+
+
+def test_entries_carry_the_stat_of_the_walk(walk_tree):
+    entries = {os.path.relpath(entry.path, walk_tree): entry for entry in main.scan_directory(walk_tree, ".brw")}
+    for relative, entry in entries.items():
+        if relative == "broken.brw":
+            continue
+        stat = os.stat(entry.path)
+        assert (entry.size, entry.mtime, entry.status) == (stat.st_size, stat.st_mtime, STAT_OK)
+    # Symlinks are followed like os.path.isdir / getsize did
+    assert entries["linked.brw"].size == 10
+    assert entries[os.path.join("linked_dir", "f.brw")].size == 40
+    # A dangling symlink is listed with the error instead of aborting the walk
+    broken = entries["broken.brw"]
+    assert broken.size is None and broken.status.startswith("FileNotFoundError")
+
+
+@pytest.mark.parametrize("walk_workers", [1, 3])
+def test_unreadable_directory_raises(monkeypatch, walk_tree, walk_workers):
+    unreadable = os.path.join(walk_tree, "sub", "deeper")
+    scandir = os.scandir
+
+    def failing_scandir(path):
+        if path == unreadable:
+            raise PermissionError(13, "Permission denied", path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", failing_scandir)
+    with pytest.raises(PermissionError):
+        list(main.scan_directory(walk_tree, ".dat", walk_workers=walk_workers))
+
+
+@pytest.mark.parametrize("walk_workers", [2, 4, 16])
+@pytest.mark.parametrize("stat_workers", [0, 3])
+def test_concurrent_walk_equals_serial_walk(monkeypatch, tree, walk_workers, stat_workers):
+    serial = list(main.scan_directory(tree, EXTENSIONS))
+    # Listings that finish in a random order, like on a network share
+    scandir = os.scandir
+
+    def slow_scandir(path):
+        time.sleep(random.Random(path).random() / 500)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", slow_scandir)
+    arguments = main.parse_arguments(["--path", tree, "--walk-workers", str(walk_workers)])
+    concurrent = list(main.scan_directory(tree, EXTENSIONS, arguments.walk_workers, stat_workers))
+    assert concurrent == serial
@@ -0,0 +1,85 @@
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+import watch
+from conftest import full_run
+from extraction_core import CSV_DATE_FORMAT
+
+
+def copy_tree(tree, tmp_path):
+    root = str(tmp_path / "Data_from_W8")
+    shutil.copytree(tree, root)
+    return root
+
+
+def write_slowly(path, blocks, seconds):
+    with open(path, "wb") as file:
+        for _ in range(blocks):
+            file.write(b"\0" * 1000)
+            file.flush()
+            time.sleep(seconds)
+
+
+@pytest.mark.parametrize("polling", [True, False])
+def test_watched_catalog_equals_full_run(tmp_path, tree, polling):
+    if not polling and watch.libc is None:
+        pytest.skip("inotify is not available")
+    root = copy_tree(tree, tmp_path)
+    csv_path = str(tmp_path / "catalog.csv")
+    watcher = threading.Thread(target=watch.watch_catalog, args=(root, csv_path),
+                               kwargs={"debounce_seconds": 0.3, "poll_interval": 0.2, "polling": polling,
+                                       "duration": 4.0})
+    watcher.start()
+    while not os.path.exists(csv_path):
+        time.sleep(0.05)
+
+    locations = sorted(full_run(root)["Location"])
+    directory = os.path.join(os.path.dirname(locations[0]), "new 14 DIV")
+    os.makedirs(directory)
+    write_slowly(os.path.join(directory, "Messung01.02.2021_10-11-12.brw"), 6, 0.1)
+    with open(locations[1], "ab") as file:
+        file.write(b"\0" * 100)
+    os.remove(locations[2])
+    watcher.join()
+
+    expected_path = str(tmp_path / "expected.csv")
+    full_run(root).to_csv(expected_path, date_format=CSV_DATE_FORMAT)
+    with open(csv_path, "rb") as catalog, open(expected_path, "rb") as expected:
+        assert catalog.read() == expected.read()
+
+
+@pytest.mark.skipif(watch.libc is None, reason="inotify is not available")
+def test_rescan_after_overflow_watches_new_directories_and_waits_for_recent_files(tmp_path, tree):
+    root = copy_tree(tree, tmp_path)
+    catalog = watch.LiveCatalog(root, str(tmp_path / "catalog.csv"))
+    watcher = watch.InotifyWatcher(root)
+    try:
+        catalog.rebuild()
+        # Created while the events were lost
+        directory = os.path.join(root, "new 14 DIV")
+        os.makedirs(directory)
+        old = os.path.join(directory, "old.brw")
+        with open(old, "wb") as file:
+            file.write(b"\0" * 100)
+        os.utime(old, (time.time() - 60, time.time() - 60))
+        recent = os.path.join(directory, "recent.brw")
+        with open(recent, "wb") as file:
+            file.write(b"\0" * 100)
+        pending = {}
+
+        watch.rescan(watcher, catalog, pending, debounce_seconds=10)
+        assert directory in watcher.directories.values()
+        assert old in catalog.rows
+        assert recent in pending and recent not in catalog.rows
+
+        later = os.path.join(directory, "later.brw")
+        with open(later, "wb") as file:
+            file.write(b"\0" * 100)
+        paths, removed_directories, overflowed = watcher.poll(1.0)
+        assert later in paths
+    finally:
+        watcher.close()
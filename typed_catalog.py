@@ -0,0 +1,128 @@
+import pandas as pd
+
+import extraction_rules as rules
+from extraction_core import CSV_DATE_FORMAT
+
+# Label columns and their known labels, in the order of the rules
+CATEGORY_COLUMNS = {
+    "Format": [],
+    "Recording system": ["HDMEA", "MEA"],
+    "Culture type": [group[0] for group in rules.CULTURE_TYPE],
+    "Cell's kind": [group[0] for group in rules.CELLS_KIND],
+    "Performer": [group[0] for group in rules.PERFORMER],
+    "Laboratory": [group[0] for group in rules.LABORATORY],
+    "Drug application": [group[0] for group in rules.DRUG_APPLICATION],
+    "Radiation": [group[0] for group in rules.RADIATION],
+    "Nanoparticles": [group[0] for group in rules.NANOPARTICLES],
+    "Laser": [rules.LASER[0]],
+    "Stimulation": [rules.STIMULATION[0]],
+    "Control": [group[0] for group in rules.CONTROL],
+}
+
+# Columns holding "<number> <unit>" strings and the dtype of their numbers
+QUANTITY_COLUMNS = {
+    "Sampling rate": "Float64",
+    "DIV / DAP": "Int64",
+    "Drug dose": "Float64",
+    "Radiation dose": "Float64",
+    "Time before radiation": "Int64",
+    "Time after radiation": "Int64",
+}
+
+NUMERIC_COLUMNS = {
+    "Size, Gb": "Float64",
+    "Pitch, µm": "Float64",
+    "Electrode": "Int64",
+    "Timeframe, s": "Int64",
+}
+
+STRING_COLUMNS = ["Location", "Date", "Time"]
+
+QUANTITY_PATTERN = r'^\s*(\d+(?:[.,]\d+)?)\s*(.*?)\s*$'
+
+
+def unit_column(column: str) -> str:
+    """
+        Returns the name of the unit column that belongs to a quantity column.
+        """
+    return f"{column} unit"
+
+
+def split_quantity(series: pd.Series, dtype: str):
+    """
+        Splits "<number> <unit>" strings into a number and a unit.
+        Parameters
+        ----------
+        series : pd.Series
+            Strings like "21 DIV", "10.0 µM" or "0,5 µM"; missing values stay missing.
+        dtype : str
+            Nullable dtype of the numbers, "Int64" or "Float64".
+        Returns
+        -------
+        values : pd.Series
+            The numbers. Strings that do not start with a number give <NA>.
+        units : pd.Series
+            The units as a categorical.
+        """
+    parts = series.astype("string").str.extract(QUANTITY_PATTERN)
+    numbers = pd.to_numeric(parts[0].str.replace(",", ".", regex=False), errors="coerce")
+    if dtype == "Int64":
+        # Drop fractional values rather than failing on them
+        numbers = numbers.where(numbers.isna() | (numbers % 1 == 0))
+    values = numbers.astype(dtype)
+    units = parts[1].where(parts[1] != "").astype("category")
+    return values, units
+
+
+def to_typed_catalog(df: pd.DataFrame) -> pd.DataFrame:
+    """
+        Converts the extracted table into compact, typed columns.
+        Labels become categoricals, numbers nullable integers or floats, and every quantity
+        column is split into its number and a "<column> unit" column, e.g. "DIV / DAP" = 21
+        and "DIV / DAP unit" = "DIV". Range filters are then plain comparisons:
+        df["DIV / DAP"].between(14, 28) & (df["DIV / DAP unit"] == "DIV").
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The table produced by the extraction.
+        Returns
+        -------
+        typed_df : pd.DataFrame
+            The typed table, with the same rows and the unit columns added.
+        """
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        if column in CATEGORY_COLUMNS:
+            labels = CATEGORY_COLUMNS[column]
+            observed = set(series.dropna()) - set(labels)
+            categories = labels + sorted(observed)
+            columns[column] = pd.Categorical(series.where(series.notna(), None), categories=categories)
+        elif column in QUANTITY_COLUMNS:
+            columns[column], columns[unit_column(column)] = split_quantity(series, QUANTITY_COLUMNS[column])
+        elif column in NUMERIC_COLUMNS:
+            columns[column] = pd.to_numeric(series, errors="coerce").astype(NUMERIC_COLUMNS[column])
+        elif column in STRING_COLUMNS:
+            columns[column] = series.astype("string")
+        else:
+            columns[column] = series
+    return pd.DataFrame(columns, index=df.index)
+
+
+def write_catalog(df: pd.DataFrame, path: str) -> None:
+    """
+        Writes the table in the format given by the file extension.
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The table.
+        path : str
+            Output file: .parquet (needs pyarrow) and .pkl keep the column types, any
+            other extension is written as .csv.
+        """
+    if path.endswith(".parquet"):
+        df.to_parquet(path)
+    elif path.endswith(".pkl"):
+        df.to_pickle(path)
+    else:
+        df.to_csv(path, date_format=CSV_DATE_FORMAT)
@@ -0,0 +1,415 @@
+import argparse
+import os
+import select
+import struct
+import time
+
+try:
+    import ctypes
+    import ctypes.util
+
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    libc.inotify_init1
+except (ImportError, OSError, AttributeError):
+    libc = None
+
+from file_stats import STAT_OK, stat_path
+from main import (FileEntry, catalog_from_rows, extract_entries, normalize_extensions, scan_directory,
+                  write_csv_atomically)
+from manifest import dataframe_rows
+from sqlite_catalog import write_sqlite
+
+EXTENSIONS = [".brw", ".dat"]
+
+# inotify event masks, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """
+    Reports changed recordings below a root directory with Linux inotify.
+
+    Every directory of the tree gets a watch; directories that are created or moved in
+    are watched as they appear, and their files are reported, since they may have been
+    written before the watch existed.
+
+    Parameters:
+    ----------
+    root : str
+        The watched directory.
+    extensions : list of str
+        Extensions of the reported files, matched case-insensitively.
+    """
+
+    def __init__(self, root, extensions=EXTENSIONS):
+        self.extensions = normalize_extensions(extensions)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self.directories = {}
+        self.add_tree(root)
+
+    def matches(self, path):
+        return os.path.splitext(path)[1].lower() in self.extensions
+
+    def add_tree(self, directory):
+        """
+        Watches a directory and its subdirectories.
+
+        Returns:
+        -------
+        files : list of str
+            The matching files found in the tree.
+        """
+        files = []
+        stack = [directory]
+        while stack:
+            directory = stack.pop()
+            descriptor = libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if descriptor < 0:
+                # Removed again before it could be watched
+                continue
+            self.directories[descriptor] = directory
+            try:
+                with os.scandir(directory) as iterator:
+                    for dir_entry in iterator:
+                        if dir_entry.is_dir():
+                            stack.append(dir_entry.path)
+                        elif self.matches(dir_entry.name):
+                            files.append(dir_entry.path)
+            except OSError:
+                continue
+        return files
+
+    def poll(self, timeout):
+        """
+        Waits up to `timeout` seconds for events and returns what changed.
+
+        Returns:
+        -------
+        paths : set of str
+            Matching files that were created, written, moved or deleted.
+        removed_directories : set of str
+            Directories that were deleted or moved away, with every file below them.
+        rescan : bool
+            True if the kernel queue overflowed and events were lost.
+        """
+        paths, removed_directories, rescan = set(), set(), False
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return paths, removed_directories, rescan
+        while True:
+            try:
+                buffer = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buffer):
+                descriptor, mask, cookie, length = EVENT_HEADER.unpack_from(buffer, offset)
+                name = buffer[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+                offset += EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    rescan = True
+                    continue
+                directory = self.directories.get(descriptor)
+                if directory is None:
+                    continue
+                if mask & IN_IGNORED:
+                    del self.directories[descriptor]
+                    continue
+                if not name:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        paths.update(self.add_tree(path))
+                    elif mask & (IN_DELETE | IN_MOVED_FROM):
+                        removed_directories.add(path)
+                elif self.matches(path):
+                    paths.add(path)
+        return paths, removed_directories, rescan
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    Reports changed recordings by walking the tree periodically and comparing sizes and
+    modification times; used where inotify is not available, e.g. on Windows or on
+    network shares, whose changes inotify does not see.
+
+    Parameters:
+    ----------
+    root : str
+        The watched directory.
+    extensions : list of str
+        Extensions of the reported files.
+    interval : float
+        Seconds between two walks.
+    """
+
+    def __init__(self, root, extensions=EXTENSIONS, interval=5.0):
+        self.root = root
+        self.extensions = extensions
+        self.interval = interval
+        self.snapshot = self.walk()
+        self.next_walk = time.monotonic() + interval
+
+    def walk(self):
+        return {entry.path: (entry.size, entry.mtime) for entry in scan_directory(self.root, self.extensions)}
+
+    def add_tree(self, directory):
+        """
+        Takes a new snapshot of the tree, like InotifyWatcher.add_tree after lost events.
+
+        Returns:
+        -------
+        files : list of str
+            The matching files found in the tree.
+        """
+        self.snapshot = self.walk()
+        return list(self.snapshot)
+
+    def poll(self, timeout):
+        """
+        Waits up to `timeout` seconds and returns what changed, like InotifyWatcher.poll.
+        """
+        paths = set()
+        time.sleep(max(0.0, min(timeout, self.next_walk - time.monotonic())))
+        if time.monotonic() >= self.next_walk:
+            snapshot = self.walk()
+            paths = {path for path in snapshot.keys() | self.snapshot.keys()
+                     if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            self.next_walk = time.monotonic() + self.interval
+        return paths, set(), False
+
+    def close(self):
+        pass
+
+
+class LiveCatalog:
+    """
+    The extracted rows of every recording, kept up to date file by file.
+
+    The written table is the same as the one of a full run of main.py over the current
+    tree, see main.catalog_from_rows.
+
+    Parameters:
+    ----------
+    root : str
+        Root directory of the recordings.
+    csv_path : str
+        The .csv file; it is replaced atomically on every update.
+    sqlite_path : str, optional
+        SQLite catalog updated in place with the changed rows.
+    """
+
+    def __init__(self, root, csv_path, sqlite_path=None):
+        self.root = root
+        self.csv_path = csv_path
+        self.sqlite_path = sqlite_path
+        self.columns = []
+        self.rows = {}
+
+    def rebuild(self, entries=None, skip=()):
+        """
+        Extracts every file of the tree and writes the catalog.
+
+        Parameters:
+        ----------
+        entries : list of FileEntry, optional
+            The files of the tree, if they were just walked.
+        skip : collection of str
+            Files that may still be being written; they keep the row they have, if any,
+            until they are updated.
+        """
+        if entries is None:
+            entries = list(scan_directory(self.root, EXTENSIONS))
+        self.rows = {path: self.rows[path] for path in skip if path in self.rows}
+        self.update([entry for entry in entries if entry.path not in skip], [])
+        if self.sqlite_path:
+            write_sqlite(self.table(), self.sqlite_path, prune=True)
+        return len(entries)
+
+    def update(self, entries, removed):
+        """
+        Extracts only the given files, drops the removed ones and writes the catalog.
+
+        Parameters:
+        ----------
+        entries : list of FileEntry
+            New or modified files.
+        removed : list of str
+            Paths of files that are gone.
+
+        Returns:
+        -------
+        df : pd.DataFrame
+            The cleaned table.
+        """
+        df = extract_entries(entries)
+        self.columns = list(df.columns)
+        self.rows.update(zip(df["Location"], dataframe_rows(df)))
+        for path in removed:
+            self.rows.pop(path, None)
+        table = self.table()
+        write_csv_atomically(table, self.csv_path)
+        if self.sqlite_path and (entries or removed):
+            changed = {entry.path for entry in entries}
+            changed_rows = table[table["Location"].isin(changed)]
+            gone = sorted(changed.union(removed).difference(changed_rows["Location"]))
+            write_sqlite(changed_rows.reset_index(drop=True), self.sqlite_path, delete=gone)
+        return table
+
+    def table(self):
+        """
+        Returns the cleaned table of all rows, in the order of the walk.
+        """
+        return catalog_from_rows(self.rows, self.columns)
+
+    def paths_below(self, directory):
+        prefix = os.path.join(directory, "")
+        return [path for path in self.rows if path.startswith(prefix)]
+
+
+def rescan(watcher, catalog, pending, debounce_seconds):
+    """
+    Catches up after the kernel queue overflowed and events were lost.
+
+    Directories created meanwhile get their watches, and the catalog is rebuilt from a
+    new walk. Files that were pending, or were modified less than `debounce_seconds`
+    ago, may still be being written: they are left out of the rebuild and added to the
+    pending set, so that they are catalogued once their size stops changing.
+
+    Parameters:
+    ----------
+    watcher : InotifyWatcher or PollingWatcher
+        The watcher whose events were lost.
+    catalog : LiveCatalog
+        The catalog to rebuild.
+    pending : dict
+        The pending files of watch_catalog; updated in place.
+    debounce_seconds : float
+        Quiet time before a file is extracted.
+    """
+    watcher.add_tree(catalog.root)
+    entries = list(scan_directory(catalog.root, EXTENSIONS))
+    now, wall_clock = time.monotonic(), time.time()
+    for entry in entries:
+        if entry.path in pending or entry.mtime is not None and wall_clock - entry.mtime < debounce_seconds:
+            pending[entry.path] = (now, pending.get(entry.path, (now, None))[1])
+    catalog.rebuild(entries, skip=pending)
+
+
+def watch_catalog(root, csv_path, sqlite_path=None, debounce_seconds=2.0, poll_interval=5.0, polling=False,
+                  duration=None):
+    """
+    Keeps the catalog of a directory tree up to date until interrupted.
+
+    Changed files wait in a pending set until no event arrived for `debounce_seconds`
+    and their size and modification time did not change over that time, so that a burst
+    of writes is extracted once and recordings that are still being written are not
+    catalogued yet. Files that are gone are removed from the catalog.
+
+    Parameters:
+    ----------
+    root : str
+        The watched directory.
+    csv_path : str
+        The .csv file to keep up to date.
+    sqlite_path : str, optional
+        SQLite catalog to keep up to date as well.
+    debounce_seconds : float
+        Quiet time after the last event and stable size before a file is extracted.
+    poll_interval : float
+        Seconds between two walks of the polling watcher.
+    polling : bool
+        Use the polling watcher even if inotify is available.
+    duration : float, optional
+        Stop after this many seconds, e.g. for tests; None watches until interrupted.
+    """
+    catalog = LiveCatalog(root, csv_path, sqlite_path)
+    if libc is not None and not polling:
+        watcher = InotifyWatcher(root)
+        mode = f"inotify, {len(watcher.directories)} directories"
+    else:
+        watcher = PollingWatcher(root, interval=poll_interval)
+        mode = f"polling every {poll_interval:g} s"
+    files = catalog.rebuild()
+    print(f"Watching {root} ({mode}): catalogued {files} files into {csv_path}")
+
+    # path -> (time of the last event or size change, (size, mtime) seen then)
+    pending = {}
+    stop = None if duration is None else time.monotonic() + duration
+    try:
+        while stop is None or time.monotonic() < stop:
+            paths, removed_directories, rescan = watcher.poll(debounce_seconds / 2)
+            now = time.monotonic()
+            if rescan:
+                print("Event queue overflowed, rescanning")
+                rescan(watcher, catalog, pending, debounce_seconds)
+                continue
+            for directory in removed_directories:
+                paths.update(catalog.paths_below(directory))
+            for path in paths:
+                pending[path] = (now, pending.get(path, (now, None))[1])
+
+            ready, removed = [], []
+            for path, (changed_at, seen) in list(pending.items()):
+                if now - changed_at < debounce_seconds:
+                    continue
+                size, mtime, inode, status = stat_path(path)
+                if status != STAT_OK:
+                    del pending[path]
+                    removed.append(path)
+                elif (size, mtime) != seen:
+                    # Still being written: wait for another quiet period
+                    pending[path] = (now, (size, mtime))
+                else:
+                    del pending[path]
+                    ready.append(FileEntry(path, size, mtime, inode))
+            if ready or removed:
+                start = time.perf_counter()
+                table = catalog.update(ready, removed)
+                print(f"{time.strftime('%H:%M:%S')} catalogued {len(ready)} new or modified files, removed "
+                      f"{len(removed)}: {len(table)} rows, updated in {(time.perf_counter() - start) * 1000:.0f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Keeps the catalog of .brw and .dat recordings up to date "
+                                                 "while new recordings arrive.")
+    parser.add_argument("--path", required=True, help="Root directory of the recordings.")
+    parser.add_argument("--csv-path", required=True, help="The .csv catalog, rewritten on every change.")
+    parser.add_argument("--sqlite", default=None, help="SQLite catalog to update in place as well.")
+    parser.add_argument("--debounce", type=float, default=2.0,
+                        help="Seconds without events and without size change before a file is catalogued.")
+    parser.add_argument("--polling", action="store_true",
+                        help="Walk the tree periodically instead of using inotify (always on other systems "
+                             "and needed for network shares).")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Seconds between walks with --polling.")
+    parser.add_argument("--duration", type=float, default=None, help="Stop after this many seconds.")
+    args = parser.parse_args()
+    watch_catalog(os.path.normpath(args.path), args.csv_path, args.sqlite, args.debounce, args.poll_interval,
+                  args.polling, args.duration)